@@ -0,0 +1,53 @@
+"""
+Compare the object-based summary constructor (load_tries + tries_to_pandas) with AttemptFrame
+(load_try_frame + AttemptFrame.from_tries) on synthetic years of history of a climber.
+
+    python benchmarks/attempt_frame.py --years 1 2 5
+
+Build time is the best of --repeat runs, peak is the tracemalloc peak during the build and kept
+the memory still allocated once the build returned (frame and, for the old constructor, problem instances).
+"""
+import argparse
+
+from harness import measure, test_database
+
+from gymstats.helper.synthetic import DatasetSize, generate_dataset
+from gymstats.models import Attempt, Climber, Session
+from gymstats.statistics.frame import AttemptFrame, load_try_frame
+from gymstats.statistics.sessions import load_tries, tries_to_pandas
+
+
+def old_constructor(sessions, thresholds):
+    return tries_to_pandas(load_tries(sessions), thresholds)
+
+
+def new_constructor(sessions, thresholds):
+    return AttemptFrame.from_tries(load_try_frame(sessions), thresholds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[1])
+    parser.add_argument("--sessions-per-year", type=int, default=150)
+    parser.add_argument("--tries-per-session", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        print("{:>6} {:>8} {:<14} {:>10} {:>12} {:>12}".format("years", "tries", "constructor", "time (ms)", "peak (KiB)", "kept (KiB)"))
+        for i, years in enumerate(args.years):
+            size = DatasetSize(gyms=1, climbers=1, days=365 * years, sessions_per_climber=args.sessions_per_year * years,
+                               tries_per_session=args.tries_per_session)
+            dataset = generate_dataset(size, seed=i, prefix="bench {}".format(i))
+            climber = Climber.objects.get(id=dataset.climbers[0])
+            sessions = list(Session.objects.filter(climber=climber))
+            thresholds = climber.thresholds()
+            tries = Attempt.objects.filter(session__climber=climber).count()
+            for name, build in [("objects", old_constructor), ("AttemptFrame", new_constructor)]:
+                m = measure(lambda: build(sessions, thresholds), args.repeat)
+                print("{:>6} {:>8} {:<14} {:>10.1f} {:>12.0f} {:>12.0f}".format(
+                    years, tries, name, m.seconds * 1000, m.peak / 1024, m.retained / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compare the benchmark history of two revisions (see history.py) and flag significant regressions:
+
+    python benchmarks/compare.py HEAD~1 HEAD --scale 1 --run
+
+For each entry point, the mean time and its confidence interval on both revisions, the relative change and the p-value
+of a one-sided Welch t-test on the pooled samples. A slowdown is flagged when the p-value is below --alpha and the change
+above --threshold. More queries, or a peak memory more than --threshold above, are flagged too.
+The exit status is 1 when a regression is flagged.
+
+With --run, both revisions are benchmarked --runs times first, alternately so that a drift of the machine does not
+favour one of them: committed revisions in a temporary git worktree (with their own benchmark script), a dirty HEAD
+in the working tree. Everything runs locally. Revisions are benchmarked with their own code and benchmark script,
+which must save results to the history (benchmarks/history.py): older revisions can only be compared using results
+saved in the history by other means.
+"""
+import argparse
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+from typing import Dict, List
+
+from history import HISTORY_DIR, confidence_interval, git_revision, load_record, pooled, slowdown_pvalue
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resolve(revision: str, history: str) -> str:
+    """
+    Revision as named in the history: as given if already there (e.g. a -dirty one), its short hash otherwise.
+    """
+    if os.path.isdir(os.path.join(history, revision)):
+        return revision
+    return git_revision(revision)
+
+
+def has_harness(revision: str) -> bool:
+    """
+    Whether the benchmark script of *revision* saves its results to the history.
+    """
+    if revision.endswith("-dirty"):
+        revision = "HEAD"
+    found = subprocess.run(["git", "cat-file", "-e", "{}:benchmarks/history.py".format(revision)], cwd=REPOSITORY,
+                           stderr=subprocess.DEVNULL)
+    return found.returncode == 0
+
+
+def benchmark(revision: str, args):
+    """
+    Run the benchmarks of *revision* once, saving their results to the history.
+    """
+    command = [sys.executable, "benchmarks/entry_points.py", "--save", "--history", os.path.abspath(args.history),
+               "--scales", "{:g}".format(args.scale), "--seed", str(args.seed), "--repeat", str(args.repeat)]
+    if revision.endswith("-dirty"):
+        subprocess.run(command, cwd=REPOSITORY, check=True)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, revision)
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, revision], cwd=REPOSITORY, check=True)
+        try:
+            subprocess.run(command, cwd=worktree, check=True)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPOSITORY, check=True)
+
+
+def compare(base: Dict, head: Dict, alpha: float, threshold: float) -> List[Dict]:
+    """
+    A row per entry point of both records, with its regressions (empty if none).
+    """
+    rows = []
+    for name in base["runs"][-1]["entry_points"]:
+        if not pooled(head, name, "samples_ms"):
+            continue
+        base_ms, head_ms = pooled(base, name, "samples_ms"), pooled(head, name, "samples_ms")
+        row = {
+            "name": name,
+            "base": confidence_interval(base_ms),
+            "head": confidence_interval(head_ms),
+            "p": slowdown_pvalue(base_ms, head_ms),
+            "queries": (max(pooled(base, name, "queries")), max(pooled(head, name, "queries"))),
+            "peak": (_mean(pooled(base, name, "peak_kib")), _mean(pooled(head, name, "peak_kib"))),
+            "regressions": [],
+        }
+        row["change"] = row["head"].mean / row["base"].mean - 1
+        if row["p"] < alpha and row["change"] > threshold:
+            row["regressions"].append("time")
+        if row["queries"][1] > row["queries"][0]:
+            row["regressions"].append("queries")
+        if row["peak"][1] > row["peak"][0] * (1 + threshold):
+            row["regressions"].append("memory")
+        rows.append(row)
+    return rows
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values)
+
+
+def _interval(interval) -> str:
+    if math.isnan(interval.half_width):
+        return "{:.1f}".format(interval.mean)
+    return "{:.1f} ± {:.1f}".format(interval.mean, interval.half_width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="base revision: git revision or revision of the history")
+    parser.add_argument("head", nargs="?", default="HEAD", help="compared revision (default: %(default)s)")
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_DIR, help="history directory (default: %(default)s)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level of the slowdowns")
+    parser.add_argument("--threshold", type=float, default=0.05, help="smallest relative change flagged")
+    parser.add_argument("--run", action="store_true", help="benchmark both revisions before comparing them")
+    parser.add_argument("--runs", type=int, default=3, help="benchmark runs of each revision with --run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of each entry point per benchmark run")
+    args = parser.parse_args()
+
+    base, head = resolve(args.base, args.history), resolve(args.head, args.history)
+    if args.run:
+        for revision in (base, head):
+            if not has_harness(revision):
+                parser.error("{} has no benchmarks/history.py: its benchmarks cannot be saved to the history, "
+                             "compare with a later revision".format(revision))
+        for _ in range(args.runs):
+            for revision in (base, head):
+                benchmark(revision, args)
+
+    records = {}
+    for revision in (base, head):
+        records[revision] = load_record(revision, args.scale, args.seed, args.history)
+        if records[revision] is None:
+            parser.error("no results for {} at scale {:g} (seed {}), use --run".format(revision, args.scale, args.seed))
+
+    rows = compare(records[base], records[head], args.alpha, args.threshold)
+    print("{} -> {}, scale {:g}: mean time (ms) ± {:.0%} confidence interval".format(base, head, args.scale, 0.95))
+    print("{:<30} {:>16} {:>16} {:>8} {:>7} {:>9} {:>15} {}".format(
+        "entry point", "base", "head", "change", "p", "queries", "peak (KiB)", "regressions"))
+    for row in rows:
+        print("{:<30} {:>16} {:>16} {:>+8.1%} {:>7.3f} {:>9} {:>15} {}".format(
+            row["name"], _interval(row["base"]), _interval(row["head"]), row["change"], row["p"],
+            "{} -> {}".format(*row["queries"]), "{:.0f} -> {:.0f}".format(*row["peak"]), ", ".join(row["regressions"])))
+    sys.exit(1 if any(row["regressions"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
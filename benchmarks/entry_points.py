@@ -0,0 +1,104 @@
+"""
+Time the statistics entry points on synthetic datasets of several sizes (see gymstats.helper.synthetic),
+reporting the best time of --repeat runs, the number of queries and the tracemalloc peak of a run.
+
+    python benchmarks/entry_points.py --scales 1 10 100
+
+Each scale gets its own throwaway database. Per-climber entry points run for the first generated climber
+over the last year, gym entry points for its first preferred gym.
+
+With --save, timings of every run, queries and memory are appended to the history of the current git revision
+(see history.py), to be compared between revisions with compare.py.
+"""
+import argparse
+import datetime
+
+from typing import Callable, Dict, Tuple
+
+from harness import Measure, measure, test_database
+from history import HISTORY_DIR, git_revision, save_run
+
+from gymstats.helper.parser import parse_filters
+from gymstats.helper.query import query_problems_from_filters
+from gymstats.helper.synthetic import DatasetSize, generate_dataset
+from gymstats.models import Climber, IntervalStatistics, Session
+from gymstats.statistics.analytics import ClimberAnalytics
+from gymstats.statistics.first_achievements import new_achievements
+from gymstats.statistics.gym import current_problems_achievement
+from gymstats.statistics.sessions import sessions_to_pandas, summary
+
+
+FILTERS = "hh=crimp;fw=heelhook;top"
+
+
+class Context:
+    """
+    Climber, gym and period the entry points run on.
+    """
+    def __init__(self, climber_id: int, end: datetime.date):
+        self.climber_id = climber_id
+        self.end = end
+        self.start = end - datetime.timedelta(days=364)
+
+    def climber(self) -> Climber:
+        return Climber.objects.get(id=self.climber_id)
+
+    def sessions(self):
+        return list(Session.objects.filter(climber_id=self.climber_id, date__gte=self.start, date__lte=self.end))
+
+
+ENTRY_POINTS: Dict[str, Callable[[Context], object]] = {
+    "sessions_to_pandas": lambda ctx: sessions_to_pandas(ctx.sessions(), ctx.start, ctx.climber().thresholds()),
+    "summary": lambda ctx: summary(ctx.sessions(), ctx.climber().thresholds(), ctx.start),
+    "new_achievements": lambda ctx: new_achievements(ctx.climber_id, ctx.start, ctx.end, ctx.climber().thresholds()),
+    "current_problems_achievement": lambda ctx: current_problems_achievement(
+        ctx.climber().preferred_gyms.first(), ctx.climber()),
+    "query_problems_from_filters": lambda ctx: [
+        list(problems) for problems, _ in [query_problems_from_filters(parse_filters(FILTERS)[0], ctx.climber())]],
+    "profil (ClimberAnalytics)": lambda ctx: _profil(ctx),
+}
+
+
+def _profil(ctx: Context):
+    analytics = ClimberAnalytics(ctx.climber(), ctx.end)
+    return (analytics.all_time(), analytics.interval(IntervalStatistics.Intervals.MONTH),
+            analytics.interval(IntervalStatistics.Intervals.YEAR), analytics.by_gym())
+
+
+def run(scale: float, seed: int, repeat: int, entry_points) -> Tuple[Dict[str, int], Dict[str, Measure]]:
+    with test_database():
+        end = datetime.date.today()
+        dataset = generate_dataset(DatasetSize().scaled(scale), seed=seed, end=end)
+        print("scale {}: {}".format(scale, ", ".join("{} {}".format(v, k) for k, v in dataset.counts.items())))
+        ctx = Context(dataset.climbers[0], end)
+        return dataset.counts, {name: measure(lambda: ENTRY_POINTS[name](ctx), repeat) for name in entry_points}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--entry", action="append", choices=list(ENTRY_POINTS),
+                        help="entry point to benchmark (default: all)")
+    parser.add_argument("--save", action="store_true", help="append the results to the history of the revision")
+    parser.add_argument("--history", default=HISTORY_DIR, help="history directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    entry_points = args.entry or list(ENTRY_POINTS)
+    revision = git_revision()
+    results = {}
+    for scale in args.scales:
+        counts, results[scale] = run(scale, args.seed, args.repeat, entry_points)
+        if args.save:
+            print("saved to", save_run(revision, scale, args.seed, counts, results[scale], args.history))
+
+    print("{:<30} {:>7} {:>10} {:>8} {:>12}".format("entry point", "scale", "time (ms)", "queries", "peak (KiB)"))
+    for name in entry_points:
+        for scale, measures in results.items():
+            m = measures[name]
+            print("{:<30} {:>7g} {:>10.1f} {:>8} {:>12.0f}".format(name, scale, m.seconds * 1000, m.queries, m.peak / 1024))
+
+
+if __name__ == "__main__":
+    main()
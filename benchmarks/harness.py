@@ -0,0 +1,72 @@
+"""
+Shared setup of the benchmark scripts: Django is set up on import, benchmarks run against a throwaway test database
+(in memory for SQLite) filled by the synthetic dataset generator.
+"""
+import contextlib
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "boulderbuddy.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+
+@dataclass
+class Measure:
+    seconds: float  # best of the timed runs
+    queries: int
+    peak: int  # bytes allocated at the peak of a run (tracemalloc)
+    retained: int  # bytes still allocated by the result once the run returned
+    samples: List[float]  # seconds of each timed run
+
+
+@contextlib.contextmanager
+def test_database():
+    """
+    Create the test database of the default connection for the duration of the block.
+    """
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(run: Callable[[], Any], repeat: int = 3) -> Measure:
+    """
+    Time *run* (best of *repeat*), then count its queries and trace its memory in a last run.
+    The cache is cleared before every run so that cached statistics are not measured.
+    """
+    timings = []
+    for _ in range(repeat):
+        cache.clear()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    cache.clear()
+    gc.collect()
+    # the log is bounded: once full, captured queries could not be counted
+    connection.queries_log.clear()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as ctx:
+        result = run()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return Measure(min(timings), len(ctx), peak, retained, timings)
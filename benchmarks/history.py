@@ -0,0 +1,126 @@
+"""
+History of benchmark results: a JSON record per git revision, dataset scale and seed, in which the runs of
+benchmarks/entry_points.py --save accumulate (more runs, more samples, narrower confidence intervals).
+
+    <history>/<revision>/scale-<scale>-seed-<seed>.json
+
+Revisions are the 12 first characters of the commit hash, suffixed with -dirty when the working tree had
+uncommitted changes. Records only hold JSON so that they can be compared on any box, without Django.
+"""
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from scipy import stats
+
+
+HISTORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_revision(rev: str = "HEAD", cwd: str = None) -> str:
+    """
+    Short hash of *rev* in the repository of *cwd* (default: the one of the benchmarks), suffixed with -dirty
+    for HEAD when tracked files have uncommitted changes.
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    sha = subprocess.check_output(["git", "rev-parse", "--short=12", rev], cwd=cwd, text=True).strip()
+    if rev == "HEAD":
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd, text=True)
+        if status.strip():
+            sha += "-dirty"
+    return sha
+
+
+def record_path(revision: str, scale: float, seed: int, history: str = HISTORY_DIR) -> str:
+    return os.path.join(history, revision, "scale-{:g}-seed-{}.json".format(scale, seed))
+
+
+def load_record(revision: str, scale: float, seed: int, history: str = HISTORY_DIR) -> Optional[Dict]:
+    path = record_path(revision, scale, seed, history)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_run(revision: str, scale: float, seed: int, counts: Dict[str, int], measures: Dict,
+             history: str = HISTORY_DIR) -> str:
+    """
+    Append the measures of a run (entry point name -> harness.Measure) to the record of the revision, scale and seed.
+    Return the path of the record.
+    """
+    record = load_record(revision, scale, seed, history) or {
+        "revision": revision,
+        "scale": scale,
+        "seed": seed,
+        "counts": counts,
+        "runs": [],
+    }
+    record["runs"].append({
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "entry_points": {
+            name: {
+                "samples_ms": [round(s * 1000, 3) for s in m.samples],
+                "queries": m.queries,
+                "peak_kib": round(m.peak / 1024, 1),
+                "retained_kib": round(m.retained / 1024, 1),
+            } for name, m in measures.items()
+        },
+    })
+    path = record_path(revision, scale, seed, history)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def pooled(record: Dict, name: str, key: str) -> List[float]:
+    """
+    Values of *key* for the entry point over all the runs of the record: samples are concatenated.
+    """
+    values = []
+    for run in record["runs"]:
+        if name in run["entry_points"]:
+            value = run["entry_points"][name][key]
+            values.extend(value if isinstance(value, list) else [value])
+    return values
+
+
+@dataclass
+class Interval:
+    mean: float
+    half_width: float  # of the confidence interval, nan with less than 2 samples
+    n: int
+
+
+def confidence_interval(samples: List[float], confidence: float = 0.95) -> Interval:
+    """
+    Confidence interval of the mean (Student's t distribution).
+    """
+    n = len(samples)
+    mean = sum(samples) / n
+    if n < 2:
+        return Interval(mean, math.nan, n)
+    sd = math.sqrt(sum((x - mean) ** 2 for x in samples) / (n - 1))
+    return Interval(mean, stats.t.ppf((1 + confidence) / 2, n - 1) * sd / math.sqrt(n), n)
+
+
+def slowdown_pvalue(base: List[float], head: List[float]) -> float:
+    """
+    One-sided Welch t-test p-value of *head* being slower than *base* (nan with less than 2 samples on a side).
+    """
+    if len(base) < 2 or len(head) < 2:
+        return math.nan
+    if len(set(base)) == 1 and len(set(head)) == 1:
+        # no variance: the test is undefined, only a difference can be observed
+        return 0. if head[0] > base[0] else 1.
+    return float(stats.ttest_ind(head, base, equal_var=False, alternative="greater").pvalue)
@@ -0,0 +1,47 @@
+"""
+Render every view of gymstats.urls against the synthetic dataset of the view budgets and print their cost
+(queries, time spent in the database and wall time). With --update, the costs are saved as the new budgets
+checked by ViewBudgetTest (benchmarks/view_budgets.json):
+
+    python benchmarks/view_budgets.py --update
+
+Budgets should only be raised on purpose: a view doing more work, not a regression.
+"""
+import argparse
+import tempfile
+
+from harness import test_database
+
+from django.test.utils import override_settings, setup_test_environment
+
+from gymstats.budgets import BUDGET_SIZE, check_budgets, load_budgets, measure_views, save_budgets, view_client, view_requests
+from gymstats.helper.synthetic import generate_dataset
+from gymstats.models import Climber
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="save the costs as the new budgets")
+    parser.add_argument("--ratio", type=float, default=2., help="time tolerance ratio of the saved budgets")
+    parser.add_argument("--slack", type=float, default=10., help="time tolerance slack (ms) of the saved budgets")
+    args = parser.parse_args()
+
+    setup_test_environment()  # requests of the test client are allowed and their templates recorded
+    with test_database(), tempfile.TemporaryDirectory() as profiles, override_settings(PROFILES_DIR=profiles):
+        dataset = generate_dataset(BUDGET_SIZE, seed=0)
+        climber = Climber.objects.get(id=dataset.climbers[0])
+        costs = measure_views(view_client(climber), view_requests(climber))
+
+    print("{:<22} {:>6} {:>8} {:>10} {:>10}".format("view", "status", "queries", "db (ms)", "wall (ms)"))
+    for name, cost in costs.items():
+        print("{:<22} {:>6} {:>8} {:>10.1f} {:>10.1f}".format(name, cost.status, cost.queries, cost.db_ms, cost.wall_ms))
+
+    if args.update:
+        save_budgets(costs, {"ratio": args.ratio, "ms": args.slack})
+    else:
+        for regression in check_budgets(costs, load_budgets()):
+            print("regression:", regression)
+
+
+if __name__ == "__main__":
+    main()
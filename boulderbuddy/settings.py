@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gymstats.middleware.ServerTimingMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,13 +58,15 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'gymstats.middleware.AuthenticationMiddleware',
+    'gymstats.middleware.ClimberMiddleware',
+    'gymstats.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = "boulderbuddy.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "gymstats.timing.TimedDjangoTemplates",  # DjangoTemplates measuring render times
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -91,6 +94,40 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Local memory cache is per process and evicts least recently used entries once MAX_ENTRIES is reached.
+# Cached statistics are keyed by data versions stored in the database (see gymstats.cache), so that every
+# process stops serving them once the data changed: a shared backend (Memcached, Redis) only saves computations.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "boulderbuddy",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {
+            "MAX_ENTRIES": 1000,
+            "CULL_FREQUENCY": 10,
+        },
+    }
+}
+
+
+# Request timings (see gymstats.middleware.ServerTimingMiddleware)
+# Server-Timing header on every response, and log of the requests slower than SLOW_REQUEST_MS
+# with their slowest SQL statements. SLOW_REQUEST_MS empty or 0 in the environment (None here): disabled.
+
+SERVER_TIMING = config("SERVER_TIMING", default=DEBUG, cast=bool)
+SLOW_REQUEST_MS = config("SLOW_REQUEST_MS", default="1000", cast=lambda ms: int(ms) or None if ms.strip() else None)
+SLOW_REQUEST_QUERIES = 5
+
+# Profiles of the staff requests with a ?profile=cpu or ?profile=mem parameter
+# (see gymstats.middleware.ProfilingMiddleware), listed on /gymstats/profiles/.
+
+PROFILES_DIR = config("PROFILES_DIR", default=str(BASE_DIR / "profiles"))
+PROFILE_TOP_FUNCTIONS = 30
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -1,10 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .forms import IndoorBoulderForm, TryForm, SessionForm
+from .forms import IndoorBoulderForm, TryForm, AttemptForm, SessionForm
 from .models import ClimbingMove, WallAngle, HandHold, Footwork, ClimbAttribute, ClimbType
 from .models import IndoorSector, OutdoorSector, Gym, Crag, IndoorBoulder, Crux, Climbable
 from .models import Climber, HardBoulderThreshold
-from .models import Shoes, ShoesFixing, Session, Top, Failure, Zone, Review, RIC  # ideally those should be removed once views are written
+from .models import Shoes, ShoesFixing, Session, Attempt, Top, Failure, Zone, Review, RIC  # ideally those should be removed once views are written
 
 
 class TopInline(admin.TabularInline):
@@ -83,6 +83,13 @@ class TryAdmin(admin.ModelAdmin):
     list_display = ('session', 'pb_grade', 'attempts')
 
 
+@admin.register(Attempt)
+class AttemptAdmin(admin.ModelAdmin):
+    form = AttemptForm
+    list_display = ('session', 'pb_grade', 'result', 'attempts')
+    list_filter = ('result',)
+
+
 @admin.register(Climber)
 class ClimberAdmin(admin.ModelAdmin):
     fieldsets = [
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GymstatsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "gymstats"
+
+    def ready(self):
+        from gymstats import signals  # connect signal receivers
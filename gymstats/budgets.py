@@ -0,0 +1,191 @@
+"""
+Per-view query and latency budgets: a request per view of gymstats.urls against the synthetic dataset, measured and
+compared with benchmarks/view_budgets.json. Used by ViewBudgetTest and benchmarks/view_budgets.py (to record them).
+"""
+import datetime
+import json
+import os
+import time
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Set
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from gymstats import urls
+from gymstats.helper.profiles import CpuProfiler, save_profile
+from gymstats.helper.synthetic import DatasetSize
+from gymstats.models import Attempt, Climber, Review, RIC, Session
+from gymstats.timing import QueryTimer
+
+
+# budgets of the views, recorded with benchmarks/view_budgets.py
+BUDGETS_PATH = Path(settings.BASE_DIR) / "benchmarks" / "view_budgets.json"
+
+# dataset the budgets are recorded on (seed 0, ending today)
+BUDGET_SIZE = DatasetSize()
+
+# filters of the problem search (see helper.parser)
+SEARCH_FILTERS = "hh=crimp;fw=heelhook;top"
+
+
+@dataclass
+class ViewRequest:
+    name: str  # url name in gymstats.urls
+    method: str
+    path: str
+    data: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ViewCost:
+    status: int
+    queries: int
+    db_ms: float
+    wall_ms: float
+
+
+def view_client(climber: Climber, client: Client = None) -> Client:
+    """
+    Client logged in as (a new staff user attached to) the climber.
+    """
+    user = User.objects.create_user("budget-{}".format(climber.id), is_staff=True)
+    Climber.objects.filter(id=climber.id).update(user=user)
+    client = client or Client()
+    client.force_login(user)
+    return client
+
+
+def view_requests(climber: Climber) -> List[ViewRequest]:
+    """
+    A request per view of gymstats.urls on the data of the climber: its last session, a problem tried during it
+    and its gym. A review and a RIC of the problem, and a profile in PROFILES_DIR, are created for the views
+    displaying them.
+    """
+    session = Session.objects.filter(climber=climber).order_by("-date").first()
+    problem = Attempt.objects.filter(session=session).first().problem
+    gym = session.gym
+    review = Review.objects.create(reviewer=climber, comment="budget", problem=problem, rating=3)
+    ric = RIC.objects.create(reviewer=climber, problem=problem, risk=1, intensity=2, complexity=3)
+    with CpuProfiler() as profiler:
+        session.statistics()
+    profile = save_profile(profiler, "gs:session-statistics")
+
+    def get(name, **kwargs):
+        return ViewRequest(name, "GET", reverse("gs:" + name, kwargs=kwargs))
+
+    def post(name, data, **kwargs):
+        return ViewRequest(name, "POST", reverse("gs:" + name, kwargs=kwargs), data)
+
+    year_ago = session.date - datetime.timedelta(days=364)
+    return [
+        get("index"),
+        get("home"),
+        get("profil"),
+        get("profil-edit"),
+        get("stats-searchbar"),
+        post("stats-searchresults", {"from": year_ago.isoformat(), "to": session.date.isoformat()}),
+        get("stats-json", range_method="month"),
+        get("session-add-new"),
+        get("session-add-problems", session_id=session.id),
+        get("session", session_id=session.id),
+        get("session-statistics", session_id=session.id),
+        get("session-details", session_id=session.id),
+        get("gym-homepage"),
+        get("gym", gym_abv=gym.abv),
+        get("gym-problems", gym_abv=gym.abv),
+        get("pb-homepage"),
+        get("pb-details", problem_id=problem.id),
+        post("pb-review", {"comment": "budget", "rating": "4"}, problem_id=problem.id),
+        post("pb-ric", {"risk": "1", "intensity": "1", "complexity": "1"}, problem_id=problem.id),
+        get("pb-ric-display", problem_id=problem.id, ric_id=ric.id),
+        get("pb-review-display", problem_id=problem.id, review_id=review.id),
+        get("pb-reviews", problem_id=problem.id),
+        get("pb-searchbar"),
+        post("pb-searchresults", {"search": SEARCH_FILTERS}),
+        get("sector-autocomplete"),
+        get("gym-autocomplete"),
+        get("problem-autocomplete"),
+        get("grade-autocomplete"),
+        get("profiles"),
+        get("profile", profile_name=profile),
+    ]
+
+
+def uncovered_views(requests: List[ViewRequest]) -> Set[str]:
+    """
+    Names of the views of gymstats.urls without a request.
+    """
+    names = {p.name for p in urls.urlpatterns if isinstance(p, URLPattern)}
+    return names - {r.name for r in requests}
+
+
+def measure_views(client: Client, requests: List[ViewRequest], repeat: int = 3) -> Dict[str, ViewCost]:
+    """
+    Send each request *repeat* times, with an empty cache, and measure its cost: status and queries of the first
+    request, best time spent in the database and best wall time of the whole request (middlewares included).
+    """
+    costs = {}
+    for r in requests:
+        cost = None
+        for _ in range(repeat):
+            cache.clear()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                start = time.perf_counter()
+                response = client.get(r.path) if r.method == "GET" else client.post(r.path, r.data)
+                wall = time.perf_counter() - start
+            if cost is None:
+                cost = ViewCost(response.status_code, timer.queries, timer.seconds * 1000, wall * 1000)
+            cost.db_ms = min(cost.db_ms, timer.seconds * 1000)
+            cost.wall_ms = min(cost.wall_ms, wall * 1000)
+        cost.db_ms, cost.wall_ms = round(cost.db_ms, 1), round(cost.wall_ms, 1)
+        costs[r.name] = cost
+    return costs
+
+
+def load_budgets(path: Path = BUDGETS_PATH) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_budgets(costs: Dict[str, ViewCost], tolerance: Dict[str, float], path: Path = BUDGETS_PATH):
+    budgets = {
+        "size": asdict(BUDGET_SIZE),
+        "tolerance": tolerance,
+        "views": {name: {k: v for k, v in asdict(cost).items() if k != "status"} for name, cost in costs.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(budgets, f, indent=2)
+        f.write("\n")
+
+
+def check_budgets(costs: Dict[str, ViewCost], budgets: Dict, times: bool = True) -> List[str]:
+    """
+    Return a message per regression: error status, more queries than budgeted, or (with *times*) database/wall time
+    above the budget times the tolerance ratio plus its slack (in ms, absorbing the noise on fast views).
+    The ratio can be overridden with the VIEW_BUDGET_TOLERANCE environment variable (e.g. on slow machines).
+    """
+    ratio = float(os.environ.get("VIEW_BUDGET_TOLERANCE", budgets["tolerance"]["ratio"]))
+    slack = budgets["tolerance"]["ms"]
+    regressions = []
+    for name, cost in costs.items():
+        budget = budgets["views"].get(name)
+        if cost.status >= 400:
+            regressions.append("{}: status {}".format(name, cost.status))
+        if budget is None:
+            regressions.append("{}: no budget".format(name))
+            continue
+        if cost.queries > budget["queries"]:
+            regressions.append("{}: {} queries (budget: {})".format(name, cost.queries, budget["queries"]))
+        for key in ("db_ms", "wall_ms") if times else ():
+            limit = budget[key] * ratio + slack
+            if getattr(cost, key) > limit:
+                regressions.append("{}: {} {:.1f} > {:.1f} (budget: {})".format(name, key, getattr(cost, key), limit, budget[key]))
+    return regressions
@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Union
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from gymstats.models import Climber, Session
+
+
+CLIMBER = "climber"
+SESSION = "session"
+
+_MODELS = {CLIMBER: Climber, SESSION: Session}
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """
+    Version of the data of a climber or session, stored in the database so that every process sees the same one.
+    Versions are only changed by bump_data_version, saves of the climber or session leave them untouched
+    (see models.StatsVersioned). The modification date is the date of the last bump.
+    """
+    number: int
+    modified: datetime.datetime
+
+    def __str__(self) -> str:
+        return "{}.{}".format(self.number, int(self.modified.timestamp() * 1e6))
+
+
+def instance_version(instance: Union[Climber, Session]) -> DataVersion:
+    """
+    Version of the data of a climber or session as loaded with the instance.
+    """
+    return DataVersion(instance.stats_version, instance.stats_modified)
+
+
+def data_version(scope: str, pk: int) -> Optional[DataVersion]:
+    """
+    Return the current version of the data of a climber or session (None if it does not exist).
+    """
+    row = _MODELS[scope].objects.filter(pk=pk).values_list("stats_version", "stats_modified").first()
+    return DataVersion(*row) if row else None
+
+
+def bump_data_version(scope: str, pk: int):
+    """
+    Make every cached statistics of the climber or session stale. Called by signal receivers on data changes,
+    the version is bumped once the change is committed: statistics computed from the previous data
+    are never stored under the new version.
+    The date is taken in Python, SQLite's CURRENT_TIMESTAMP is only precise to the second.
+    """
+    transaction.on_commit(lambda: _MODELS[scope].objects.filter(pk=pk).update(stats_version=F("stats_version") + 1,
+                                                                              stats_modified=timezone.now()))
+
+
+def climber_version(climber_id: int) -> Optional[DataVersion]:
+    return data_version(CLIMBER, climber_id)
+
+
+def session_version(session_id: int) -> Optional[DataVersion]:
+    return data_version(SESSION, session_id)
+
+
+def bump_climber_version(climber_id: int):
+    bump_data_version(CLIMBER, climber_id)
+
+
+def bump_session_version(session_id: int):
+    bump_data_version(SESSION, session_id)
+
+
+def cached_statistics(climber: Climber, name: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+    """
+    Return the statistics *name* of the climber for the given parameters, computing and caching them on a miss.
+    Entries are keyed by the climber's data version (as loaded with *climber*, before the data the statistics are
+    computed from), hence never served once the climber's data changed.
+    """
+    return _cached(CLIMBER, climber.pk, instance_version(climber), name, params, compute)
+
+
+def cached_session_statistics(session: Session, compute: Callable[[], Any]) -> Any:
+    """
+    Same as cached_statistics for the statistics of a single session, keyed by the session data version.
+    """
+    return _cached(SESSION, session.pk, instance_version(session), "session", None, compute)
+
+
+def _cached(scope: str, pk: int, version: DataVersion, name: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    key = "stats:{}:{}:{}:{}:{}".format(scope, pk, version, name, digest)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
@@ -3,7 +3,7 @@ from django.core.files.base import File
 from django.db.models.base import Model
 from django.forms import ModelForm, Textarea
 from django.forms.utils import ErrorList
-from gymstats.models import Session, Climber, IndoorBoulder, Try, Climbable
+from gymstats.models import Session, Climber, IndoorBoulder, Attempt, Climbable
 from django import forms
 from dal import autocomplete
 from crispy_forms.helper import FormHelper
@@ -103,9 +103,12 @@ class SessionForm(ModelForm):
 
 
 class TryForm(ModelForm):
+    """
+    Form of tops, zones and failures, whose result is set by the model.
+    """
     class Meta:
-        model = Try
-        exclude = ()
+        model = Attempt
+        exclude = ("result",)
         widgets = {
             'problem': autocomplete.ModelSelect2(url='gs:problem-autocomplete',
                                                 attrs={'data-html': True},
@@ -113,6 +116,11 @@ class TryForm(ModelForm):
         }
 
 
+class AttemptForm(TryForm):
+    class Meta(TryForm.Meta):
+        exclude = ()
+
+
 class IndoorBoulderForm(ModelForm):
     class Meta:
         model = IndoorBoulder
@@ -1,3 +1,6 @@
+from typing import List, Optional
+
+
 FONT_SCALE = [
     "4", "4+",
     "5a", "5a+", "5b", "5b+", "5c", "5c+",
@@ -32,13 +35,88 @@ BRAND_TO_ABV = {
 }
 
 
-def grades_list(gym, default=True):
-    values = []
-    # check for special cases
-    if gym.abv.lower() in GRADE_ORDER:
-        values = GRADE_ORDER[gym.abv.lower()]
-    elif gym.brand in BRAND_TO_ABV:
-        values = GRADE_ORDER[BRAND_TO_ABV[gym.brand]]
-    elif default:
-        values = GRADE_ORDER["@default"]
-    return [elt[0].upper() + elt[1:] for elt in values]
+class GradeScale:
+    """
+    Ordered grades of a gym (or brand) with constant time lookup of grade positions.
+    Grades are capitalized, lookups are case and whitespace insensitive.
+    """
+
+    def __init__(self, grades: List[str]):
+        self.grades = tuple(elt[0].upper() + elt[1:] for elt in grades)
+        self.positions = {elt: i for i, elt in enumerate(self.grades)}
+        self._normalized = {self.normalize(elt): i for i, elt in enumerate(self.grades)}
+
+    @staticmethod
+    def normalize(grade: str) -> str:
+        return grade.strip().lower()
+
+    def position(self, grade: str) -> Optional[int]:
+        """
+        Return the position of *grade* in the scale, or None if the grade is unknown
+        """
+        pos = self.positions.get(grade)
+        if pos is None and isinstance(grade, str):
+            pos = self._normalized.get(self.normalize(grade))
+        return pos
+
+    def below(self, grade: str) -> List[str]:
+        pos = self.position(grade)
+        return [] if pos is None else list(self.grades[:pos])
+
+    def above(self, grade: str) -> List[str]:
+        pos = self.position(grade)
+        return [] if pos is None else list(self.grades[pos + 1:])
+
+    def __contains__(self, grade: str) -> bool:
+        return self.position(grade) is not None
+
+    def __iter__(self):
+        return iter(self.grades)
+
+    def __len__(self) -> int:
+        return len(self.grades)
+
+    def __repr__(self) -> str:
+        return "GradeScale({})".format(", ".join(self.grades))
+
+
+EMPTY_SCALE = GradeScale([])
+
+GRADE_SCALES = {key: GradeScale(grades) for key, grades in GRADE_ORDER.items()}
+
+
+def register_grade_order(key: str, grades: List[str]):
+    """
+    Add or replace the grade order of a brand (or special gym) and rebuild its scale.
+    """
+    GRADE_ORDER[key] = grades
+    GRADE_SCALES[key] = GradeScale(grades)
+
+
+def scale_for_abv(abv: str) -> Optional[GradeScale]:
+    """
+    Return the scale of a gym given its abbreviation: special cases (e.g. "bsm") first,
+    then the brand given by the first two letters. None if unknown.
+    """
+    abv = abv.lower()
+    return GRADE_SCALES.get(abv, GRADE_SCALES.get(abv[:2]))
+
+
+def grade_scale(gym, default=True) -> GradeScale:
+    """
+    Return the scale of the given gym: special cases first, then its brand, then the
+    default scale if *default* is set. The returned scale is empty if none applies.
+    """
+    return scale_for_gym(gym.abv, gym.brand, default)
+
+
+def scale_for_gym(abv: str, brand: str, default=True) -> GradeScale:
+    """
+    Same as grade_scale given the abbreviation and brand of the gym (e.g. fetched with values_list).
+    """
+    if abv.lower() in GRADE_SCALES:
+        return GRADE_SCALES[abv.lower()]
+    if brand in BRAND_TO_ABV:
+        return GRADE_SCALES[BRAND_TO_ABV[brand]]
+    return GRADE_SCALES["@default"] if default else EMPTY_SCALE
+
@@ -21,6 +21,11 @@ TOP_ATPS = "top attempts"
 ZONE_ATPS = "zone attempts"
 RANK = "rank"
 PREV = "previous"
+GRADE_POS = "grade position"
+GYM_ID = "gym id"
+WALL_ANGLE = "wall angle"
+PROBLEM_ID = "problem id"
+RESULT = "result"
 
 
 class Achievement(Enum):
@@ -1,6 +1,6 @@
 import re
 from gymstats.helper.names import *
-from gymstats.helper.grade_order import GRADE_ORDER
+from gymstats.helper.grade_order import GRADE_SCALES, scale_for_abv
 
 filter_pattern = re.compile('(?P<key>.*) ?(?P<comparer>(eq|gte|lte|lt|gt|<|>|=|:)) ?(?P<values>.*)')
 
@@ -83,20 +83,19 @@ def parse_filters(raw_filters: str):
     
     # post-processing grades
     if GRADE in parsed and any(map(lambda x: x in parsed[GRADE], ["lt", "gt", "lte", "gte"])):
-        if GYM in parsed:  # TODO: handle special case of gyms from same brand having different grade orders (Bloc Session...)
-            vals = list({elt[:2] for elt in parsed[GYM]["eq"]})
-            if len(vals) > 1:
+        if GYM in parsed:
+            scales = {scale_for_abv(elt) for elt in parsed[GYM]["eq"]}
+            if len(scales) > 1:
                 unparsed.append("several gym brand and comparer on grade can lead to inacurate results")
-                order = GRADE_ORDER["@default"]
+                order = GRADE_SCALES["@default"]
+            elif None in scales:
+                unparsed.append("unknown grade order for gym")
+                order = GRADE_SCALES["@default"]
             else:
-                try:
-                    order = GRADE_ORDER[vals[0]]
-                except KeyError:
-                    unparsed.append("unknown grade order for gym")
-                    order = GRADE_ORDER["@default"]
+                order = scales.pop()
         else:
             unparsed.append("no gym and comparer on grade can lead to inacurate results")
-            order = GRADE_ORDER["@default"]
+            order = GRADE_SCALES["@default"]
         
         # now we have order and can fill "eq"
         res = set()
@@ -141,11 +140,5 @@ def __grades_above(grade, order):
 
 
 def __grades_above_or_below(grade, order, above):
-    try:
-        pos = order.index(grade)
-        if above:
-            return order[pos + 1:]
-        else:
-            return order[:pos]
-    except ValueError:
-        return []
\ No newline at end of file
+    grades = order.above(grade) if above else order.below(grade)
+    return [g.lower() for g in grades]
@@ -0,0 +1,164 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import re
+import threading
+import tracemalloc
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+
+# ?profile=<kind> of the staff requests (see gymstats.middleware.ProfilingMiddleware)
+PROFILE_KINDS = ("cpu", "mem")
+
+# <date>-<time>-<view>.<extension>, cpu profiles are pstats dumps, memory ones JSON
+_PROFILE_NAME = re.compile(r"^(?P<date>\d{8}-\d{6}-\d{6})-(?P<view>[\w.-]+)\.(?P<extension>prof|json)$")
+
+
+class CpuProfiler:
+    """
+    cProfile of the block, saved as a pstats dump (which snakeviz or pstats can open).
+    """
+    kind = "cpu"
+    extension = "prof"
+
+    def __enter__(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+
+    def save(self, path: Path):
+        self.profiler.dump_stats(path)
+
+
+# tracemalloc is global to the process: memory profiles are taken one at a time
+_tracing = threading.Lock()
+
+
+class MemoryProfiler:
+    """
+    tracemalloc of the block: peak of the traced memory and the lines having allocated the memory still held
+    at the end of the block (e.g. cached statistics), saved as JSON.
+    Blocks of concurrent memory profiles wait for each other, allocations of other (unprofiled) threads
+    of the process are traced too.
+    """
+    kind = "mem"
+    extension = "json"
+    frames = 10
+
+    def __enter__(self):
+        _tracing.acquire()
+        try:
+            self.started = not tracemalloc.is_tracing()
+            if self.started:
+                tracemalloc.start(self.frames)
+            tracemalloc.reset_peak()
+            self.before = tracemalloc.take_snapshot()
+        except BaseException:
+            _tracing.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            self.after = tracemalloc.take_snapshot()
+            if self.started:
+                tracemalloc.stop()
+        finally:
+            _tracing.release()
+
+    def save(self, path: Path):
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = self.after.filter_traces(ignored).compare_to(self.before.filter_traces(ignored), "lineno")
+        allocations = [{
+            "function": "{}:{}".format(d.traceback[0].filename, d.traceback[0].lineno),
+            "size_kib": round(d.size_diff / 1024, 1),
+            "count": d.count_diff,
+        } for d in diff if d.size_diff > 0]
+        with open(path, "w") as f:
+            json.dump({"peak_kib": round(self.peak / 1024, 1), "allocations": allocations}, f, indent=2)
+
+
+PROFILERS = {"cpu": CpuProfiler, "mem": MemoryProfiler}
+
+
+@dataclass
+class Profile:
+    name: str  # file name in PROFILES_DIR
+    kind: str
+    view: str
+    date: datetime.datetime
+    size: int  # bytes
+
+
+def profiles_dir() -> Path:
+    return Path(settings.PROFILES_DIR)
+
+
+def save_profile(profiler, view: str) -> str:
+    """
+    Save the profile of a request to *view* in PROFILES_DIR and return its name.
+    """
+    date = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    name = "{}-{}.{}".format(date, re.sub(r"[^\w.-]", ".", view), profiler.extension)
+    os.makedirs(profiles_dir(), exist_ok=True)
+    profiler.save(profiles_dir() / name)
+    return name
+
+
+def _profile(path: Path) -> Optional[Profile]:
+    m = _PROFILE_NAME.match(path.name)
+    if m is None or not path.is_file():
+        return None
+    kind = "cpu" if m.group("extension") == "prof" else "mem"
+    date = datetime.datetime.strptime(m.group("date"), "%Y%m%d-%H%M%S-%f")
+    return Profile(path.name, kind, m.group("view"), date, path.stat().st_size)
+
+
+def list_profiles() -> List[Profile]:
+    """
+    Profiles saved in PROFILES_DIR, latest first.
+    """
+    if not profiles_dir().is_dir():
+        return []
+    profiles = [_profile(path) for path in profiles_dir().iterdir()]
+    return sorted([p for p in profiles if p is not None], key=lambda p: p.date, reverse=True)
+
+
+def get_profile(name: str) -> Optional[Profile]:
+    # names are matched before building the path: no way out of PROFILES_DIR
+    if _PROFILE_NAME.match(name) is None:
+        return None
+    return _profile(profiles_dir() / name)
+
+
+def heaviest_functions(profile: Profile, sort: str = "cumulative", n: int = None) -> List[Dict]:
+    """
+    The *n* (default: PROFILE_TOP_FUNCTIONS) heaviest functions of the profile: by cumulative or own time (*sort*:
+    cumulative or tottime) for cpu profiles, by memory still allocated for memory profiles.
+    """
+    n = n or settings.PROFILE_TOP_FUNCTIONS
+    path = profiles_dir() / profile.name
+    if profile.kind == "mem":
+        with open(path) as f:
+            return json.load(f)["allocations"][:n]
+
+    stats = pstats.Stats(str(path))
+    column = 3 if sort == "cumulative" else 2  # (primitive calls, calls, own time, cumulative time, callers)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)[:n]
+    return [{
+        "function": "{}:{}({})".format(*function) if function[0] != "~" else function[2],
+        "calls": calls if calls == primitive else "{}/{}".format(calls, primitive),
+        "tottime_ms": round(own * 1000, 2),
+        "cumtime_ms": round(cumulative * 1000, 2),
+    } for function, (primitive, calls, own, cumulative, _) in rows]
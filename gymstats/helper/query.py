@@ -1,10 +1,10 @@
 from typing import Dict, List
 from functools import reduce
-from gymstats.models import IndoorBoulder, Footwork, HandHold, ClimbingMove, Climber, Top
+from gymstats.models import IndoorBoulder, Footwork, HandHold, ClimbingMove, Climbable, Climber, Attempt
 from gymstats.helper.names import *
 from gymstats.statistics.base import fisher_overrepr
 from gymstats.statistics.problems import attr_statistics
-from django.db.models import Q, Prefetch
+from django.db.models import Exists, OuterRef, Prefetch, Q, QuerySet
 
 
 
@@ -19,68 +19,88 @@ def query_problems_from_filters(parsed: Dict[str, Dict[str, List[str]]], climber
     """
     query problems given list of parsed filters
     """
-    problems = IndoorBoulder.objects.prefetch_related(Prefetch('tops', queryset=Top.objects.filter(session__climber=climber))).all()
-
-    # TODO: test for statistics change this
     achievement = "all"
-    for key, val in parsed.items():
-        if key in {"top", "fail"}:
+    for key in ("top", "fail"):
+        if key in parsed:
             achievement = key
-            continue
-        problems = _add_filter(problems, key, val)
 
     # filtering on achievement at the end so that we can extract stats
+    filters = {k: v for k, v in parsed.items() if k not in {"top", "fail"}}
+    problems = tagged_problems(IndoorBoulder.objects.filter(compile_filters(filters, climber)))
+
     fisher_stats = {}
     if achievement != "all" and climber:
         superset_stats = attr_statistics(problems)
-        superset_size = len(problems)
-        if achievement == "top":
-            problems = problems.filter(~Q(tops=None))
-        else:
-            problems = problems.filter(Q(tops=None))
+        superset_size = problems.count()
+        problems = problems.filter(compile_filters({achievement: True}, climber))
         subset_stats = attr_statistics(problems)
-        subset_size = len(problems)
+        subset_size = problems.count()
 
         fisher_stats = fisher_overrepr(superset_stats, subset_stats, superset_size, subset_size)
+    elif achievement != "all":
+        problems = problems.filter(compile_filters({achievement: True}, climber))
 
     return problems, fisher_stats
 
 
-def _add_filter(problems, k, v):
+def tagged_problems(problems: QuerySet) -> QuerySet:
+    """
+    Fetch what problems are displayed with (see problem_results.html): climbable, wall angle and gym in the same query,
+    names of their hand holds, footwork and moves in a query each.
+    """
+    return problems.select_related("climbable__wall_angle", "sector__gym") \
+                   .prefetch_related(Prefetch("hand_holds", queryset=HandHold.objects.only("name")),
+                                     Prefetch("footwork", queryset=Footwork.objects.only("name")),
+                                     Prefetch("climbable__moves", queryset=ClimbingMove.objects.only("name")))
 
-    if k in {GRADE, TYPE, GYM}:
-        qs = __build_or_query(v["eq"], k)
-        return problems.filter(reduce(lambda x,y: x | y, qs))
-    elif k in {MOVE, HANDHOLD, FOOTWORK}:  # TODO: is this efficient??
-        attributes = __get_attr_objects(v["eq"], k)
-        subset = reduce(lambda x,y: x|y, [attr.problem_set.all() for attr in attributes])
-        return problems & subset
-    elif k == "top":
-        return problems.filter(~Q(tops=None))
-    elif k == "fail":
-        return problems.filter(Q(tops=None))
-    elif k == DATE:
-        return problems
-    else:
-        return problems
 
+def compile_filters(parsed: Dict[str, Dict[str, List[str]]], climber: Climber = None) -> Q:
+    """
+    Compile parsed filters into a single condition on problems.
+    Values of a same filter are OR-ed and filters are AND-ed. Attributes and achievements
+    are compiled to EXISTS subqueries so that the resulting query never duplicates problems.
+    """
+    conditions = [_compile_filter(k, v, climber) for k, v in parsed.items()]
+    return reduce(lambda x, y: x & y, [c for c in conditions if c is not None], Q())
 
-def __build_or_query(values: List[str], filter: str):
-    if filter == GRADE:
-        return [Q(grade = __to_first_case(elt)) for elt in values]
-    elif filter == TYPE:
-        return [Q(grade = elt) for elt in values]
-    elif filter == GYM:
-        return [Q(gym__abv = elt.upper()) for elt in values]
+
+def explain_query(problems: QuerySet) -> Dict[str, str]:
+    """
+    Return the SQL of the given queryset along with the query plan of the database.
+    """
+    return {
+        "sql": str(problems.query),
+        "plan": problems.explain(),
+    }
+
+
+def _compile_filter(k, v, climber: Climber):
+    if k == GRADE:
+        return Q(climbable__grade__in=[__to_first_case(elt) for elt in v["eq"] if elt])
+    elif k == TYPE:
+        return Q(climbable__wall_angle__name__in=v["eq"])
+    elif k == GYM:
+        return Q(sector__gym__abv__in=[elt.upper() for elt in v["eq"]])
+    elif k in {HANDHOLD, FOOTWORK}:
+        field = "hand_holds" if k == HANDHOLD else "footwork"
+        through = getattr(IndoorBoulder, field).through
+        attr = _attr_map[k].__name__.lower()
+        return Exists(through.objects.filter(indoorboulder_id=OuterRef("pk"), **{attr + "__name__in": v["eq"]}))
+    elif k == MOVE:
+        return Exists(Climbable.moves.through.objects.filter(climbable_id=OuterRef("climbable_id"),
+                                                              climbingmove__name__in=v["eq"]))
+    elif k == "rm":
+        return Q(removed=v)
+    elif k in {"top", "fail"}:
+        tops = Attempt.objects.filter(problem_id=OuterRef("pk"), result=Attempt.Result.TOP)
+        if climber:
+            tops = tops.filter(session__climber=climber)
+        return Exists(tops) if k == "top" else ~Exists(tops)
+    elif k == DATE:
+        return None
     else:
-        # weird: TODO throw Error
         return None
 
 
-def __get_attr_objects(values, filter):
-    query = reduce(lambda x,y: x|y, [Q(name=elt) for elt in values])
-    return _attr_map[filter].objects.filter(query)
-
-
 def __to_first_case(s):
-    return s[0].upper() + s[1:]
\ No newline at end of file
+    return s[0].upper() + s[1:]
@@ -0,0 +1,238 @@
+import bisect
+import datetime
+import itertools
+import math
+import random
+
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+
+from gymstats.models import Attempt, Climbable, ClimbingMove, Climber, Footwork, Gym, HandHold, HardBoulderThreshold
+from gymstats.models import IndoorBoulder, IndoorSector, Session, Shoes, WallAngle
+from gymstats.helper.grade_order import BRAND_TO_ABV, grade_scale
+from gymstats.statistics.first_achievements import refresh_first_achievements
+
+
+WALL_ANGLES = ["slab", "vertical", "overhang", "roof"]
+HAND_HOLDS = ["crimp", "jug", "sloper", "pinch", "pocket", "volume"]
+FOOTWORK = ["smearing", "edging", "heelhook", "toehook"]
+MOVES = ["dyno", "mantle", "compression", "traverse", "coordination"]
+
+# bouldering brands, i.e. all brands but the lead one
+BRANDS = sorted(brand for brand, abv in BRAND_TO_ABV.items() if abv != "lead")
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    """
+    Volume of a synthetic dataset. The default is roughly the volume of a small club over a year:
+    a few gyms whose sectors are reset monthly, and climbers training every other day or so.
+    """
+    gyms: int = 3
+    sectors_per_gym: int = 6
+    problems_per_sector: int = 25  # problems set at once in a sector
+    days: int = 365  # history length, sectors are reset every *reset_days*
+    reset_days: int = 30
+    climbers: int = 2
+    sessions_per_climber: int = 150
+    tries_per_session: int = 20
+
+    def scaled(self, factor: float) -> "DatasetSize":
+        """
+        Size with *factor* times more climbers (hence tries), gyms growing as its square root.
+        """
+        return replace(self, climbers=max(1, round(self.climbers * factor)),
+                       gyms=max(1, math.ceil(self.gyms * math.sqrt(factor))))
+
+
+@dataclass
+class Dataset:
+    """
+    Ids of the generated climbers and gyms along with the number of generated rows.
+    """
+    climbers: List[int] = field(default_factory=list)
+    gyms: List[int] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+@transaction.atomic
+def generate_dataset(size: DatasetSize = DatasetSize(), seed: int = 0,
+                     end: datetime.date = None, prefix: str = "synthetic") -> Dataset:
+    """
+    Generate gyms, sectors, problems (with holds, footwork and moves), climbers (with preferred gyms and
+    hard boulder thresholds) and sessions with tries ending on *end* (default: today), using bulk inserts.
+    The same seed and size always give the same data. Climbers have a level in their gyms' scales:
+    the farther a problem is above it, the less likely they zone or top it and the more attempts they need.
+    Signal receivers are not run: first achievements are refreshed at the end, current statistics and rollups
+    are computed on first access.
+    """
+    rnd = random.Random(seed)
+    end = end or datetime.date.today()
+    start = end - datetime.timedelta(days=size.days - 1)
+    dataset = Dataset()
+
+    walls = [WallAngle.objects.get_or_create(name=name, defaults={"description": ""})[0] for name in WALL_ANGLES]
+    hand_holds = [HandHold.objects.get_or_create(name=name, defaults={"description": ""})[0] for name in HAND_HOLDS]
+    footwork = [Footwork.objects.get_or_create(name=name, defaults={"description": ""})[0] for name in FOOTWORK]
+    moves = [ClimbingMove.objects.get_or_create(name=name, defaults={"description": ""})[0] for name in MOVES]
+
+    # gyms and sectors
+    # gyms are looked up by abbreviation: the ones of existing gyms (e.g. of another dataset) are skipped
+    gyms = []
+    taken = set(Gym.objects.values_list("abv", flat=True))
+    for i in range(size.gyms):
+        brand = BRANDS[i % len(BRANDS)]
+        abv = next(abv for abv in ("{}{}".format(BRAND_TO_ABV[brand], n) for n in itertools.count(i)) if abv not in taken)
+        taken.add(abv)
+        gyms.append(Gym(name="{} gym {}".format(prefix, i), city="City {}".format(i), brand=brand,
+                        abv=abv, location="48.85,2.35"))
+    gyms = Gym.objects.bulk_create(gyms)
+    dataset.gyms = [gym.id for gym in gyms]
+    sectors = IndoorSector.objects.bulk_create(
+        IndoorSector(gym=gym, sector_id=i + 1) for gym in gyms for i in range(size.sectors_per_gym))
+    sector_walls = {s.id: rnd.sample(walls, rnd.randint(1, 2)) for s in sectors}
+    IndoorSector.wall_angles.through.objects.bulk_create(
+        IndoorSector.wall_angles.through(indoorsector_id=s, wallangle_id=w.id)
+        for s, ws in sector_walls.items() for w in ws)
+
+    # problems: sectors are reset every *reset_days*, on a different day for each sector
+    scales = {gym.id: grade_scale(gym) for gym in gyms}
+    batches = []  # (sector, set date, positions in the gym scale), one per sector reset
+    for sector in sectors:
+        day = start - datetime.timedelta(days=rnd.randrange(size.reset_days))
+        while day <= end:
+            n = len(scales[sector.gym_id])
+            positions = [min(n - 1, max(0, round(rnd.triangular(0, n - 1, (n - 1) / 2)))) for _ in range(size.problems_per_sector)]
+            batches.append((sector, day, positions))
+            day += datetime.timedelta(days=size.reset_days)
+
+    climbables = Climbable.objects.bulk_create(
+        Climbable(grade=scales[sector.gym_id].grades[pos], wall_angle=rnd.choice(sector_walls[sector.id]),
+                  picture="climbable/{}.jpg".format(prefix))
+        for sector, _, positions in batches for pos in positions)
+    problems = IndoorBoulder.objects.bulk_create(
+        IndoorBoulder(climbable=climbable, sector=sector, date_added=day,
+                      removed=day + datetime.timedelta(days=size.reset_days) <= end)
+        for climbable, (sector, day, pos) in zip(climbables, _flatten_batches(batches)))
+    _bulk_attributes(rnd, problems, climbables, hand_holds, footwork, moves)
+
+    # problems available in each gym on a given day: the current batch of each of its sectors
+    available = {}  # gym id -> sector -> (sorted set dates, problems of each batch)
+    offset = 0
+    for sector, day, positions in batches:
+        dates, content = available.setdefault(sector.gym_id, {}).setdefault(sector.id, ([], []))
+        dates.append(day)
+        content.append(list(zip(problems[offset:offset + len(positions)], positions)))
+        offset += len(positions)
+
+    # climbers, their sessions and tries
+    shoes = Shoes.objects.create(brand=prefix, name="shoes", size=42, purchase_date=start)
+    climbers = Climber.objects.bulk_create(
+        Climber(name="{} climber {}".format(prefix, i)) for i in range(size.climbers))
+    dataset.climbers = [climber.id for climber in climbers]
+
+    thresholds, tries = [], []
+    sessions = []
+    for climber in climbers:
+        preferred = rnd.sample(gyms, min(len(gyms), rnd.randint(1, 2)))
+        climber.preferred_gyms.set(preferred)
+        level = rnd.uniform(0.35, 0.75)  # relative position in the gyms' scales
+        for gym in preferred:
+            scale = scales[gym.id]
+            pos = round(level * (len(scale) - 1))
+            thresholds.append(HardBoulderThreshold(climber=climber, gym=gym, grade_threshold="{},{}".format(
+                scale.grades[pos], scale.grades[min(len(scale) - 1, pos + 1)])))
+
+        days = sorted(rnd.sample(range(size.days), min(size.days, size.sessions_per_climber)))
+        for day in days:
+            gym = rnd.choice(preferred)
+            session = Session(gym=gym, climber=climber, date=start + datetime.timedelta(days=day),
+                              time=datetime.time(rnd.choice([12, 18, 19, 20])),
+                              duration=Decimal(rnd.choice(["1.00", "1.50", "2.00", "2.50"])),
+                              sleep=Decimal(rnd.choice(["6.0", "7.0", "8.0"])), alcohol=rnd.randint(0, 2),
+                              shoes=shoes, notes="", overall_grade=rnd.randint(2, 8), strength=rnd.randint(2, 8),
+                              motivation=rnd.randint(2, 8), fear=rnd.randint(2, 8))
+            sessions.append((session, level, len(scales[gym.id])))
+
+    Session.objects.bulk_create([s for s, _, _ in sessions])
+    HardBoulderThreshold.objects.bulk_create(thresholds)
+    for session, level, n in sessions:
+        current = _available_problems(available[session.gym_id], session.date)
+        for pb, pos in _pick(rnd, current, level * (n - 1), size.tries_per_session):
+            result, attempts = _try(rnd, (pos - level * (n - 1)) / max(1, n - 1))
+            tries.append(Attempt(session=session, problem=pb, result=result, attempts=attempts))
+    Attempt.objects.bulk_create(tries)
+
+    for climber in climbers:
+        refresh_first_achievements(climber.id)
+
+    dataset.counts = {
+        "gyms": len(gyms),
+        "sectors": len(sectors),
+        "problems": len(problems),
+        "climbers": len(climbers),
+        "sessions": len(sessions),
+        "tries": len(tries),
+    }
+    return dataset
+
+
+def _flatten_batches(batches):
+    for sector, day, positions in batches:
+        for pos in positions:
+            yield sector, day, pos
+
+
+def _bulk_attributes(rnd: random.Random, problems, climbables, hand_holds, footwork, moves):
+    """
+    Hand holds and footwork of the problems, moves of their climbables (1 to 3, 0 to 2 and 0 to 2 of each).
+    """
+    IndoorBoulder.hand_holds.through.objects.bulk_create(
+        IndoorBoulder.hand_holds.through(indoorboulder_id=pb.id, handhold_id=h.id)
+        for pb in problems for h in rnd.sample(hand_holds, rnd.randint(1, 3)))
+    IndoorBoulder.footwork.through.objects.bulk_create(
+        IndoorBoulder.footwork.through(indoorboulder_id=pb.id, footwork_id=f.id)
+        for pb in problems for f in rnd.sample(footwork, rnd.randint(0, 2)))
+    Climbable.moves.through.objects.bulk_create(
+        Climbable.moves.through(climbable_id=c.id, climbingmove_id=m.id)
+        for c in climbables for m in rnd.sample(moves, rnd.randint(0, 2)))
+
+
+def _available_problems(sectors: Dict[int, Tuple[List[datetime.date], List]], day: datetime.date) -> List:
+    problems = []
+    for dates, content in sectors.values():
+        i = bisect.bisect_right(dates, day) - 1
+        if i >= 0:
+            problems.extend(content[i])
+    return problems
+
+
+def _pick(rnd: random.Random, problems: List, level: float, k: int) -> List:
+    """
+    Pick *k* distinct problems, preferably close to the climber level.
+    """
+    weights = [math.exp(-abs(pos - level)) for _, pos in problems]
+    picked = {}
+    for _ in range(4 * k):
+        if len(picked) >= min(k, len(problems)):
+            break
+        pb, pos = rnd.choices(problems, weights)[0]
+        picked[pb.id] = (pb, pos)
+    return list(picked.values())
+
+
+def _try(rnd: random.Random, difficulty: float) -> Tuple[int, int]:
+    """
+    Result and attempts of a try on a problem of the given difficulty relative to the climber level (0: at level).
+    """
+    top = 1 / (1 + math.exp(8 * difficulty))
+    zone = 1 / (1 + math.exp(8 * difficulty - 2))
+    draw = rnd.random()
+    if draw < top:
+        return Attempt.Result.TOP, 1 + int(rnd.expovariate(2.5 * top))
+    if draw < zone:
+        return Attempt.Result.ZONE, 1 + int(rnd.expovariate(1.5))
+    return Attempt.Result.FAIL, 1 + int(rnd.expovariate(1.0))
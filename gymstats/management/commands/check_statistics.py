@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from gymstats.models import Climber
+from gymstats.statistics.incremental import check_statistics, reset_statistics
+
+
+class Command(BaseCommand):
+    help = "Compare incrementally maintained statistics of the current intervals with a full recompute"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--climber", type=int, action="append", dest="climbers",
+                            help="id of the climber to check (default: all climbers)")
+        parser.add_argument("--fix", action="store_true",
+                            help="drop drifting statistics so that they are recomputed on next access")
+
+    def handle(self, *args, **options):
+        climbers = Climber.objects.all()
+        if options["climbers"]:
+            climbers = climbers.filter(id__in=options["climbers"])
+
+        drifting = 0
+        for climber in climbers:
+            drifts = check_statistics(climber)
+            for interval, diff in drifts.items():
+                for key, (incremental, recomputed) in diff.items():
+                    self.stdout.write("{} [interval {}] {}: {} != {}".format(climber, interval, key, incremental, recomputed))
+            if drifts:
+                drifting += 1
+                if options["fix"]:
+                    reset_statistics(climber.id)
+
+        if drifting:
+            self.stdout.write(self.style.WARNING("{} climber(s) with drifting statistics".format(drifting)))
+        else:
+            self.stdout.write(self.style.SUCCESS("statistics are consistent"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from gymstats.models import Climber
+from gymstats.statistics.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Store the statistics of every closed week, month and year of the climbers (run e.g. daily from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--climber", type=int, action="append", dest="climbers",
+                            help="id of the climber to process (default: all climbers)")
+        parser.add_argument("--force", action="store_true",
+                            help="recompute rollups that are already stored")
+
+    def handle(self, *args, **options):
+        climbers = Climber.objects.all()
+        if options["climbers"]:
+            climbers = climbers.filter(id__in=options["climbers"])
+
+        for climber in climbers:
+            written = update_rollups(climber, force=options["force"])
+            self.stdout.write("{}: {} rollup(s) written".format(climber, written))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from gymstats.helper.synthetic import DatasetSize, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Generate a seeded synthetic dataset (gyms, problems, climbers, sessions and tries) in the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1,
+                            help="volume relative to the default size (more climbers and gyms)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--days", type=int, default=DatasetSize.days, help="length of the history")
+        parser.add_argument("--prefix", default="synthetic", help="prefix of the generated names")
+
+    def handle(self, *args, **options):
+        size = DatasetSize(days=options["days"]).scaled(options["scale"])
+        dataset = generate_dataset(size, seed=options["seed"], prefix=options["prefix"])
+        for name, count in dataset.counts.items():
+            self.stdout.write("{}: {}".format(name, count))
+        self.stdout.write(self.style.SUCCESS("climbers: {}".format(", ".join(map(str, dataset.climbers)))))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from gymstats.models import Climber
+from gymstats.statistics.first_achievements import refresh_first_achievements
+
+
+class Command(BaseCommand):
+    help = "Rebuild the first achievements of climbers from their attempts (e.g. after loading fixtures)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--climber", type=int, action="append", dest="climbers",
+                            help="id of the climber to rebuild (default: all climbers)")
+
+    def handle(self, *args, **options):
+        climbers = Climber.objects.all()
+        if options["climbers"]:
+            climbers = climbers.filter(id__in=options["climbers"])
+
+        for climber in climbers:
+            refresh_first_achievements(climber.id)
+            self.stdout.write("{}: {} problems".format(climber, climber.first_achievements.count()))
+        self.stdout.write(self.style.SUCCESS("first achievements rebuilt"))
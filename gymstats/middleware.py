@@ -1,14 +1,132 @@
+import json
+import logging
+import re
+
+from functools import cached_property
+
+from django.conf import settings
+from django.db.models import Prefetch
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from gymstats.helper.profiles import PROFILERS, save_profile
+from gymstats.models import Climber, HardBoulderThreshold
+from gymstats.timing import RequestTimings, record_timings
+
+
+slow_requests = logging.getLogger("gymstats.slow_requests")
+
+# lists of query parameters, e.g. of IN lookups, are shortened in logs
+_PARAMETERS = re.compile(r"%s(, %s)+")
 
 
 class AuthenticationMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
+    @cached_property
+    def login_path(self) -> str:
+        # resolved on first request, once the URLconf is loaded
+        return reverse('gs:login')
+
     def __call__(self, request):
-        if not request.user.is_authenticated  and not request.path.startswith(reverse('gs:login')):
-            return redirect(reverse('gs:login'))
+        if not request.user.is_authenticated  and not request.path.startswith(self.login_path):
+            return redirect(self.login_path)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class ClimberMiddleware:
+    """
+    Attach the climber of the logged in user as `request.climber`, resolved once per request (on first access)
+    with preferred gyms and hard boulder thresholds prefetched.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.climber = SimpleLazyObject(lambda: get_climber(request.user))
+        return self.get_response(request)
+
+
+def get_climber(user) -> Climber:
+    if not user.is_authenticated:
+        return None
+    return Climber.objects.filter(user=user) \
+                          .prefetch_related("preferred_gyms",
+                                            Prefetch("hard_boulders", queryset=HardBoulderThreshold.objects.select_related("gym"))) \
+                          .first()
+
+
+class ServerTimingMiddleware:
+    """
+    Measure each request: total time, queries (count and time), time spent in statistics functions and rendering
+    templates (see gymstats.timing). Timings are sent in a Server-Timing header when SERVER_TIMING is set, and requests
+    slower than SLOW_REQUEST_MS are logged (gymstats.slow_requests) with their SLOW_REQUEST_QUERIES slowest statements.
+    Should come first so that the other middlewares are measured too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_timings() as timings:
+            response = self.get_response(request)
+
+        if getattr(settings, "SERVER_TIMING", False):
+            response["Server-Timing"] = server_timing(timings)
+        threshold = getattr(settings, "SLOW_REQUEST_MS", None)
+        if threshold is not None and timings.total * 1000 >= threshold:
+            record = slow_request_record(request, response, timings, getattr(settings, "SLOW_REQUEST_QUERIES", 5))
+            slow_requests.warning(json.dumps(record), extra={"request_timings": record})
+        return response
+
+
+def server_timing(timings: RequestTimings) -> str:
+    return ", ".join([
+        "total;dur={:.1f}".format(timings.total * 1000),
+        'db;dur={:.1f};desc="{} queries"'.format(timings.db.seconds * 1000, timings.db.queries),
+        'statistics;dur={:.1f};desc="statistics functions, queries excluded"'.format(timings.statistics * 1000),
+        'template;dur={:.1f};desc="rendering, queries excluded"'.format(timings.template * 1000),
+    ])
+
+
+def slow_request_record(request, response, timings: RequestTimings, top_queries: int):
+    match = request.resolver_match
+    return {
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else None,
+        "status": response.status_code,
+        "total_ms": round(timings.total * 1000, 1),
+        "db_ms": round(timings.db.seconds * 1000, 1),
+        "queries": timings.db.queries,
+        "statistics_ms": round(timings.statistics * 1000, 1),
+        "template_ms": round(timings.template * 1000, 1),
+        "functions_ms": {name: round(seconds * 1000, 1) for name, seconds in timings.functions.items()},
+        "slowest_queries": [{"sql": _PARAMETERS.sub("%s, ...", sql), "ms": round(seconds * 1000, 2)}
+                            for sql, seconds in timings.slowest_queries(top_queries)],
+    }
+
+
+class ProfilingMiddleware:
+    """
+    Profile the view of the staff requests with a ?profile=cpu (cProfile) or ?profile=mem (tracemalloc) query
+    parameter. Profiles are saved in PROFILES_DIR, listed on the profiles page, and the response links to its profile
+    in a X-Profile header. Should come last so that only the view is profiled.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = PROFILERS.get(request.GET.get("profile"))
+        if profiler is None or not request.user.is_staff:
+            return self.get_response(request)
+
+        with profiler() as profile:
+            response = self.get_response(request)
+        match = request.resolver_match
+        name = save_profile(profile, match.view_name if match else "unresolved")
+        response["X-Profile"] = reverse("gs:profile", args=[name])
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gymstats", "0044_remove_indoorboulder_gym"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="intervalstatistics",
+            constraint=models.UniqueConstraint(
+                fields=("climber", "interval", "year", "interval_id"),
+                name="unique_climber_interval",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.7 on 2026-10-18 14:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import picklefield.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gymstats", "0045_intervalstatistics_unique_climber_interval"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CurrentStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "interval",
+                    models.IntegerField(
+                        choices=[(1, "Week"), (2, "Month"), (3, "Year")]
+                    ),
+                ),
+                ("interval_id", models.IntegerField()),
+                ("year", models.IntegerField()),
+                (
+                    "problems",
+                    picklefield.fields.PickledObjectField(default=dict, editable=False),
+                ),
+                (
+                    "counters",
+                    picklefield.fields.PickledObjectField(default=dict, editable=False),
+                ),
+                (
+                    "climber",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current_statistics",
+                        to="gymstats.climber",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="currentstatistics",
+            constraint=models.UniqueConstraint(
+                fields=("climber", "interval"), name="unique_climber_current_interval"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.1.7 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gymstats", "0046_currentstatistics"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="gym",
+            name="abv",
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name="failure",
+            index=models.Index(
+                fields=["session", "problem"], name="gymstats_failure_sess_pb"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="failure",
+            index=models.Index(
+                fields=["problem", "session"], name="gymstats_failure_pb_sess"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="indoorboulder",
+            index=models.Index(
+                fields=["sector", "removed"], name="indoorboulder_sector_removed"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="indoorboulder",
+            index=models.Index(
+                condition=models.Q(("removed", False)),
+                fields=["sector"],
+                name="indoorboulder_current",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(fields=["climber", "date"], name="session_climber_date"),
+        ),
+        migrations.AddIndex(
+            model_name="top",
+            index=models.Index(
+                fields=["session", "problem"], name="gymstats_top_sess_pb"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="top",
+            index=models.Index(
+                fields=["problem", "session"], name="gymstats_top_pb_sess"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="zone",
+            index=models.Index(
+                fields=["session", "problem"], name="gymstats_zone_sess_pb"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="zone",
+            index=models.Index(
+                fields=["problem", "session"], name="gymstats_zone_pb_sess"
+            ),
+        ),
+    ]
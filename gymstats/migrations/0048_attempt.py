@@ -0,0 +1,139 @@
+# Generated by Django 4.1.7 on 2026-10-18 15:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# result of the attempts copied from each of the former tables
+RESULTS = {
+    "Failure": 0,
+    "Zone": 1,
+    "Top": 2,
+}
+
+
+def merge_tries(apps, schema_editor):
+    """
+    Copy tops, zones and failures into the attempt table. Tries of a same problem during a session
+    are merged into a single attempt keeping the best result and the total number of attempts.
+    """
+    Attempt = apps.get_model("gymstats", "Attempt")
+    merged = {}
+    for name, result in RESULTS.items():
+        model = apps.get_model("gymstats", name)
+        for session_id, problem_id, attempts in model.objects.values_list("session_id", "problem_id", "attempts"):
+            best, total = merged.get((session_id, problem_id), (result, 0))
+            merged[(session_id, problem_id)] = (max(best, result), total + attempts)
+    Attempt.objects.bulk_create(
+        Attempt(session_id=session_id, problem_id=problem_id, result=result, attempts=attempts)
+        for (session_id, problem_id), (result, attempts) in merged.items()
+    )
+
+
+def split_attempts(apps, schema_editor):
+    Attempt = apps.get_model("gymstats", "Attempt")
+    for name, result in RESULTS.items():
+        model = apps.get_model("gymstats", name)
+        model.objects.bulk_create(
+            model(session_id=session_id, problem_id=problem_id, attempts=attempts)
+            for session_id, problem_id, attempts in Attempt.objects.filter(result=result)
+                                                                   .values_list("session_id", "problem_id", "attempts")
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gymstats", "0047_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Attempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "result",
+                    models.IntegerField(choices=[(0, "Fail"), (1, "Zone"), (2, "Top")]),
+                ),
+                ("attempts", models.IntegerField(default=1)),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="attempts",
+                        to="gymstats.indoorboulder",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="attempts",
+                        to="gymstats.session",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-session__date", "problem__climbable__grade"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="attempt",
+            index=models.Index(fields=["problem", "session"], name="attempt_pb_sess"),
+        ),
+        migrations.AddConstraint(
+            model_name="attempt",
+            constraint=models.UniqueConstraint(
+                fields=("session", "problem"), name="unique_session_problem"
+            ),
+        ),
+        migrations.RunPython(merge_tries, split_attempts),
+        migrations.DeleteModel(
+            name="Failure",
+        ),
+        migrations.DeleteModel(
+            name="Top",
+        ),
+        migrations.DeleteModel(
+            name="Zone",
+        ),
+        migrations.CreateModel(
+            name="Failure",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("gymstats.attempt",),
+        ),
+        migrations.CreateModel(
+            name="Top",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("gymstats.attempt",),
+        ),
+        migrations.CreateModel(
+            name="Zone",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("gymstats.attempt",),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.1.7 on 2026-10-18 15:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# statistics.first_achievements.FIRST_ACHIEVEMENTS_SQL for all climbers, as of this migration
+POPULATE_SQL = """
+INSERT INTO gymstats_firstachievement
+    (climber_id, problem_id, first_try, first_zone, first_top, zone_attempts, top_attempts)
+SELECT climber_id, problem_id,
+       MIN(date),
+       MIN(CASE WHEN result >= 1 THEN date END),
+       MIN(CASE WHEN result >= 2 THEN date END),
+       MIN(CASE WHEN result >= 1 THEN cumulated END),
+       MIN(CASE WHEN result >= 2 THEN cumulated END)
+FROM (
+    SELECT s.climber_id, a.problem_id, s.date, a.result,
+           SUM(a.attempts) OVER (PARTITION BY s.climber_id, a.problem_id ORDER BY s.date, s.id
+                                 ROWS UNBOUNDED PRECEDING) AS cumulated
+    FROM gymstats_attempt a JOIN gymstats_session s ON s.id = a.session_id
+) tries
+GROUP BY climber_id, problem_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gymstats", "0048_attempt"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FirstAchievement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_try", models.DateField()),
+                ("first_zone", models.DateField(null=True)),
+                ("first_top", models.DateField(null=True)),
+                ("zone_attempts", models.IntegerField(null=True)),
+                ("top_attempts", models.IntegerField(null=True)),
+                (
+                    "climber",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="first_achievements",
+                        to="gymstats.climber",
+                    ),
+                ),
+                (
+                    "problem",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="gymstats.indoorboulder",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="firstachievement",
+            index=models.Index(fields=["climber", "first_try"], name="first_try_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="firstachievement",
+            index=models.Index(fields=["climber", "first_zone"], name="first_zone_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="firstachievement",
+            index=models.Index(fields=["climber", "first_top"], name="first_top_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="firstachievement",
+            constraint=models.UniqueConstraint(
+                fields=("climber", "problem"), name="unique_climber_first_achievement"
+            ),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.7 on 2026-10-18 15:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gymstats", "0049_first_achievement"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="climber",
+            name="stats_modified",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddField(
+            model_name="climber",
+            name="stats_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="stats_modified",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="stats_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -8,6 +8,7 @@ from collections import defaultdict
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 from django.utils.html import format_html
 
 from enum import Enum
@@ -16,8 +17,9 @@ from picklefield.fields import PickledObjectField
 from typing import Any,  Dict, List, Union
 
 from gymstats.helper.utils import rand_name
-from gymstats.helper.grade_order import grades_list, FONT_SCALE
+from gymstats.helper.grade_order import grade_scale, FONT_SCALE
 from gymstats.helper.names import Rank
+from gymstats.timing import timed
 
 
 ### CLIMBING PLACES ###
@@ -49,7 +51,7 @@ class Gym(ClimbingPlace):
     """
     city = models.CharField(max_length=100)
     brand = models.CharField(max_length=100)
-    abv = models.CharField(max_length=10)
+    abv = models.CharField(max_length=10, db_index=True)  # not unique, but looked up by gym pages and problem filters
 
     # location = PlainLocationField(based_fields=['city'], zoom=12)
 
@@ -88,7 +90,26 @@ class ShoesFixing(models.Model):
 
 ### USERS & STATS ###
 
-class Climber(models.Model):
+class StatsVersioned:
+    """
+    Models carrying the version of the data statistics are computed from (stats_version, stats_modified).
+    The version is only changed by queryset updates (see gymstats.cache): saving an existing instance
+    never writes back the version loaded with it.
+    """
+    VERSION_FIELDS = ("stats_version", "stats_modified")
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [f.attname for f in self._meta.concrete_fields
+                                 if not f.primary_key and f.attname not in deferred]
+            kwargs["update_fields"] = [f for f in update_fields if f not in self.VERSION_FIELDS]
+        super().save(*args, **kwargs)
+
+
+class Climber(StatsVersioned, models.Model):
 
     def upload_picture(instance, filename):
         _, ext = os.path.splitext(filename)
@@ -112,12 +133,27 @@ class Climber(models.Model):
 
     preferred_gyms = models.ManyToManyField(Gym, blank=True, verbose_name="My Gyms")
 
+    # version of the data statistics are computed from, bumped when changes are committed (see gymstats.cache)
+    stats_version = models.PositiveIntegerField(default=0, editable=False)
+    stats_modified = models.DateTimeField(default=timezone.now, editable=False)
+
     def thresholds(self) -> Dict[Gym, List[int]]:
+        """
+        Positions of the climber hard boulder thresholds in the scale of each gym.
+        When thresholds are prefetched (see ClimberMiddleware), positions are computed once and kept along.
+        """
+        prefetched = getattr(self, "_prefetched_objects_cache", {}).get("hard_boulders")
+        if prefetched is not None and getattr(prefetched, "_threshold_positions", None) is not None:
+            return prefetched._threshold_positions
+
         thresholds = {}
-        for th in self.hard_boulders.all():
-            order = grades_list(th.gym, default=True)
-            positions = [order.index(g) for g in th.grade_threshold.split(',') if g in order]
-            thresholds[th.gym] = sorted(positions)
+        hard_boulders = prefetched if prefetched is not None else self.hard_boulders.select_related("gym")
+        for th in hard_boulders:
+            scale = grade_scale(th.gym, default=True)
+            positions = [scale.position(g) for g in th.grade_threshold.split(',')]
+            thresholds[th.gym] = sorted(pos for pos in positions if pos is not None)
+        if prefetched is not None:
+            prefetched._threshold_positions = thresholds
         return thresholds
 
     def __str__(self) -> str:
@@ -138,6 +174,33 @@ class IntervalStatistics(models.Model):
     interval = models.IntegerField(choices=Intervals.choices)
     args = PickledObjectField()  # various statistics: hard boulder threshold, training time, hard boulders, ...
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["climber", "interval", "year", "interval_id"], name="unique_climber_interval"),
+        ]
+
+    def __str__(self) -> str:
+        return "{} - {} {}/{}".format(self.climber, self.get_interval_display(), self.interval_id, self.year)
+
+
+class CurrentStatistics(models.Model):
+    """
+    Statistics of the current (still open) interval of a climber, kept up to date incrementally.
+    """
+    climber = models.ForeignKey(Climber, on_delete=models.CASCADE, related_name="current_statistics")
+
+    interval = models.IntegerField(choices=IntervalStatistics.Intervals.choices)
+    interval_id = models.IntegerField()
+    year = models.IntegerField()
+
+    problems = PickledObjectField(default=dict)  # summary row of each problem tried during the interval
+    counters = PickledObjectField(default=dict)  # training time, attempts, new tops, achievements by rank, ...
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["climber", "interval"], name="unique_climber_current_interval"),
+        ]
+
 
 class HardBoulderThreshold(models.Model):
     climber = models.ForeignKey(Climber, on_delete=models.CASCADE, related_name="hard_boulders")
@@ -278,6 +341,11 @@ class IndoorBoulder(models.Model):
 
     class Meta:
         ordering = ["-date_added", "climbable__grade"]
+        indexes = [
+            models.Index(fields=["sector", "removed"], name="indoorboulder_sector_removed"),
+            # problems currently in gyms
+            models.Index(fields=["sector"], condition=models.Q(removed=False), name="indoorboulder_current"),
+        ]
 
     hand_holds = models.ManyToManyField(HandHold, blank=True)
     footwork = models.ManyToManyField(Footwork, blank=True)
@@ -306,12 +374,15 @@ class IndoorBoulder(models.Model):
         """
         Return the rank of the climbable given climber preferences and thresholds
         """
+        if not threhold_positions or self.sector is None:
+            return Rank.UNK
         try:
-            order = grades_list(self.gym, default=False)
-            expected_levels = threhold_positions[self.gym]
-            if len(expected_levels) == 0 or not order:
+            gym = self.sector.gym
+            scale = grade_scale(gym, default=False)
+            expected_levels = threhold_positions[gym]
+            grade_pos = scale.position(self.climbable.grade) # position of problem grade in the scale
+            if len(expected_levels) == 0 or grade_pos is None:
                 return Rank.UNK
-            grade_pos = order.index(self.climbable.grade) # position of problem grade in the scale
             if grade_pos < expected_levels[0]:
                 return Rank.LOWER
             if grade_pos > expected_levels[-1]:
@@ -399,10 +470,13 @@ class Review(models.Model):
         return "[{}] ({}): {}".format(self.reviewer, self.problem, self.comment)
 
 
-class Session(models.Model):
+class Session(StatsVersioned, models.Model):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["climber", "date"], name="session_climber_date"),
+        ]
     
     # session info
     gym = models.ForeignKey(Gym, on_delete=models.PROTECT)  # PROTECT: cannot remove a gym where sessions took place
@@ -440,36 +514,53 @@ class Session(models.Model):
     motivation = models.IntegerField(choices=Grade.choices)
     fear = models.IntegerField(choices=Grade.choices) 
 
+    # version of the tries of the session, bumped when changes are committed (see gymstats.cache)
+    stats_version = models.PositiveIntegerField(default=0, editable=False)
+    stats_modified = models.DateTimeField(default=timezone.now, editable=False)
+
     def __str__(self) -> str:
         return "{} - {}".format(self.gym, self.date)
     
+    @timed
     def statistics(self):
+        """
+        Success rate and problems (wall angles, grades, hand holds) tried during the session.
+        Tries are loaded with their problem, climbable and wall angle, hand holds in a single extra query.
+        """
+        tries = list(self.attempts.select_related("problem__climbable__wall_angle"))
+        tops = [t for t in tries if t.result == Attempt.Result.TOP]
+        others = [t for t in tries if t.result != Attempt.Result.TOP]
+
         ## general data
         # percentage of successes
-        tops = self.tops.count()
-        fails = self.failures.count() + self.zones.count()
-        total = tops + fails
-        successes = math.floor(tops * 100/ total) if total > 0 else "??"
+        total = len(tops) + len(others)
+        successes = math.floor(len(tops) * 100/ total) if total > 0 else "??"
 
         # problems specific data
             # types, grades, holds
         pb_types = defaultdict(lambda: [0,0])
         pb_grades = defaultdict(lambda: [0,0])
 
-        grades = grades_list(self.gym, default=False)
+        grades = grade_scale(self.gym, default=False)
         if grades:
             pb_grades = { elt: [0,0] for elt in grades }
         pb_holds = defaultdict(lambda: [0,0])
 
+        hand_holds = defaultdict(list)
+        for pid, name in IndoorBoulder.hand_holds.through.objects \
+                .filter(indoorboulder_id__in={t.problem_id for t in tops + others}) \
+                .values_list("indoorboulder_id", "handhold__name"):
+            hand_holds[pid].append(name)
+
         def _add(t, pos: int):
-            pb_types[str(t.problem.wall_angle)][pos] += 1
-            pb_grades[str(t.problem.grade)][pos] += 1
-            for hh in t.problem.hand_holds.all():
-                pb_holds[str(hh)][pos] += 1
+            pb_types[str(t.problem.climbable.wall_angle)][pos] += 1
+            pb_grades[str(t.problem.climbable.grade)][pos] += 1
+            for hh in hand_holds[t.problem_id]:
+                pb_holds[hh][pos] += 1
 
-        for t in self.tops.all():
+        for t in tops:
             _add(t, 0)
-        for t in itertools.chain(self.failures.all(), self.zones.all()):
+        for t in others:
             _add(t, 1)
 
         pb_grades = { k: v for k,v in pb_grades.items() if sum(v) > 0 }
@@ -482,45 +573,123 @@ class Session(models.Model):
 
             # pb specific
             'problems': {
-                'types': pb_types,
-                'grades': pb_grades,
-                'holds': pb_holds
+                'types': dict(pb_types),
+                'grades': dict(pb_grades),
+                'holds': dict(pb_holds)
             }
         }
         return data
 
 
-class Try(models.Model):
-
-    session = models.ForeignKey(Session, on_delete=models.PROTECT, related_name="%(class)ss")
-    problem = models.ForeignKey(IndoorBoulder, on_delete=models.PROTECT, related_name="%(class)ss")
+class Attempt(models.Model):
+    """
+    Attempts of a climber on a problem during a session, along with the best result obtained.
+    """
+    class Result(models.IntegerChoices):
+        FAIL = 0
+        ZONE = 1
+        TOP = 2
+
+    session = models.ForeignKey(Session, on_delete=models.PROTECT, related_name="attempts")
+    problem = models.ForeignKey(IndoorBoulder, on_delete=models.PROTECT, related_name="attempts")
+    result = models.IntegerField(choices=Result.choices)
     attempts = models.IntegerField(default=1)
     
     def name(self):
         return self.session.date.strftime("%d/%m/%y") + " " + str(self.problem)
 
     def pb_grade(self):
-        return self.problem.grade
+        return self.problem.climbable.grade
 
     class Meta:
-        abstract = True
         ordering = ["-session__date", "problem__climbable__grade"]
-    
-
-class Top(Try):
+        constraints = [
+            models.UniqueConstraint(fields=["session", "problem"], name="unique_session_problem"),
+        ]
+        indexes = [
+            models.Index(fields=["problem", "session"], name="attempt_pb_sess"),
+        ]
 
     def __str__(self) -> str:
-        start = "[FLASH] - " if self.attempts == 1 else "[TOP] - "
+        if self.result == Attempt.Result.TOP:
+            start = "[FLASH] - " if self.attempts == 1 else "[TOP] - "
+        else:
+            start = "[FAIL] - " if self.result == Attempt.Result.FAIL else "[ZONE] - "
         return start + self.name()
 
 
-class Failure(Try):
-    
-    def __str__(self) -> str:
-        return "[FAIL] - " + self.name()
+class AttemptResultManager(models.Manager):
+    """
+    Manager of the attempts with a given result.
+    """
+    def __init__(self, result: int):
+        super().__init__()
+        self.result = result
 
+    def get_queryset(self):
+        return super().get_queryset().filter(result=self.result)
 
-class Zone(Try):
 
-    def __str__(self) -> str:
-        return "[ZONE] - " + self.name()
+class ResultProxy:
+    """
+    Attempts with a fixed result: tops, zones and failures used to be stored in their own tables.
+    """
+    RESULT = None
+
+    def save(self, *args, **kwargs):
+        self.result = self.RESULT
+        super().save(*args, **kwargs)
+
+
+class Top(ResultProxy, Attempt):
+    RESULT = Attempt.Result.TOP
+    objects = AttemptResultManager(RESULT)
+
+    class Meta:
+        proxy = True
+
+
+class Failure(ResultProxy, Attempt):
+    RESULT = Attempt.Result.FAIL
+    objects = AttemptResultManager(RESULT)
+
+    class Meta:
+        proxy = True
+
+
+class Zone(ResultProxy, Attempt):
+    RESULT = Attempt.Result.ZONE
+    objects = AttemptResultManager(RESULT)
+
+    class Meta:
+        proxy = True
+
+
+class FirstAchievement(models.Model):
+    """
+    First try, zone and top of a climber on a problem, along with the attempts needed to zone and top
+    (attempts of every session up to the achievement). Projection of the attempts kept up to date by signal receivers,
+    see statistics.first_achievements.
+    """
+    climber = models.ForeignKey(Climber, on_delete=models.CASCADE, related_name="first_achievements")
+    problem = models.ForeignKey(IndoorBoulder, on_delete=models.CASCADE, related_name="+")
+
+    first_try = models.DateField()
+    first_zone = models.DateField(null=True)
+    first_top = models.DateField(null=True)
+    zone_attempts = models.IntegerField(null=True)
+    top_attempts = models.IntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["climber", "problem"], name="unique_climber_first_achievement"),
+        ]
+        indexes = [
+            models.Index(fields=["climber", "first_try"], name="first_try_idx"),
+            models.Index(fields=["climber", "first_zone"], name="first_zone_idx"),
+            models.Index(fields=["climber", "first_top"], name="first_top_idx"),
+        ]
+
+    @property
+    def flash(self) -> bool:
+        return self.top_attempts == 1
@@ -0,0 +1,134 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from gymstats.cache import bump_climber_version, bump_session_version
+from gymstats.models import Session, Attempt, Top, Zone, Failure, HardBoulderThreshold, Climbable, IndoorBoulder
+from gymstats.statistics.rollups import invalidate_rollups, reset_rollups
+from gymstats.statistics.first_achievements import refresh_first_achievements
+from gymstats.statistics.incremental import problem_changed, problems_regraded, rerank_statistics, reset_statistics
+from gymstats.statistics.incremental import sessions_changed
+
+
+@receiver(pre_save, sender=Session)
+def session_moved(sender, instance, raw=False, **kwargs):
+    """
+    Invalidate statistics of the previous date/climber when a session is moved.
+    """
+    if raw or instance.pk is None:
+        return
+    previous = Session.objects.filter(pk=instance.pk).values_list("climber_id", "date").first()
+    instance._previous = previous
+    if previous and previous != (instance.climber_id, instance.date):
+        invalidate_rollups(*previous)
+        bump_climber_version(previous[0])
+        reset_statistics(previous[0])
+        reset_statistics(instance.climber_id)
+
+
+@receiver([post_save, post_delete], sender=Session)
+def session_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_climber_version(instance.climber_id)
+    bump_session_version(instance.id)
+    invalidate_rollups(instance.climber_id, instance.date)
+    sessions_changed(instance.climber_id, instance.date)
+
+    # first achievements on the problems of a moved session
+    previous = getattr(instance, "_previous", None)
+    if previous and previous != (instance.climber_id, instance.date):
+        problem_ids = set(Attempt.objects.filter(session_id=instance.id).values_list("problem_id", flat=True))
+        refresh_first_achievements(instance.climber_id, problem_ids)
+        if previous[0] != instance.climber_id:
+            refresh_first_achievements(previous[0], problem_ids)
+
+
+# tops, zones and failures are proxies of Attempt: their signals are sent with the proxy as sender
+@receiver(pre_save, sender=Attempt)
+@receiver(pre_save, sender=Top)
+@receiver(pre_save, sender=Zone)
+@receiver(pre_save, sender=Failure)
+def try_moved(sender, instance, raw=False, **kwargs):
+    """
+    Keep track of the previous session/problem of an edited try.
+    """
+    if raw or instance.pk is None:
+        return
+    instance._previous = Attempt.objects.filter(pk=instance.pk).values_list("session_id", "problem_id").first()
+
+
+@receiver([post_save, post_delete], sender=Attempt)
+@receiver([post_save, post_delete], sender=Top)
+@receiver([post_save, post_delete], sender=Zone)
+@receiver([post_save, post_delete], sender=Failure)
+def try_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    session = instance.session
+    bump_climber_version(session.climber_id)
+    bump_session_version(session.id)
+    invalidate_rollups(session.climber_id, session.date)
+    problem_changed(session.climber_id, instance.problem_id, session.date)
+    refresh_first_achievements(session.climber_id, [instance.problem_id])
+
+    previous = getattr(instance, "_previous", None)
+    if previous and previous != (instance.session_id, instance.problem_id):
+        session = Session.objects.get(id=previous[0])
+        bump_climber_version(session.climber_id)
+        bump_session_version(session.id)
+        invalidate_rollups(session.climber_id, session.date)
+        problem_changed(session.climber_id, previous[1], session.date)
+        refresh_first_achievements(session.climber_id, [previous[1]])
+
+
+@receiver([post_save, post_delete], sender=HardBoulderThreshold)
+def threshold_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_climber_version(instance.climber_id)
+    reset_rollups([instance.climber_id])
+    rerank_statistics(instance.climber_id)
+
+
+@receiver(pre_save, sender=Climbable)
+def climbable_moved(sender, instance, raw=False, **kwargs):
+    """
+    Keep track of the previous grade of an edited climbable.
+    """
+    if raw or instance.pk is None:
+        return
+    instance._previous = Climbable.objects.filter(pk=instance.pk).values_list("grade", flat=True).first()
+
+
+@receiver(post_save, sender=Climbable)
+def climbable_changed(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if raw or previous is None or previous == instance.grade:
+        return
+    _problems_regraded(IndoorBoulder.objects.filter(climbable=instance).values_list("id", flat=True))
+
+
+@receiver(pre_save, sender=IndoorBoulder)
+def problem_moved(sender, instance, raw=False, **kwargs):
+    """
+    Keep track of the previous sector of an edited problem.
+    """
+    if raw or instance.pk is None:
+        return
+    instance._previous = IndoorBoulder.objects.filter(pk=instance.pk).values_list("sector_id", flat=True).first()
+
+
+@receiver(post_save, sender=IndoorBoulder)
+def problem_edited(sender, instance, raw=False, **kwargs):
+    if raw or not hasattr(instance, "_previous") or instance._previous == instance.sector_id:
+        return
+    _problems_regraded([instance.id])
+
+
+def _problems_regraded(problem_ids):
+    # ranks depend on the grade and gym of the problems: rollups and incremental statistics are recomputed
+    # on next access
+    climber_ids = problems_regraded(list(problem_ids))
+    reset_rollups(climber_ids)
+    for climber_id in climber_ids:
+        bump_climber_version(climber_id)
@@ -0,0 +1,107 @@
+import datetime
+
+from decimal import Decimal
+from functools import cached_property
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from gymstats.models import Climber, Session
+from gymstats.helper.names import DATE, PROBLEM_ID, RESULT
+from gymstats.statistics.gym import current_problems_achievements
+from gymstats.statistics.incremental import df_to_rows, displayed_statistics, rows_counters, up_to_date_statistics
+from gymstats.statistics.rollups import interval_bounds
+from gymstats.statistics.frame import AttemptFrame, load_try_frame
+from gymstats.statistics.sessions import base_sessions_stats, previous_achievements
+from gymstats.timing import timed
+
+
+class ClimberAnalytics:
+    """
+    Statistics context of a climber: sessions and tries are loaded once (lazily) and then sliced
+    to serve all-time, current intervals and by-gym statistics, whatever the number of gyms or sessions.
+    Tries are loaded from the start of the current year.
+    """
+
+    def __init__(self, climber: Climber, today: datetime.date = None):
+        self.climber = climber
+        self.today = today or datetime.date.today()
+
+    @cached_property
+    def sessions(self) -> List[Session]:
+        return list(Session.objects.filter(climber=self.climber).order_by("date")
+                                   .only("id", "date", "duration", "gym", "climber"))
+
+    @cached_property
+    def thresholds(self):
+        return self.climber.thresholds()
+
+    @cached_property
+    def gyms(self):
+        return list(self.climber.preferred_gyms.all())
+
+    @cached_property
+    def current_statistics(self):
+        return {c.interval: c for c in self.climber.current_statistics.all()}
+
+    @cached_property
+    def start(self) -> datetime.date:
+        return self.today.replace(month=1, day=1)
+
+    @cached_property
+    def tries(self) -> pd.DataFrame:
+        return load_try_frame([s for s in self.sessions if s.date >= self.start])
+
+    @cached_property
+    def previous(self) -> Dict[int, int]:
+        """
+        Best achievements on problems tried since *start*, before *start*
+        """
+        problem_ids = self.tries[PROBLEM_ID].unique().tolist()
+        if not problem_ids:
+            return {}
+        return previous_achievements({self.climber.id}, problem_ids, self.start)
+
+    @timed
+    def summary(self, start: datetime.date, end: datetime.date) -> AttemptFrame:
+        """
+        Summary DataFrame of the tries between *start* and *end* (see sessions_to_pandas),
+        *start* must not be earlier than the loaded history.
+        """
+        if start < self.start:
+            raise ValueError("tries are only loaded from {}".format(self.start))
+        previous = dict(self.previous)
+        dates = self.tries[DATE]
+        earlier = self.tries[dates < pd.Timestamp(start)]
+        for pid, level in earlier.groupby(PROBLEM_ID)[RESULT].max().items():
+            previous[int(pid)] = max(int(level), previous.get(int(pid), -1))
+        tries = self.tries[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))]
+        return AttemptFrame.from_tries(tries, self.thresholds, previous)
+
+    @timed
+    def all_time(self) -> Dict[str, Any]:
+        return base_sessions_stats(self.sessions)
+
+    @timed
+    def interval(self, interval: int) -> Dict[str, Any]:
+        """
+        Counters of the current interval of the given kind. Incrementally maintained counters
+        are used when up to date, otherwise they are computed from the loaded tries and stored.
+        """
+        def compute(year: int, interval_id: int):
+            start, end = interval_bounds(interval, year, interval_id)
+            sessions = [s for s in self.sessions if start <= s.date <= end]
+            problems = df_to_rows(self.summary(start, end))
+            return problems, rows_counters(problems, len(sessions), sum((s.duration for s in sessions), Decimal(0)))
+
+        current = up_to_date_statistics(self.climber, interval, self.today, self.current_statistics.get(interval), compute)
+        self.current_statistics[interval] = current
+        return displayed_statistics(current)
+
+    @timed
+    def by_gym(self, handle_unk: str = "keep") -> Dict[str, Dict[str, Any]]:
+        """
+        Achievements on problems currently in each of the climber's gyms, by grade.
+        """
+        by_gym = current_problems_achievements(self.gyms, self.climber, handle_unk)
+        return {str(gym): result for gym, result in by_gym.items()}
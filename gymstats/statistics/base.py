@@ -1,19 +1,27 @@
-from scipy.stats import fisher_exact
+import numpy as np
+
 from typing import Dict, List,  Tuple
 
+from gymstats.statistics.contingency import contingency_tests, FISHER
+from gymstats.timing import timed
+
 
+@timed
 def fisher_overrepr(superset_stats: Dict, subset_stats: Dict, superset_size: int,
                     subset_size: int, maxpvalue: float = 0.4, topk: int = 3) -> Dict[str, List[Tuple[str, float, float]]]:
     results = {}
     for attr in superset_stats: 
-        current = []
-        for val in superset_stats[attr]:
-            superset_occ = superset_stats[attr][val]
-            subset_occ = subset_stats[attr][val]  # should always work if we use defaultdict
+        values = list(superset_stats[attr])
+        superset_occ = np.array([superset_stats[attr][val] for val in values], dtype=np.int64)
+        subset_occ = np.array([subset_stats[attr][val] for val in values], dtype=np.int64)  # should always work if we use defaultdict
 
-            fisher_stat = fisher_exact([[subset_occ, superset_occ], [subset_size - subset_occ, superset_size - superset_occ]])
-            if fisher_stat.pvalue < maxpvalue and fisher_stat.statistic != float("+inf") and fisher_stat.statistic > 1:
-                current.append((val, fisher_stat.statistic, fisher_stat.pvalue))
+        # all Fisher exact tests of the attribute at once
+        tables = np.stack([subset_occ, superset_occ, subset_size - subset_occ, superset_size - superset_occ], axis=-1)
+        pvalues, statistics = contingency_tests(tables.reshape(-1, 2, 2), FISHER)
+
+        current = []
+        for val, statistic, pvalue in zip(values, statistics, pvalues):
+            if pvalue < maxpvalue and statistic != float("+inf") and statistic > 1:
+                current.append((val, statistic, pvalue))
         results[attr] = sorted(current, key=lambda t: t[1], reverse=True)[:topk]
     return results
-
@@ -0,0 +1,110 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.stats import chi2, hypergeom
+
+
+CHI2 = "chi2"
+FISHER = "fisher"
+GTEST = "g-test"
+
+TESTS = {CHI2, FISHER, GTEST}
+
+
+def contingency_tables(grp: np.ndarray, features: np.ndarray) -> np.ndarray:
+    """
+    Build the 2x2 contingency table of every feature against the given group vector.
+    *grp* is a boolean vector of size n and *features* a boolean (n, f) matrix.
+    Tables have shape (f, 2, 2) and follow pd.crosstab(feature, grp) layout:
+    [[~feature & ~grp, ~feature & grp], [feature & ~grp, feature & grp]]
+    """
+    grp = np.asarray(grp, dtype=bool)
+    features = np.asarray(features, dtype=bool)
+    tables = np.empty((features.shape[1], 2, 2), dtype=np.int64)
+    tables[:, 1, 1] = features[grp].sum(axis=0)
+    tables[:, 1, 0] = features[~grp].sum(axis=0)
+    tables[:, 0, 1] = grp.sum() - tables[:, 1, 1]
+    tables[:, 0, 0] = (~grp).sum() - tables[:, 1, 0]
+    return tables
+
+
+def contingency_tests(tables: np.ndarray, test: str = CHI2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the p-values and odds ratios of a stack of (f, 2, 2) contingency tables at once.
+    *test* is either a chi2 test (as scipy chi2_contingency), a G-test (log-likelihood ratio,
+    same Yates correction) or a two-sided Fisher exact test (as scipy fisher_exact).
+    Tables with an empty row or column get a p-value of 1 and a NaN odds ratio.
+    """
+    if test not in TESTS:
+        raise ValueError("unknown test: {} (expected one of {})".format(test, ", ".join(sorted(TESTS))))
+
+    tables = np.asarray(tables, dtype=np.int64).reshape(-1, 2, 2)
+    degenerate = (tables.sum(axis=1) == 0).any(axis=1) | (tables.sum(axis=2) == 0).any(axis=1)
+
+    if test == FISHER:
+        pvalues = _fisher_pvalues(tables)
+    else:
+        pvalues = _chi2_pvalues(tables, log_likelihood=test == GTEST)
+    pvalues[degenerate] = 1.0
+
+    oddsratios = _odds_ratios(tables, fisher=test == FISHER)
+    oddsratios[degenerate] = np.nan
+    return pvalues, oddsratios
+
+
+def features_tests(grp: np.ndarray, features: np.ndarray, test: str = CHI2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the p-values and odds ratios of every feature (columns of *features*) against the group vector.
+    """
+    return contingency_tests(contingency_tables(grp, features), test)
+
+
+def _odds_ratios(tables: np.ndarray, fisher: bool) -> np.ndarray:
+    tables = tables.astype(float)
+    if not fisher:
+        # statsmodels Table2x2 convention: zero cells are replaced by 0.5
+        tables[tables == 0] = 0.5
+    num = tables[:, 0, 0] * tables[:, 1, 1]
+    den = tables[:, 0, 1] * tables[:, 1, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        oddsratios = num / den
+    if fisher:
+        # scipy fisher_exact convention
+        oddsratios[den == 0] = np.inf
+    return oddsratios
+
+
+def _chi2_pvalues(tables: np.ndarray, log_likelihood: bool) -> np.ndarray:
+    observed = tables.astype(float)
+    total = observed.sum(axis=(1, 2))
+    expected = observed.sum(axis=2)[:, :, None] * observed.sum(axis=1)[:, None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected /= total[:, None, None]
+
+        # Yates' correction for continuity (2x2 tables have 1 degree of freedom)
+        diff = expected - observed
+        observed = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+
+        if log_likelihood:
+            terms = np.where(observed > 0, observed * np.log(observed / expected), 0.)
+            stats = 2 * terms.sum(axis=(1, 2))
+        else:
+            stats = ((observed - expected) ** 2 / expected).sum(axis=(1, 2))
+    return chi2.sf(stats, 1)
+
+
+def _fisher_pvalues(tables: np.ndarray) -> np.ndarray:
+    # hypergeometric distribution of the top-left cell given the table margins
+    total = tables.sum(axis=(1, 2))
+    row = tables[:, 0, 0] + tables[:, 0, 1]
+    col = tables[:, 0, 0] + tables[:, 1, 0]
+
+    support = np.arange(max(1, np.minimum(row, col).max(initial=0) + 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pmf = hypergeom.pmf(support[None, :], total[:, None], row[:, None], col[:, None])
+        pexact = hypergeom.pmf(tables[:, 0, 0], total, row, col)
+
+    # two-sided: sum probabilities of tables at most as likely as the observed one (scipy relative tolerance)
+    pmf = np.nan_to_num(pmf)
+    pvalues = np.where(pmf <= pexact[:, None] * (1 + 1e-14), pmf, 0.).sum(axis=1)
+    return np.minimum(pvalues, 1.0)
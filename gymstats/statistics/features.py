@@ -0,0 +1,51 @@
+from typing import Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from gymstats.models import IndoorBoulder, Climbable
+
+
+HAND = "Hand"
+FOOT = "Foot"
+METHOD = "Method"
+
+
+def problem_features(problem_ids: Sequence[int]) -> Dict[str, pd.DataFrame]:
+    """
+    Build the boolean feature matrices (problems x attribute names) of the given problems
+    for hand holds, footwork and moves. Each many-to-many table is loaded with a single query.
+    Matrices are indexed by problem id, in the order of *problem_ids*.
+    """
+    problem_ids = list(problem_ids)
+    hand_holds = IndoorBoulder.hand_holds.through.objects \
+        .filter(indoorboulder_id__in=problem_ids) \
+        .values_list("indoorboulder_id", "handhold__name")
+    footwork = IndoorBoulder.footwork.through.objects \
+        .filter(indoorboulder_id__in=problem_ids) \
+        .values_list("indoorboulder_id", "footwork__name")
+    moves = Climbable.moves.through.objects \
+        .filter(climbable__indoorboulder__id__in=problem_ids) \
+        .values_list("climbable__indoorboulder__id", "climbingmove__name")
+
+    return {
+        HAND: feature_matrix(problem_ids, hand_holds),
+        FOOT: feature_matrix(problem_ids, footwork),
+        METHOD: feature_matrix(problem_ids, moves),
+    }
+
+
+def feature_matrix(problem_ids: Sequence[int], pairs: Iterable[Tuple[int, str]]) -> pd.DataFrame:
+    """
+    Turn (problem id, attribute name) pairs into a boolean DataFrame aligned on *problem_ids*.
+    """
+    rows = {pid: i for i, pid in enumerate(problem_ids)}
+    pairs = [(rows[pid], name) for pid, name in pairs if pid in rows]
+    columns = sorted({name for _, name in pairs})
+    cols = {name: j for j, name in enumerate(columns)}
+
+    matrix = np.zeros((len(rows), len(columns)), dtype=bool)
+    if pairs:
+        i, j = zip(*((i, cols[name]) for i, name in pairs))
+        matrix[list(i), list(j)] = True
+    return pd.DataFrame(matrix, index=pd.Index(problem_ids), columns=columns)
@@ -0,0 +1,98 @@
+import datetime
+
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from gymstats.models import Attempt, FirstAchievement, Session
+from gymstats.helper.names import GRADE_POS, GYM_ID
+from gymstats.statistics.pandas import df_ranks
+from gymstats.statistics.sessions import problem_position
+from gymstats.timing import timed
+
+
+# First try, zone and top of each (climber, problem) and the attempts they took.
+# Attempts are cumulated over the sessions of the climber on the problem (by date, then session id) with a window
+# function: since the cumulated attempts only increase, the attempts needed to zone/top are the smallest cumulated
+# attempts of the tries that zoned/topped.
+FIRST_ACHIEVEMENTS_SQL = """
+SELECT climber_id, problem_id,
+       MIN(date),
+       MIN(CASE WHEN result >= {zone} THEN date END),
+       MIN(CASE WHEN result >= {top} THEN date END),
+       MIN(CASE WHEN result >= {zone} THEN cumulated END),
+       MIN(CASE WHEN result >= {top} THEN cumulated END)
+FROM (
+    SELECT s.climber_id, a.problem_id, s.date, a.result,
+           SUM(a.attempts) OVER (PARTITION BY s.climber_id, a.problem_id ORDER BY s.date, s.id
+                                 ROWS UNBOUNDED PRECEDING) AS cumulated
+    FROM {attempt} a JOIN {session} s ON s.id = a.session_id
+    WHERE {where}
+) tries
+GROUP BY climber_id, problem_id
+"""
+
+_COLUMNS = ["climber_id", "problem_id", "first_try", "first_zone", "first_top", "zone_attempts", "top_attempts"]
+
+
+def first_achievements_sql(where: str = "1 = 1") -> str:
+    return FIRST_ACHIEVEMENTS_SQL.format(zone=Attempt.Result.ZONE.value, top=Attempt.Result.TOP.value,
+                                         attempt=Attempt._meta.db_table, session=Session._meta.db_table,
+                                         where=where)
+
+
+def refresh_first_achievements(climber_id: int, problem_ids: Iterable[int] = None):
+    """
+    Recompute the first achievements of the climber, only on the given problems if any.
+    Rows are replaced by a single INSERT ... SELECT, without going through Python.
+    """
+    where, params = "s.climber_id = %s", [climber_id]
+    rows = FirstAchievement.objects.filter(climber_id=climber_id)
+    if problem_ids is not None:
+        problem_ids = list(problem_ids)
+        if not problem_ids:
+            return
+        where += " AND a.problem_id IN ({})".format(", ".join(["%s"] * len(problem_ids)))
+        params += problem_ids
+        rows = rows.filter(problem_id__in=problem_ids)
+
+    insert = "INSERT INTO {} ({}) ".format(FirstAchievement._meta.db_table, ", ".join(_COLUMNS))
+    with transaction.atomic():
+        rows.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(insert + first_achievements_sql(where), params)
+
+
+@timed
+def new_achievements(climber_id: int, start: datetime.date, end: datetime.date,
+                     threshold_positions: Dict[Any, List[int]] = None) -> Dict[str, int]:
+    """
+    Count the problems first tried, zoned, topped and flashed by the climber between *start* and *end* (included)
+    with a range query on the projection. Definitions are the ones of df_tops, df_flashes, df_zones and df_fails:
+    - new tops: first topped during the period (flashes included)
+    - new flashes: topped in a single attempt during the period
+    - new zones: first zoned during the period but not topped by its end
+    - new fail: first tried during the period but neither zoned nor topped by its end
+    Hard tops (new tops ranked 'expect' or 'higher') are counted when *threshold_positions* are given.
+    """
+    in_range = lambda field: Q(**{field + "__gte": start, field + "__lte": end})
+    not_before_end = lambda field: Q(**{field + "__isnull": True}) | Q(**{field + "__gt": end})
+
+    rows = FirstAchievement.objects.filter(climber_id=climber_id, first_try__lte=end) \
+                                   .filter(in_range("first_try") | in_range("first_zone") | in_range("first_top"))
+    counts = rows.aggregate(
+        tops=Count("id", filter=in_range("first_top")),
+        flashes=Count("id", filter=in_range("first_top") & Q(top_attempts=1)),
+        zones=Count("id", filter=in_range("first_zone") & not_before_end("first_top")),
+        fail=Count("id", filter=in_range("first_try") & not_before_end("first_zone")),
+    )
+    results = {"new " + k: v for k, v in counts.items()}
+
+    if threshold_positions is not None:
+        tops = rows.filter(in_range("first_top")).select_related("problem__climbable", "problem__sector__gym")
+        positions = pd.DataFrame([problem_position(t.problem) for t in tops], columns=[GRADE_POS, GYM_ID])
+        results["new hard tops"] = int((df_ranks(positions, threshold_positions) > 0).sum())
+    return results
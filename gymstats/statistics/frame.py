@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Set
+
+import numpy as np
+import pandas as pd
+
+from gymstats.models import Attempt, IndoorBoulder, Session
+from gymstats.helper.grade_order import scale_for_gym
+from gymstats.helper.names import ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV, GRADE_POS, GYM_ID
+from gymstats.helper.names import DATE, GRADE, PROBLEM_ID, RESULT, WALL_ANGLE
+from gymstats.statistics.pandas import df_ranks
+from gymstats.timing import timed
+
+
+# columns of the summary DataFrame
+SUMMARY_COLUMNS = [ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV, GRADE_POS, GYM_ID]
+
+# tries loaded by load_try_frame, in the order of the values_list
+_TRY_FIELDS = [
+    "session__date", "problem_id", "result", "attempts",
+    "problem__climbable__grade", "problem__climbable__wall_angle__name",
+    "problem__sector__gym_id", "problem__sector__gym__abv", "problem__sector__gym__brand",
+]
+
+
+@timed
+def load_try_frame(sessions: List[Session], pb_filter: Set[IndoorBoulder] = None) -> pd.DataFrame:
+    """
+    Load the tries of the given sessions with a single query, without creating any model instance.
+    Return a DataFrame with a row per try in chronological order (by session date, then session):
+    date, problem id, result (see Attempt.Result), attempts, grade, wall angle, gym id and grade position.
+    """
+    session_ids = [s.id for s in sessions]
+    rows = []
+    if session_ids:
+        qs = Attempt.objects.filter(session_id__in=session_ids) \
+                            .order_by("session__date", "session_id") \
+                            .values_list(*_TRY_FIELDS)
+        if pb_filter:
+            qs = qs.filter(problem__in=pb_filter)
+        rows = list(qs)
+    dates, pids, results, attempts, grades, walls, gyms, abvs, brands = zip(*rows) if rows else [()] * len(_TRY_FIELDS)
+
+    # grade positions are computed once per gym and grade (see problem_position)
+    positions = {}
+    for gym, abv, brand, grade in set(zip(gyms, abvs, brands, grades)):
+        position = None if gym is None else scale_for_gym(abv, brand, default=False).position(grade)
+        positions[(gym, abv, brand, grade)] = -1 if position is None else position
+
+    return pd.DataFrame({
+        DATE: np.array(dates, dtype="datetime64[D]"),
+        PROBLEM_ID: np.array(pids, dtype=np.int32),
+        RESULT: np.array(results, dtype=np.int8),
+        ATPS: np.array(attempts, dtype=np.int16),
+        GRADE: pd.Categorical(grades),
+        WALL_ANGLE: pd.Categorical(walls),
+        GYM_ID: np.array([-1 if gym is None else gym for gym in gyms], dtype=np.int32),
+        GRADE_POS: np.array([positions[key] for key in zip(gyms, abvs, brands, grades)], dtype=np.int8),
+    })
+
+
+class AttemptFrame(pd.DataFrame):
+    """
+    Summary of tries with a row per problem, indexed by problem id:
+    - attempts, zone attempts and top attempts (-1 if not zoned/topped): int16
+    - rank, previous best result (-1 if not tried before) and grade position (-1 if unknown): int8
+    - gym id (-1 if unknown): int32
+    - grade and wall angle: categorical
+    The first columns are SUMMARY_COLUMNS, in order. Frames are built from the arrays of a try frame
+    (see load_try_frame), filtering and slicing them keeps the AttemptFrame type.
+    """
+
+    DTYPES = {
+        ATPS: np.int16,
+        ZONE_ATPS: np.int16,
+        TOP_ATPS: np.int16,
+        RANK: np.int8,
+        PREV: np.int8,
+        GRADE_POS: np.int8,
+        GYM_ID: np.int32,
+    }
+
+    @property
+    def _constructor(self):
+        return AttemptFrame
+
+    @classmethod
+    @timed
+    def from_tries(cls, tries: pd.DataFrame, threshold_positions: Dict[Any, List[int]],
+                   previous: Dict[int, int] = None) -> "AttemptFrame":
+        """
+        Summarize chronologically ordered tries (see load_try_frame) into a frame with a row per problem.
+        *previous* are the best results on problems before the first try (see previous_achievements).
+        """
+        pids, first, inverse = np.unique(tries[PROBLEM_ID].to_numpy(), return_index=True, return_inverse=True)
+        results = tries[RESULT].to_numpy()
+        attempts = tries[ATPS].to_numpy(dtype=np.int64)
+
+        # attempts cumulated over the tries of each problem: tries are grouped by problem (keeping their order)
+        # and the attempts of the previous problems are removed from the running total
+        order = np.argsort(inverse, kind="stable")
+        running = np.cumsum(attempts[order])
+        counts = np.bincount(inverse, minlength=len(pids))
+        starts = np.cumsum(counts) - counts
+        before = running[starts] - attempts[order][starts]
+        cumulated = np.empty_like(attempts)
+        cumulated[order] = running - before[inverse[order]]
+
+        def attempts_to(result: int) -> np.ndarray:
+            # cumulated attempts only increase: the smallest one is the one of the first try reaching the result
+            out = np.full(len(pids), np.iinfo(np.int64).max)
+            reached = results >= result
+            np.minimum.at(out, inverse[reached], cumulated[reached])
+            return np.where(out == np.iinfo(np.int64).max, -1, out)
+
+        previous = previous or {}
+        frame = cls({
+            ATPS: np.bincount(inverse, weights=attempts, minlength=len(pids)),
+            ZONE_ATPS: attempts_to(Attempt.Result.ZONE),
+            TOP_ATPS: attempts_to(Attempt.Result.TOP),
+            RANK: 0,
+            PREV: [previous.get(int(pid), -1) for pid in pids],
+            GRADE_POS: tries[GRADE_POS].to_numpy()[first],
+            GYM_ID: tries[GYM_ID].to_numpy()[first],
+            GRADE: _take(tries[GRADE], first),
+            WALL_ANGLE: _take(tries[WALL_ANGLE], first),
+        }, index=pd.Index(pids, dtype=np.int32))
+        frame = frame.astype(cls.DTYPES)
+        frame[RANK] = df_ranks(frame, threshold_positions).astype(np.int8)
+        return frame
+
+
+def _take(column: pd.Series, positions: np.ndarray) -> pd.Categorical:
+    return pd.Categorical.from_codes(column.cat.codes.to_numpy()[positions], categories=column.cat.categories)
@@ -1,65 +1,93 @@
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List, Tuple
 
-from gymstats.models import Gym, Session, Climber
-from gymstats.helper.grade_order import grades_list
-from gymstats.statistics.sessions import sessions_to_pandas
-from gymstats.helper.names import Achievement, TOP_ATPS, ZONE_ATPS
+from django.db.models import Case, Count, Exists, OuterRef, Value, When
 
+from gymstats.models import Gym, Climber, IndoorBoulder, Attempt
+from gymstats.helper.grade_order import grade_scale
+from gymstats.helper.names import Achievement
+from gymstats.timing import timed
 
-achievements = [a.value for a in Achievement] + ["not tried"]
+
+NOT_TRIED = "not tried"
+
+achievements = [a.value for a in Achievement] + [NOT_TRIED]
 
 
 def current_problems_achievement(gym: Gym, cl: Climber, handle_unk: str = "keep") -> Dict[str, Any]:
+    return current_problems_achievements([gym], cl, handle_unk)[gym]
 
-    result = {}
-    result["labels"] = grades_list(gym, default=True)
-    grade_map = {elt: i for i, elt in enumerate(result["labels"])}
 
-    for achievement in achievements:
-        result[achievement] = [0] * len(grade_map)
+@timed
+def current_problems_achievements(gyms: Iterable[Gym], cl: Climber, handle_unk: str = "keep") -> Dict[Gym, Dict[str, Any]]:
+    """
+    Count the problems currently in each of the given gyms by grade and best achievement of the climber
+    (flash, top, zone, fail or not tried), using a single grouped query whatever the number of gyms.
+    Only tries of sessions in the problem gym are taken into account.
+    """
+    gyms = list(gyms)
+    counts = {gym.id: [] for gym in gyms}
+    if gyms:
+        problems = IndoorBoulder.objects.filter(sector__gym__in=gyms, removed=False) \
+                                        .order_by() \
+                                        .annotate(achievement=_achievement(cl)) \
+                                        .values_list("sector__gym_id", "climbable__grade", "achievement") \
+                                        .annotate(n=Count("id"))
+        for gym_id, grade, achievement, n in problems:
+            counts[gym_id].append((grade, achievement, n))
+    return {gym: _achievement_histogram(gym, counts[gym.id], handle_unk) for gym in gyms}
+
 
-    # problems currently in gym
-    problems = set(gym.problem_set.filter(removed=False))
+def _achievement(cl: Climber) -> Case:
+    """
+    Best achievement of the climber on a problem, as a database expression.
+    A flash is a top in one attempt that was not preceded by any other try on the problem
+    (tries of other sessions of the same day count as preceding ones).
+    """
+    def tries(result):
+        return Attempt.objects.filter(problem_id=OuterRef("pk"), session__climber=cl, session__gym_id=OuterRef("sector__gym_id"),
+                                      result=result)
 
-    if len(problems) == 0:
-        return result
+    earlier = ~Exists(Attempt.objects.filter(problem_id=OuterRef("problem_id"), session__climber=cl,
+                                             session__gym_id=OuterRef("session__gym_id"), session__date__lte=OuterRef("session__date"))
+                                     .exclude(session_id=OuterRef("session_id")))
+    return Case(
+        When(Exists(tries(Attempt.Result.TOP).filter(earlier, attempts=1)), then=Value(Achievement.FLASH.value)),
+        When(Exists(tries(Attempt.Result.TOP)), then=Value(Achievement.TOP.value)),
+        When(Exists(tries(Attempt.Result.ZONE)), then=Value(Achievement.ZONE.value)),
+        When(Exists(tries(Attempt.Result.FAIL)), then=Value(Achievement.FAIL.value)),
+        default=Value(NOT_TRIED),
+    )
 
-    earliest_date = min(pb.date_added for pb in problems)
 
-    sessions = Session.objects.filter(climber=cl, date__gte=earliest_date, gym=gym).order_by("date")
+def _achievement_histogram(gym: Gym, counts: List[Tuple[str, str, int]], handle_unk: str) -> Dict[str, Any]:
+    """
+    Turn (grade, achievement, number of problems) counts into per-grade histograms following the gym scale.
+    Unknown grades are appended to the labels ("keep"), grouped as "unknown" ("group") or ignored.
+    """
+    result = {}
+    scale = grade_scale(gym, default=True)
+    result["labels"] = list(scale.grades)
+    grade_map = dict(scale.positions)
 
-    # no need to specify start_date and no need to compute prev since none of the assessed problems
-    # were present before the earliest_date by definition.
-    df, _ = sessions_to_pandas(sessions, None, None, False, pb_filter=problems)
+    for achievement in achievements:
+        result[achievement] = [0] * len(grade_map)
 
-    for pb in problems:
-        grade = pb.grade
+    for grade, achievement, n in sorted(counts):
         if grade not in grade_map and handle_unk == "group":
             grade = "unknown"
-        
+
         if grade not in grade_map:
             if handle_unk in {"keep", "group"}:
                 # Keeping unknown grades
                 grade_map[grade] = len(grade_map)
-                for achievement in achievements:
-                    result[achievement].append(0)
+                for elt in achievements:
+                    result[elt].append(0)
                 result["labels"].append(grade)
             else:
-                # problem is not taken into account since its grade is unknown in the grade scale...
+                # problems are not taken into account since their grade is unknown in the grade scale...
                 continue
-        
+
         # at this point *grade* is necessarily in grade_map
-        achievement = "not tried"
-        if pb.id in df.index:
-            row = df.loc[pb.id]
-            if row[TOP_ATPS] == 1:
-                achievement = Achievement.FLASH.value
-            elif row[TOP_ATPS] > 0:
-                achievement = Achievement.TOP.value
-            elif row[ZONE_ATPS] > 0:
-                achievement = Achievement.ZONE.value
-            else:
-                achievement = Achievement.FAIL.value
-        result[achievement][grade_map[grade]] += 1
+        result[achievement][grade_map[grade]] += n
 
     return result
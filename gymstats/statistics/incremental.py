@@ -0,0 +1,237 @@
+import datetime
+
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from gymstats.models import Climber, CurrentStatistics, IndoorBoulder, IntervalStatistics, Session
+from gymstats.helper.names import Achievement, ID_TO_RANK, Rank
+from gymstats.helper.utils import float_duration_to_hour
+from gymstats.statistics.rollups import interval_bounds, interval_key
+from gymstats.statistics.pandas import rerank
+from gymstats.statistics.sessions import SUMMARY_COLUMNS, sessions_to_pandas
+from gymstats.timing import timed
+
+
+Intervals = IntervalStatistics.Intervals
+
+
+def empty_counters() -> Dict[str, Any]:
+    counters = {
+        "sessions": 0,
+        "duration": Decimal(0),
+        "boulders": 0,
+        "attempts": 0,
+        "new tops": 0,
+        "hard_tops": 0,
+    }
+    for a in Achievement:
+        counters["pb_all_" + a.value] = 0
+        for v in Rank:
+            counters["pb_{}_{}".format(v.value, a.value)] = 0
+    return counters
+
+
+def problem_counters(row: List[int]) -> Dict[str, int]:
+    """
+    Contribution of a single problem summary row [attempts, zone attempts, top attempts, rank, previous, ...]
+    to the counters. Definitions are the ones of df_attempts, df_tops, df_hard_tops and df_achievements.
+    """
+    attempts, zone, top, rank, prev = row[:5]
+    if top != -1:
+        achievement = Achievement.FLASH if top == 1 and prev == -1 else Achievement.TOP
+    else:
+        achievement = Achievement.FAIL if zone == -1 else Achievement.ZONE
+    new_top = top > 0 and prev < 2
+    return {
+        "boulders": 1,
+        "attempts": attempts,
+        "new tops": int(new_top),
+        "hard_tops": int(new_top and rank > 0),
+        "pb_{}_{}".format(ID_TO_RANK[rank], achievement.value): 1,
+        "pb_all_" + achievement.value: 1,
+    }
+
+
+@timed
+def live_statistics(climber: Climber, interval: int, today: datetime.date = None) -> Dict[str, Any]:
+    """
+    Return the counters of the climber's interval containing *today*.
+    Counters are computed once per interval and then maintained by signal receivers.
+    """
+    today = today or datetime.date.today()
+    stored = climber.current_statistics.filter(interval=interval).first()
+    current = up_to_date_statistics(climber, interval, today, stored,
+                                    lambda *key: compute_statistics(climber, interval, *key))
+    return displayed_statistics(current)
+
+
+def up_to_date_statistics(climber: Climber, interval: int, today: datetime.date, stored: Optional[CurrentStatistics],
+                          compute: Callable[[int, int], Tuple[Dict[int, List[int]], Dict[str, Any]]]) -> CurrentStatistics:
+    """
+    Return the climber's statistics of the interval containing *today*: the *stored* ones when of that interval,
+    otherwise the problem rows and counters returned by *compute* (called with the year and interval id), once stored.
+    """
+    year, interval_id = interval_key(interval, today)
+    if stored is not None and (stored.year, stored.interval_id) == (year, interval_id):
+        return stored
+    problems, counters = compute(year, interval_id)
+    return store_statistics(climber, interval, year, interval_id, problems, counters)
+
+
+def store_statistics(climber: Climber, interval: int, year: int, interval_id: int,
+                     problems: Dict[int, List[int]], counters: Dict[str, Any]) -> CurrentStatistics:
+    """
+    Store freshly computed statistics as the climber's current interval of the given kind.
+    """
+    current, _ = CurrentStatistics.objects.update_or_create(
+        climber=climber, interval=interval,
+        defaults={"year": year, "interval_id": interval_id, "problems": problems, "counters": counters})
+    return current
+
+
+def displayed_statistics(current: CurrentStatistics) -> Dict[str, Any]:
+    result = dict(current.counters)
+    result["duration_human_readable"] = float_duration_to_hour(result["duration"])
+    return result
+
+
+def compute_statistics(climber: Climber, interval: int, year: int, interval_id: int) -> Tuple[Dict[int, List[int]], Dict[str, Any]]:
+    """
+    Compute from scratch the problem rows and counters of the given interval.
+    """
+    start, end = interval_bounds(interval, year, interval_id)
+    sessions = list(Session.objects.filter(climber=climber, date__gte=start, date__lte=end))
+    df = sessions_to_pandas(sessions, start, climber.thresholds(), compute_prev=True)
+
+    problems = df_to_rows(df)
+    duration = sum((s.duration for s in sessions), Decimal(0))
+    return problems, rows_counters(problems, len(sessions), duration)
+
+
+def check_statistics(climber: Climber) -> Dict[int, Dict[str, Tuple[Any, Any]]]:
+    """
+    Compare incrementally maintained counters with a full recompute.
+    Return, for each drifting interval, the (incremental, recomputed) values of the differing counters.
+    """
+    drifts = {}
+    for current in climber.current_statistics.all():
+        _, counters = compute_statistics(climber, current.interval, current.year, current.interval_id)
+        diff = {k: (current.counters.get(k), v) for k, v in counters.items() if current.counters.get(k) != v}
+        if diff:
+            drifts[current.interval] = diff
+    return drifts
+
+
+def problem_changed(climber_id: int, problem_id: int, day: datetime.date):
+    """
+    Update the climber's current intervals after a try on the given problem was added, edited or removed.
+    Tries before an interval change its 'previous' achievements, hence must be taken into account too.
+    """
+    with transaction.atomic():
+        currents = [c for c in _locked_statistics(climber_id)
+                    if day <= interval_bounds(c.interval, c.year, c.interval_id)[1]]
+        if not currents:
+            return
+
+        climber = Climber.objects.get(id=climber_id)
+        thresholds = climber.thresholds()
+        problem = IndoorBoulder.objects.select_related("climbable", "sector__gym").get(id=problem_id)
+        for current in currents:
+            start, end = interval_bounds(current.interval, current.year, current.interval_id)
+            sessions = Session.objects.filter(climber_id=climber_id, date__gte=start, date__lte=end)
+            df = sessions_to_pandas(sessions, start, thresholds, compute_prev=True, pb_filter={problem})
+
+            if problem_id in current.problems:
+                _add(current.counters, problem_counters(current.problems.pop(problem_id)), -1)
+            if problem_id in df.index:
+                row = [int(v) for v in df.loc[problem_id, SUMMARY_COLUMNS]]
+                current.problems[problem_id] = row
+                _add(current.counters, problem_counters(row), 1)
+            current.save(update_fields=["problems", "counters"])
+
+
+def sessions_changed(climber_id: int, day: datetime.date):
+    """
+    Update the number of sessions and training time of the climber's current intervals containing *day*.
+    """
+    with transaction.atomic():
+        for current in _locked_statistics(climber_id):
+            start, end = interval_bounds(current.interval, current.year, current.interval_id)
+            if start <= day <= end:
+                agg = Session.objects.filter(climber_id=climber_id, date__gte=start, date__lte=end) \
+                                     .aggregate(sessions=Count("id"), duration=Sum("duration"))
+                current.counters["sessions"] = agg["sessions"]
+                current.counters["duration"] = agg["duration"] or Decimal(0)
+                current.save(update_fields=["counters"])
+
+
+def rerank_statistics(climber_id: int):
+    """
+    Re-rank the problems of the climber's current intervals after a threshold change,
+    then recompute their counters from the stored rows (no need to go through tries again).
+    """
+    with transaction.atomic():
+        currents = _locked_statistics(climber_id)
+        if not currents:
+            return
+
+        thresholds = Climber.objects.get(id=climber_id).thresholds()
+        for current in currents:
+            if any(len(row) != len(SUMMARY_COLUMNS) for row in current.problems.values()):
+                # rows computed without grade positions, recomputed on next access
+                current.delete()
+                continue
+            df = pd.DataFrame.from_dict(current.problems, orient="index", columns=SUMMARY_COLUMNS)
+            current.problems = df_to_rows(rerank(df, thresholds))
+            current.counters = rows_counters(current.problems, current.counters["sessions"], current.counters["duration"])
+            current.save(update_fields=["problems", "counters"])
+
+
+def reset_statistics(climber_id: int):
+    """
+    Drop the climber's current statistics, they are recomputed on next access.
+    Used when a change cannot be applied incrementally (session moved to another date or climber, ...)
+    """
+    CurrentStatistics.objects.filter(climber_id=climber_id).delete()
+
+
+def problems_regraded(problem_ids: List[int]) -> List[int]:
+    """
+    Drop the current statistics of the climbers having tried the problems, after a change of their grade or sector:
+    the ranks and grade positions of their rows are stale. Return the ids of these climbers.
+    """
+    climber_ids = sorted(set(Session.objects.filter(attempts__problem_id__in=problem_ids)
+                                            .values_list("climber_id", flat=True)))
+    CurrentStatistics.objects.filter(climber_id__in=climber_ids).delete()
+    return climber_ids
+
+
+def _locked_statistics(climber_id: int) -> List[CurrentStatistics]:
+    """
+    Current statistics of the climber, locked until the end of the transaction: their pickled rows and counters
+    are read, updated in Python and saved back, concurrent updates must wait for each other.
+    """
+    return list(CurrentStatistics.objects.select_for_update().filter(climber_id=climber_id))
+
+
+def df_to_rows(df: pd.DataFrame) -> Dict[int, List[int]]:
+    return {int(pid): [int(v) for v in row] for pid, row in zip(df.index, df[SUMMARY_COLUMNS].values)}
+
+
+def rows_counters(problems: Dict[int, List[int]], sessions: int, duration: Decimal) -> Dict[str, Any]:
+    counters = empty_counters()
+    counters["sessions"] = sessions
+    counters["duration"] = duration
+    for row in problems.values():
+        _add(counters, problem_counters(row), 1)
+    return counters
+
+
+def _add(counters: Dict[str, Any], contribution: Dict[str, int], sign: int):
+    for k, v in contribution.items():
+        counters[k] += sign * v
@@ -1,11 +1,11 @@
-from typing import Dict, Any
-from scipy.stats import chi2_contingency
+from typing import Any, Dict, List
 
-import statsmodels.api as sm
+import numpy as np
 import pandas as pd
 
-from gymstats.helper.names import ATPS, TOP_ATPS, ZONE_ATPS, RANK, PREV
-from gymstats.helper.names import Achievement, ID_TO_RANK, Rank
+from gymstats.helper.names import ATPS, TOP_ATPS, ZONE_ATPS, RANK, PREV, GRADE_POS, GYM_ID
+from gymstats.helper.names import Achievement, ID_TO_RANK, RANK_TO_ID, Rank
+from gymstats.statistics.contingency import features_tests, CHI2
 
 
 def df_achievements(df: pd.DataFrame, res: Dict = None) -> pd.DataFrame:
@@ -36,6 +36,36 @@ def df_achievements(df: pd.DataFrame, res: Dict = None) -> pd.DataFrame:
     return results
 
 
+def df_ranks(df: pd.DataFrame, threshold_positions: Dict[Any, List[int]]) -> pd.Series:
+    """
+    Compute the rank of every problem of the summary DataFrame from its grade position and gym
+    given the climber threshold positions (keyed by gym or gym id).
+    Problems with an unknown grade or from a gym without thresholds are ranked 'unk'.
+    """
+    levels = {getattr(gym, "pk", gym): lvl for gym, lvl in (threshold_positions or {}).items() if len(lvl) > 0}
+    if len(df) == 0 or not levels:
+        return pd.Series(RANK_TO_ID[Rank.UNK], index=df.index, dtype=int)
+
+    gyms = df[GYM_ID].astype(int)
+    positions = df[GRADE_POS].to_numpy(dtype=float)
+    lowest = gyms.map({gym: lvl[0] for gym, lvl in levels.items()}).to_numpy(dtype=float)
+    highest = gyms.map({gym: lvl[-1] for gym, lvl in levels.items()}).to_numpy(dtype=float)
+
+    ranks = np.select(
+        [(positions < 0) | np.isnan(lowest), positions < lowest, positions > highest],
+        [RANK_TO_ID[Rank.UNK], RANK_TO_ID[Rank.LOWER], RANK_TO_ID[Rank.HIGHER]],
+        RANK_TO_ID[Rank.EXPECT])
+    return pd.Series(ranks, index=df.index, dtype=int)
+
+
+def rerank(df: pd.DataFrame, threshold_positions: Dict[Any, List[int]]) -> pd.DataFrame:
+    """
+    Return a copy of the summary DataFrame ranked with the given thresholds,
+    e.g. after a threshold change or to preview the statistics of other thresholds.
+    """
+    return df.assign(**{RANK: df_ranks(df, threshold_positions)})
+
+
 def df_by_rank(df: pd.DataFrame, rank: int) -> Dict[str, int]:
     """
     Compute achievements and stats by problem ranking.
@@ -58,7 +88,7 @@ def df_attempts(df: pd.DataFrame) -> int:
     """
     Compute the number of attempts of the given summary DataFrame
     """
-    return sum(df[ATPS])
+    return int(df[ATPS].sum())
 
 
 def df_hard_tops(df: pd.DataFrame) -> int:
@@ -128,15 +158,11 @@ def df_by_wall_type(df: pd.DataFrame, wall_types: pd.Series) -> Dict[str, Any]:
     return results
 
 
-def features_overrepr(grp: pd.Series, features: pd.DataFrame):
+def features_overrepr(grp: pd.Series, features: pd.DataFrame, test: str = CHI2):
     """
     Given a pandas boolean Series representing two groups and a *features* binary DataFrame
-    Compute representational statisics of each feature using Chi2 and Odds Ratio
-    """
-    results = []
-    for feature_column in features.columns:
-        confusion = pd.crosstab(features[feature_column], grp)
-        r = chi2_contingency(confusion)
-        oddsratio = sm.stats.Table2x2(confusion).oddsratio
-        results.append({'Name': feature_column, 'P-Value': r.pvalue, 'Odds Ratio': oddsratio})
-    return pd.DataFrame(results)
+    Compute representational statisics of each feature using Chi2 (or G-test/Fisher exact test) and Odds Ratio
+    """
+    pvalues, oddsratios = features_tests(grp.to_numpy(dtype=bool), features.to_numpy(dtype=bool), test)
+    return pd.DataFrame({'Name': features.columns, 'P-Value': pvalues, 'Odds Ratio': oddsratios},
+                        columns=['Name', 'P-Value', 'Odds Ratio'])
@@ -0,0 +1,129 @@
+import calendar
+import datetime
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from gymstats.models import Climber, IntervalStatistics, Session
+from gymstats.statistics.first_achievements import new_achievements
+from gymstats.statistics.sessions import summary
+from gymstats.timing import timed
+
+
+Intervals = IntervalStatistics.Intervals
+
+ALL_INTERVALS = [Intervals.WEEK, Intervals.MONTH, Intervals.YEAR]
+
+
+def interval_key(interval: int, day: datetime.date) -> Tuple[int, int]:
+    """
+    Return the (year, interval_id) of the interval of the given kind containing *day*.
+    Weeks are ISO weeks, hence identified by their ISO year.
+    """
+    if interval == Intervals.WEEK:
+        iso = day.isocalendar()
+        return iso[0], iso[1]
+    if interval == Intervals.MONTH:
+        return day.year, day.month
+    return day.year, 1
+
+
+def interval_bounds(interval: int, year: int, interval_id: int) -> Tuple[datetime.date, datetime.date]:
+    """
+    Return the first and last days of the given interval.
+    """
+    if interval == Intervals.WEEK:
+        start = datetime.date.fromisocalendar(year, interval_id, 1)
+        return start, start + datetime.timedelta(days=6)
+    if interval == Intervals.MONTH:
+        return datetime.date(year, interval_id, 1), datetime.date(year, interval_id, calendar.monthrange(year, interval_id)[1])
+    return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+
+
+def matching_interval(start: datetime.date, end: datetime.date) -> Optional[Tuple[int, int, int]]:
+    """
+    Return the (interval, year, interval_id) exactly covered by [start, end], if any.
+    """
+    for interval in ALL_INTERVALS:
+        year, interval_id = interval_key(interval, start)
+        if interval_bounds(interval, year, interval_id) == (start, end):
+            return interval, year, interval_id
+    return None
+
+
+def update_rollups(climber: Climber, intervals: Iterable[int] = ALL_INTERVALS,
+                   today: datetime.date = None, force: bool = False) -> int:
+    """
+    Compute and store the summary of every closed interval during which the climber had sessions.
+    Existing rollups are kept unless *force* is set, so that the job can safely be run repeatedly.
+    Hard boulder thresholds are the ones of the climber at the time the rollup is computed.
+    Return the number of rollups written.
+    """
+    today = today or datetime.date.today()
+    days = Session.objects.filter(climber=climber, date__lt=today).order_by().values_list("date", flat=True).distinct()
+    keys = {(interval, *interval_key(interval, day)) for day in days for interval in intervals}
+    existing = set(climber.past_statistics.values_list("interval", "year", "interval_id"))
+
+    thresholds = None
+    written = 0
+    for interval, year, interval_id in sorted(keys):
+        start, end = interval_bounds(interval, year, interval_id)
+        if end >= today or (not force and (interval, year, interval_id) in existing):
+            continue
+        if thresholds is None:
+            thresholds = climber.thresholds()
+        IntervalStatistics.objects.update_or_create(climber=climber, interval=interval, year=year, interval_id=interval_id,
+                                                    defaults={"args": climber_summary(climber, start, end, thresholds)})
+        written += 1
+    return written
+
+
+@timed
+def range_summary(climber: Climber, start: datetime.date, end: datetime.date) -> Dict[str, Any]:
+    """
+    Compute the summary of the climber's sessions between *start* and *end*.
+    When the range is a closed week, month or year, the summary is read from (or stored as) a rollup.
+    """
+    key = matching_interval(start, end)
+    if key is None or end >= datetime.date.today():
+        return climber_summary(climber, start, end, climber.thresholds())
+
+    interval, year, interval_id = key
+    rollup = climber.past_statistics.filter(interval=interval, year=year, interval_id=interval_id).first()
+    if rollup is None:
+        rollup, _ = IntervalStatistics.objects.update_or_create(
+            climber=climber, interval=interval, year=year, interval_id=interval_id,
+            defaults={"args": climber_summary(climber, start, end, climber.thresholds())})
+    return rollup.args
+
+
+def climber_summary(climber: Climber, start: datetime.date, end: datetime.date,
+                    thresholds: Dict[Any, List[int]]) -> Dict[str, Any]:
+    """
+    Summary of the climber's sessions between *start* and *end* (see sessions.summary),
+    the general "new" counts being range queries on the first achievements projection.
+    """
+    sessions = Session.objects.filter(climber=climber, date__gte=start, date__lte=end)
+    result = summary(sessions, thresholds, start)
+    result["General"].update(new_achievements(climber.id, start, end, thresholds))
+    return result
+
+
+def reset_rollups(climber_ids: Iterable[int]):
+    """
+    Delete all the rollups of the climbers, after a change of the ranks of their problems (hard boulder thresholds,
+    problems regraded or moved): rollups are recomputed with the current ranks on next access.
+    """
+    IntervalStatistics.objects.filter(climber_id__in=list(climber_ids)).delete()
+
+
+def invalidate_rollups(climber_id: int, day: datetime.date):
+    """
+    Delete the climber's rollups that may depend on data of the given day.
+    Since achievements depend on previous tries, every interval ending on or after *day* is stale.
+    """
+    # ISO weeks of early January may belong to the previous ISO year
+    rollups = IntervalStatistics.objects.filter(climber_id=climber_id, year__gte=day.year - 1) \
+                                        .values_list("id", "interval", "year", "interval_id")
+    stale = [pk for pk, interval, year, interval_id in rollups if interval_bounds(interval, year, interval_id)[1] >= day]
+    if stale:
+        IntervalStatistics.objects.filter(id__in=stale).delete()
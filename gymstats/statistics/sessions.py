@@ -1,16 +1,34 @@
 import datetime
 
-from typing import List, Dict, Set, Any
+from typing import List, Dict, Set, Tuple, Iterable, Any
 
 import pandas as pd
 
-from gymstats.models import Session, Gym, Top, IndoorBoulder, Failure, Zone, HandHold, Footwork, ClimbingMove
+from django.db.models import Max
+
+from gymstats.models import Session, Gym, Attempt, IndoorBoulder, HandHold, Footwork, ClimbingMove
 from gymstats.helper.utils import float_duration_to_hour
-from gymstats.helper.names import ATPS, TOP_ATPS, ZONE_ATPS, RANK, PREV
-from gymstats.helper.names import RANK_TO_ID, Rank
-from gymstats.statistics.pandas import df_achievements, df_attempts, df_by_rank, df_hard_tops, df_tops, df_by_wall_type, features_overrepr
+from gymstats.helper.grade_order import grade_scale
+from gymstats.helper.names import ATPS, TOP_ATPS, ZONE_ATPS, RANK, PREV, GRADE_POS, GYM_ID, PROBLEM_ID, WALL_ANGLE
+from gymstats.helper.names import RANK_TO_ID, Rank, Achievement
+from gymstats.statistics.features import problem_features
+from gymstats.statistics.frame import SUMMARY_COLUMNS, AttemptFrame, load_try_frame
+from gymstats.statistics.pandas import df_achievements, df_attempts, df_by_rank, df_hard_tops, df_tops, df_by_wall_type, df_ranks, features_overrepr
+from gymstats.timing import timed
+
+
+# achievement of a try given its result
+RESULT_ACHIEVEMENTS = {
+    Attempt.Result.TOP: Achievement.TOP,
+    Attempt.Result.ZONE: Achievement.ZONE,
+    Attempt.Result.FAIL: Achievement.FAIL,
+}
+
+# value of the 'previous' column given the best previous achievement (i.e. the attempt result)
+PREV_LEVELS = {achievement: int(result) for result, achievement in RESULT_ACHIEVEMENTS.items()}
 
 
+@timed
 def statistics(sessions: List[Session], start_date: datetime.date, 
                achievements: bool = True, hard_tops: bool = True,
                threshold_positions: Dict[Gym, List[int]] = None,
@@ -19,7 +37,7 @@ def statistics(sessions: List[Session], start_date: datetime.date,
     result = base_sessions_stats(sessions)
     
     # Create the DataFrame containing all relevant information
-    df, _ = sessions_to_pandas(sessions, start_date, threshold_positions, compute_prev=compute_prev)
+    df = sessions_to_pandas(sessions, start_date, threshold_positions, compute_prev=compute_prev)
 
     if achievements:
         result = df_achievements(df, result)
@@ -30,6 +48,7 @@ def statistics(sessions: List[Session], start_date: datetime.date,
     return result
 
 
+@timed
 def summary(sessions: List[Session], threshold_positions: Dict[Gym, List[int]],
             start_date: datetime.date) -> Dict[str, Any]:
     """
@@ -51,7 +70,7 @@ def summary(sessions: List[Session], threshold_positions: Dict[Gym, List[int]],
         "Achievements": {},
     }
     
-    df, id_to_pb = sessions_to_pandas(sessions, start_date, threshold_positions, compute_prev=True)
+    df = sessions_to_pandas(sessions, start_date, threshold_positions, compute_prev=True)
 
     # General
     results["General"] = base_sessions_stats(sessions)
@@ -65,16 +84,16 @@ def summary(sessions: List[Session], threshold_positions: Dict[Gym, List[int]],
         results["Achievements"][v.value] = df_by_rank(df, RANK_TO_ID[v])
     
     # Wall Type
-    wall_types = _serie_wall_type_fast(df, id_to_pb) if id_to_pb else _serie_wall_type_slow(df)
-    results["Wall Types"]  = df_by_wall_type(df, wall_types)
+    results["Wall Types"]  = df_by_wall_type(df, df[WALL_ANGLE].astype(str))
 
     # Hand Holds, Foot, Method, ...
+    features = problem_features(df.index)
     sw = {}
     results["Strengths & Weaknesses"] = sw
     # all
-    sw["Overall"] = strength_and_weaknesses(df, id_to_pb)
+    sw["Overall"] = strength_and_weaknesses(df, features)
     # hard
-    sw["Hard"] = strength_and_weaknesses(df[df[RANK] > 0], id_to_pb)
+    sw["Hard"] = strength_and_weaknesses(df[df[RANK] > 0], features)
 
     return results
 
@@ -88,93 +107,104 @@ def base_sessions_stats(sessions: List[Session]) -> Dict[str, Any]:
     }
 
 
-def strength_and_weaknesses(df: pd.DataFrame, id_to_pb: Dict[int, IndoorBoulder], max_pvalue: float = 0.2) -> Dict[str, Any]:
+@timed
+def strength_and_weaknesses(df: pd.DataFrame, features: Dict[str, pd.DataFrame], max_pvalue: float = 0.2) -> Dict[str, Any]:
+    """
+    Compute over-represented hand holds, footwork and moves among topped problems of the given DataFrame.
+    *features* are the boolean feature matrices of (at least) the problems of the DataFrame.
+    """
     results = {}
-    
-    attrs = [
-        ("Hand", _serie_handholds_fast),
-        ("Foot", _serie_footworks_fast),
-        ("Method", _serie_pb_methods_fast)
-        ]
 
     # TODO: only new tops? only new tops and remove old tops?
     grp = df[TOP_ATPS] > 0
     
-    for name, fn in attrs:
-        features = fn(df, id_to_pb).str.get_dummies()
-        out_df = features_overrepr(grp, features)
+    for name, matrix in features.items():
+        matrix = matrix.loc[df.index]
+        # attributes present on none or all of the problems carry no information,
+        # and there is nothing to compare when all (or none of the) problems were topped
+        matrix = matrix.loc[:, matrix.any() & ~matrix.all()]
+        if grp.all() or not grp.any():
+            matrix = matrix.iloc[:, :0]
+        out_df = features_overrepr(grp, matrix)
         results[name] = out_df[out_df["P-Value"]<= max_pvalue].to_dict()
 
     return results
 
 
-def _serie_handholds_fast(df: pd.DataFrame, id_to_pb: Dict[int, IndoorBoulder]) -> pd.Series:
+def load_tries(sessions: List[Session], pb_filter: Set[IndoorBoulder] = None) -> List[Tuple[Achievement, Attempt]]:
     """
-    Return a pandas Serie containing hand holds for each problem of the given DataFrame.
-    Fastest method since it use cached Problems associated with the DataFrame.
+    Load all attempts of the given sessions using a single query, as model instances (see load_try_frame
+    for the compact version). Problems are fetched along with their climbable, wall angle and sector (and gym).
+    Tries are returned in chronological order: by session date, then tops, zones and failures within a session.
     """
-    return df.apply(lambda row: str(id_to_pb[row.name].hand_holds.values_list('name', flat=True)), axis=1)
+    positions = {s.id: i for i, s in enumerate(sorted(sessions, key = lambda s: s.date))}
+    if len(positions) == 0:
+        return []
 
+    qs = Attempt.objects.filter(session_id__in=positions.keys()) \
+                        .select_related("problem__climbable__wall_angle", "problem__sector__gym") \
+                        .order_by()
+    if pb_filter:
+        qs = qs.filter(problem__in=pb_filter)
 
-def _serie_footworks_fast(df: pd.DataFrame, id_to_pb: Dict[int, IndoorBoulder]) -> pd.Series:
-    """
-    Return a pandas Serie containing footwork for each problem of the given DataFrame.
-    Fastest method since it use cached Problems associated with the DataFrame.
-    """
-    return df.apply(lambda row: str(id_to_pb[row.name].footwork.values_list('name', flat=True)), axis=1)
+    tries = sorted(qs, key=lambda t: (positions[t.session_id], -t.result))
+    return [(RESULT_ACHIEVEMENTS[t.result], t) for t in tries]
 
 
-def _serie_pb_methods_fast(df: pd.DataFrame, id_to_pb: Dict[int, IndoorBoulder]) -> pd.Series:
+def previous_achievements(climbers: Set[int], problem_ids: Iterable[int], before: datetime.date) -> Dict[int, int]:
     """
-    Return a pandas Serie containing problem methods for each problem of the given DataFrame.
-    Fastest method since it use cached Problems associated with the DataFrame.
+    Compute the best result obtained by the given climbers on each problem before the given date.
+    Results follow the 'previous' column convention: 2 for a top, 1 for a zone, 0 for a fail.
+    Problems that were never tried before the date are not part of the returned dict (i.e. -1).
     """
-    return df.apply(lambda row: str(id_to_pb[row.name].climbable.moves.values_list("name", flat=True)), axis=1)
+    qs = Attempt.objects.filter(session__climber__in=climbers, session__date__lt=before, problem_id__in=list(problem_ids)) \
+                        .order_by() \
+                        .values("problem_id") \
+                        .annotate(best=Max("result")) \
+                        .values_list("problem_id", "best")
+    return dict(qs)
 
 
-def _serie_wall_type_fast(df: pd.DataFrame, id_to_pb: Dict[int, IndoorBoulder]) -> pd.Series:
-    """
-    Return a pandas Serie containing problem wall type for each problem of the given DataFrame.
-    Fastest method since it use cached Problems associated with the DataFrame.
-    """
-    return df.apply(lambda row: str(id_to_pb[row.name].climbable.wall_angle), axis=1)
+@timed
+def sessions_to_pandas(sessions: List[Session], start_date: datetime.date, 
+                       threshold_positions: Dict[Gym, List[int]],
+                       compute_prev: bool = True, pb_filter: Set[IndoorBoulder] = None) -> AttemptFrame:
+    tries = load_try_frame(sessions, pb_filter)
+    previous = None
+    if compute_prev and start_date and len(tries) > 0:
+        climbers = {s.climber_id for s in sessions}
+        previous = previous_achievements(climbers, tries[PROBLEM_ID].unique().tolist(), start_date)
+    return AttemptFrame.from_tries(tries, threshold_positions, previous)
 
 
-def _serie_wall_type_slow(df: pd.DataFrame) -> pd.Series:
+def tries_to_pandas(tries: List[Tuple[Achievement, Attempt]], threshold_positions: Dict[Gym, List[int]],
+                    previous: Dict[int, int] = None) -> Tuple[pd.DataFrame, Dict[int, IndoorBoulder]]:
     """
-    Return a pandas Serie containing problem wall type for each problem of the given DataFrame.
+    Summarize chronologically ordered tries (see load_tries) into a DataFrame with a row per problem.
+    *previous* are the best achievements on problems before the first try (see previous_achievements).
+    Object-based counterpart of AttemptFrame.from_tries (int64 columns, problems returned by id), see benchmarks.
     """
-    return df.apply(lambda row: str(IndoorBoulder.objects.get(id=row.name).climbable.wall_angle), axis=1)
-
-
-def sessions_to_pandas(sessions: List[Session], start_date: datetime.date, 
-                       threshold_positions: Dict[Gym, List[int]],
-                       compute_prev: bool = True, pb_filter: Set[IndoorBoulder] = None) -> pd.DataFrame:
-    sessions = sorted(sessions, key = lambda s: s.date)
     summary = {}
     # TODO: decide whether or not we want to return id_to_pb
     # it accelerates the calculation of 'wall types' series (x50)
     id_to_pb = {}
 
-    for session in sessions:
-        for top in session.tops.all():
-            if pb_filter and not top.problem in pb_filter:
-                continue
-            pid = top.problem.id
-            atps = top.attempts 
-            if pid not in summary:
-                id_to_pb[pid] = top.problem
-                r = RANK_TO_ID[top.problem.rank(threshold_positions)]
-                summary[pid] = [atps, atps, atps, r, -1]
-                if compute_prev:
-                    if Top.objects.filter(problem=top.problem, session__date__lt=start_date).count() > 0:
-                        summary[pid][-1] = 2
-                    elif Zone.objects.filter(problem=top.problem, session__date__lt=start_date).count() > 0:
-                        summary[pid][-1] = 1
-                    elif Failure.objects.filter(problem=top.problem, session__date__lt=start_date).count() > 0:
-                        summary[pid][-1] = 0
+    for achievement, t in tries:
+        pid = t.problem_id
+        atps = t.attempts
+        if pid not in summary:
+            id_to_pb[pid] = t.problem
+            # rank is computed for all problems at once below
+            position = problem_position(t.problem)
+            if achievement == Achievement.TOP:
+                summary[pid] = [atps, atps, atps, -1, -1, *position]
+            elif achievement == Achievement.ZONE:
+                summary[pid] = [atps, atps, -1, -1, -1, *position]
             else:
-                summary[pid][0] += top.attempts
+                summary[pid] = [atps, -1, -1, -1, -1, *position]
+        else:
+            summary[pid][0] += atps
+            if achievement == Achievement.TOP:
                 if summary[pid][1] == -1:
                     # problem wasn't zoned before -> set zone and top to current attempts
                     summary[pid][1] = summary[pid][0]
@@ -183,43 +213,32 @@ def sessions_to_pandas(sessions: List[Session], start_date: datetime.date,
                     # problem wasn't topped before -> set top to current attempts, left zone unchanged
                     summary[pid][2] = summary[pid][0]
                 # last case: problem was already topped, we do nothing except adding to attempts 
-
-        for zone in session.zones.all():
-            if pb_filter and not zone.problem in pb_filter:
-                continue
-            pid = zone.problem.id
-            atps = zone.attempts
-            if pid not in summary:
-                id_to_pb[pid] = zone.problem
-                r = RANK_TO_ID[zone.problem.rank(threshold_positions)]
-                summary[pid] = [atps, atps, -1, r, -1]
-                # here we do not compute prev. This means we don't care about side effects regarding zones..
-                # Need to change this behaviour if we want exact stats on new zones
-            else:
-                summary[pid][0] += atps
+            elif achievement == Achievement.ZONE:
                 if summary[pid][1] == -1:
                     # problem wasn't zoned before -> set zone to current attempts
                     summary[pid][1] = summary[pid][0]
-        
-        for fail in session.failures.all():
-            if pb_filter and not fail.problem in pb_filter:
-                continue
-            pid = fail.problem.id
-            atps = fail.attempts
-            if pid not in summary:
-                id_to_pb[pid] = fail.problem
-                r = RANK_TO_ID[fail.problem.rank(threshold_positions)]
-                summary[pid] = [atps, -1, -1, r, -1]
-                # same as above, do not compute previous achievement..
-            else:
-                summary[pid][0] += atps
-                # all other cases need not be evaluated since its a failure
+            # all other cases need not be evaluated since its a failure
+
+    for pid, prev in (previous or {}).items():
+        if pid in summary:
+            summary[pid][4] = prev
     
     # to pandas DataFrame
-    cols = [ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV]
     if len(summary) > 0:
         df = pd.DataFrame(summary).transpose()
-        df.columns = cols
+        df.columns = SUMMARY_COLUMNS
     else:
-        df = pd.DataFrame(columns=cols)
+        df = pd.DataFrame(columns=SUMMARY_COLUMNS)
+    df[RANK] = df_ranks(df, threshold_positions)
     return df, id_to_pb
+
+
+def problem_position(problem: IndoorBoulder) -> Tuple[int, int]:
+    """
+    Return the position of the problem grade in its gym scale and the id of its gym (-1 when unknown).
+    """
+    if problem.sector is None:
+        return -1, -1
+    gym = problem.sector.gym
+    position = grade_scale(gym, default=False).position(problem.climbable.grade)
+    return (-1 if position is None else position), gym.id
@@ -42,7 +42,7 @@ def __parse_section(section):
 def __is_match(problem, key, value):
     if key == "by-sector" and problem.sector.sector_id == value:
         return True
-    elif key == "by-grade" and problem.grade == value:
+    elif key == "by-grade" and problem.climbable.grade == value:
         return True
     return False
 
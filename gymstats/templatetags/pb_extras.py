@@ -9,12 +9,13 @@ def problem_title(pb: IndoorBoulder):
     """
     Display function used as title for a Problem
     """
-    return "{} - {} {} ({})".format(pb.grade, pb.gym.brand, pb.gym.city, pb.date_added.strftime("%d/%m/%y"))
+    gym = pb.sector.gym
+    return "{} - {} {} ({})".format(pb.climbable.grade, gym.brand, gym.city, pb.date_added.strftime("%d/%m/%y"))
 
 
 @register.filter(name="gallery_display")
 def problem_gallery_title(pb: IndoorBoulder):
-    return "{} - {}".format(pb.grade, pb.sector);
+    return "{} - {}".format(pb.climbable.grade, pb.sector);
 
 
 @register.filter(name="fw")
@@ -29,5 +30,5 @@ def problem_hh(pb: IndoorBoulder):
 
 @register.filter(name="me")
 def problem_mv(pb: IndoorBoulder):
-    for me in pb.moves.all():
+    for me in pb.climbable.moves.all():
         yield me
\ No newline at end of file
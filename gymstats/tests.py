@@ -1,3 +1,936 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import re
+import tempfile
+import threading
 
-# Create your tests here.
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from django.db import connection
+from django.db.models import Max
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from gymstats.budgets import BUDGET_SIZE, check_budgets, load_budgets, measure_views, uncovered_views
+from gymstats.budgets import ViewCost, view_client, view_requests
+from gymstats.cache import cached_statistics, climber_version, instance_version, session_version
+from gymstats.middleware import ClimberMiddleware
+from gymstats.models import Climber, Gym, HardBoulderThreshold, IndoorSector, WallAngle, Climbable, IndoorBoulder, FirstAchievement
+from gymstats.models import ClimbingMove, Footwork, HandHold, Shoes, Session, Attempt, Top, Zone, Failure, IntervalStatistics
+from gymstats.helper.parser import parse_filters
+from gymstats.helper.profiles import MemoryProfiler
+from gymstats.helper.query import explain_query, query_problems_from_filters
+from gymstats.helper.synthetic import DatasetSize, generate_dataset
+from gymstats.helper.names import TYPE_ABV, HANDHOLD_ABV, FOOTWORK_ABV, METHOD_ABV
+from gymstats.helper.names import ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV, GRADE_POS, GYM_ID, GRADE, WALL_ANGLE
+from gymstats.statistics.analytics import ClimberAnalytics
+from gymstats.statistics.frame import AttemptFrame
+from gymstats.statistics.features import FOOT, HAND, METHOD, feature_matrix, problem_features
+from gymstats.statistics.sessions import sessions_to_pandas, strength_and_weaknesses
+from gymstats.statistics import rollups
+from gymstats.statistics.first_achievements import new_achievements
+from gymstats.statistics.pandas import features_overrepr, df_fails, df_flashes, df_hard_tops, df_tops, df_zones
+from gymstats.statistics.gym import current_problems_achievements
+from gymstats.statistics.problems import attr_statistics
+from gymstats.statistics.incremental import live_statistics, check_statistics, reset_statistics
+
+
+class StatisticsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.climber = Climber.objects.create(name="climber")
+        self.gym = Gym.objects.create(name="gym", city="Paris", brand="Climbing District", abv="CD")
+        HardBoulderThreshold.objects.create(climber=self.climber, gym=self.gym, grade_threshold="Blue,Pink")
+        sector = IndoorSector.objects.create(gym=self.gym, sector_id=1)
+        wall = WallAngle.objects.create(name="slab", description="")
+        self.shoes = Shoes.objects.create(brand="b", name="s", size=42, purchase_date=datetime.date(2023, 1, 1))
+
+        self.problems = {}
+        for grade in ["Green", "Blue", "Red"]:
+            climbable = Climbable.objects.create(grade=grade, wall_angle=wall, picture="pb.jpg")
+            self.problems[grade] = IndoorBoulder.objects.create(climbable=climbable, sector=sector)
+
+    def _session(self, day: int) -> Session:
+        return Session.objects.create(gym=self.gym, climber=self.climber, date=datetime.date(2023, 5, day),
+                                      time=datetime.time(18), duration=Decimal("1.5"), sleep=Decimal("7"),
+                                      alcohol=0, shoes=self.shoes, notes="", overall_grade=4, strength=4,
+                                      motivation=4, fear=4)
+
+
+class SessionsToPandasTest(StatisticsTestCase):
+
+    def test_sessions_to_pandas(self):
+        first, second = self._session(2), self._session(9)
+        Failure.objects.create(session=first, problem=self.problems["Red"], attempts=4)
+        Zone.objects.create(session=first, problem=self.problems["Blue"], attempts=2)
+        Top.objects.create(session=first, problem=self.problems["Green"], attempts=1)
+        Top.objects.create(session=second, problem=self.problems["Red"], attempts=3)
+        Top.objects.create(session=second, problem=self.problems["Blue"], attempts=1)
+
+        thresholds = self.climber.thresholds()
+        with CaptureQueriesContext(connection) as ctx:
+            df = sessions_to_pandas([second, first], None, thresholds, compute_prev=False)
+        # a single query, whatever the number of sessions and tries
+        self.assertEqual(len(ctx), 1)
+
+        cols = [ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV]
+        self.assertEqual(list(df.loc[self.problems["Green"].id, cols]), [1, 1, 1, 0, -1])
+        self.assertEqual(list(df.loc[self.problems["Blue"].id, cols]), [3, 2, 3, 1, -1])
+        self.assertEqual(list(df.loc[self.problems["Red"].id, cols]), [7, 7, 7, 2, -1])
+        self.assertEqual(list(df[GRADE_POS].sort_values()), [2, 3, 5])
+        self.assertEqual(set(df[GYM_ID]), {self.gym.id})
+        self.assertEqual(list(df[WALL_ANGLE]), ["slab"] * 3)
+        self.assertEqual(df.loc[self.problems["Red"].id, GRADE], "Red")
+        self.assertEqual(df[ATPS].dtype, np.int16)
+        self.assertIsInstance(df[df[RANK] > 0], AttemptFrame)
+
+    def test_previous_achievements(self):
+        earlier, current = self._session(2), self._session(20)
+        Failure.objects.create(session=self._session(1), problem=self.problems["Red"], attempts=2)
+        Top.objects.create(session=earlier, problem=self.problems["Red"], attempts=1)
+        Failure.objects.create(session=earlier, problem=self.problems["Blue"], attempts=1)
+        other = self._session(3)
+        Session.objects.filter(id=other.id).update(climber=Climber.objects.create(name="other"))
+        Top.objects.create(session=other, problem=self.problems["Green"], attempts=1)
+        for pb in self.problems.values():
+            Zone.objects.create(session=current, problem=pb, attempts=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            df = sessions_to_pandas([current], datetime.date(2023, 5, 15), {}, compute_prev=True)
+        # tries + a single query for previous achievements
+        self.assertEqual(len(ctx), 2)
+
+        self.assertEqual(df.loc[self.problems["Red"].id, PREV], 2)
+        self.assertEqual(df.loc[self.problems["Blue"].id, PREV], 0)
+        # tries of other climbers are ignored
+        self.assertEqual(df.loc[self.problems["Green"].id, PREV], -1)
+
+
+def _fake_summary(sessions, thresholds, start):
+    return {"General": {"sessions": len(sessions), "duration": sum(s.duration for s in sessions)}}
+
+
+@mock.patch("gymstats.statistics.rollups.summary", _fake_summary)
+class RollupsTest(StatisticsTestCase):
+
+    def test_interval_bounds(self):
+        Intervals = IntervalStatistics.Intervals
+        self.assertEqual(rollups.interval_bounds(Intervals.MONTH, 2024, 2), (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)))
+        self.assertEqual(rollups.interval_key(Intervals.WEEK, datetime.date(2021, 1, 3)), (2020, 53))
+        self.assertEqual(rollups.matching_interval(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31)), (Intervals.YEAR, 2023, 1))
+        self.assertIsNone(rollups.matching_interval(datetime.date(2023, 1, 2), datetime.date(2023, 1, 31)))
+
+    def test_update_rollups(self):
+        first, second = self._session(2), self._session(30)
+        Top.objects.create(session=second, problem=self.problems["Red"], attempts=3)
+
+        # 2 weeks, 1 month and 1 year
+        self.assertEqual(rollups.update_rollups(self.climber), 4)
+        self.assertEqual(rollups.update_rollups(self.climber), 0)
+
+        # editing the last session invalidates its week, month and year
+        top = Top.objects.get(session=second)
+        top.attempts = 2
+        top.save()
+        self.assertEqual(self.climber.past_statistics.count(), 1)
+        self.assertEqual(rollups.update_rollups(self.climber), 3)
+
+
+class RankedRollupsTest(StatisticsTestCase):
+
+    def test_ranks_changed(self):
+        start, end = datetime.date(2023, 5, 1), datetime.date(2023, 5, 31)
+        session = self._session(2)
+        for grade in ["Green", "Red"]:
+            Top.objects.create(session=session, problem=self.problems[grade], attempts=1)
+        self.assertEqual(rollups.range_summary(self.climber, start, end)["General"]["new hard tops"], 1)
+        self.assertEqual(self.climber.past_statistics.count(), 1)
+
+        # the rollup of the closed month is recomputed with the new threshold
+        threshold = HardBoulderThreshold.objects.get(climber=self.climber)
+        threshold.grade_threshold = "Green"
+        threshold.save()
+        self.assertEqual(self.climber.past_statistics.count(), 0)
+        self.assertEqual(rollups.range_summary(self.climber, start, end)["General"]["new hard tops"], 2)
+
+        # and with the new grade of a problem
+        climbable = self.problems["Green"].climbable
+        climbable.grade = "Yellow"
+        climbable.save()
+        self.assertEqual(self.climber.past_statistics.count(), 0)
+        self.assertEqual(rollups.range_summary(self.climber, start, end)["General"]["new hard tops"], 1)
+
+
+class IncrementalStatisticsTest(StatisticsTestCase):
+
+    def test_live_statistics(self):
+        Intervals = IntervalStatistics.Intervals
+        today = datetime.date(2023, 5, 20)
+        stats = live_statistics(self.climber, Intervals.MONTH, today)
+        self.assertEqual(stats["sessions"], 0)
+
+        earlier, current = self._session(2), self._session(9)
+        Top.objects.create(session=earlier, problem=self.problems["Red"], attempts=2)
+        fail = Failure.objects.create(session=earlier, problem=self.problems["Blue"], attempts=1)
+        Top.objects.create(session=current, problem=self.problems["Blue"], attempts=3)
+        fail.delete()
+
+        stats = live_statistics(self.climber, Intervals.MONTH, today)
+        self.assertEqual(stats["sessions"], 2)
+        self.assertEqual(stats["attempts"], 5)
+        self.assertEqual(stats["hard_tops"], 2)
+        self.assertEqual(stats["pb_expect_flash"], 0)
+        self.assertEqual(stats["pb_expect_top"], 1)
+        self.assertEqual(check_statistics(self.climber), {})
+
+    def test_threshold_change(self):
+        Intervals = IntervalStatistics.Intervals
+        today = datetime.date(2023, 5, 20)
+        session = self._session(9)
+        for grade in ["Green", "Blue", "Red"]:
+            Top.objects.create(session=session, problem=self.problems[grade], attempts=2)
+        self.assertEqual(live_statistics(self.climber, Intervals.MONTH, today)["hard_tops"], 2)
+
+        threshold = HardBoulderThreshold.objects.get(climber=self.climber)
+        threshold.grade_threshold = "Green"
+        threshold.save()
+        stats = live_statistics(self.climber, Intervals.MONTH, today)
+        self.assertEqual(stats["hard_tops"], 3)
+        self.assertEqual(stats["pb_higher_top"], 2)
+        self.assertEqual(check_statistics(self.climber), {})
+
+    def test_problem_regraded(self):
+        Intervals = IntervalStatistics.Intervals
+        today = datetime.date(2023, 5, 20)
+        session = self._session(9)
+        Top.objects.create(session=session, problem=self.problems["Green"], attempts=2)
+        self.assertEqual(live_statistics(self.climber, Intervals.MONTH, today)["hard_tops"], 0)
+
+        climbable = self.problems["Green"].climbable
+        climbable.grade = "Red"
+        climbable.save()
+        self.assertEqual(check_statistics(self.climber), {})
+        self.assertEqual(live_statistics(self.climber, Intervals.MONTH, today)["hard_tops"], 1)
+
+        # moved to a gym without threshold
+        other = Gym.objects.create(name="other", city="Paris", brand="Block'Out", abv="BO")
+        problem = IndoorBoulder.objects.get(id=self.problems["Green"].id)
+        problem.sector = IndoorSector.objects.create(gym=other, sector_id=1)
+        problem.save()
+        self.assertEqual(check_statistics(self.climber), {})
+        self.assertEqual(live_statistics(self.climber, Intervals.MONTH, today)["hard_tops"], 0)
+
+
+class GymStatisticsTest(StatisticsTestCase):
+
+    def test_current_problems_achievements(self):
+        other = Gym.objects.create(name="other", city="Paris", brand="Block'Out", abv="BO")
+        earlier, current = self._session(2), self._session(9)
+        Top.objects.create(session=earlier, problem=self.problems["Green"], attempts=1)
+        Failure.objects.create(session=earlier, problem=self.problems["Red"], attempts=2)
+        Top.objects.create(session=current, problem=self.problems["Red"], attempts=1)
+        Zone.objects.create(session=current, problem=self.problems["Blue"], attempts=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            results = current_problems_achievements([self.gym, other], self.climber)
+        self.assertEqual(len(ctx), 1)
+
+        cd = results[self.gym]
+        self.assertEqual(cd["labels"][:4], ["Yellow", "Orange", "Green", "Blue"])
+        self.assertEqual(cd["flash"][2], 1)
+        self.assertEqual(cd["zone"][3], 1)
+        self.assertEqual(cd["top"][5], 1)
+        self.assertEqual(sum(cd["not tried"]), 0)
+        self.assertEqual(results[other]["not tried"], [0] * 14)
+
+
+class StatisticsCacheTest(StatisticsTestCase):
+
+    def test_cached_statistics(self):
+        compute = mock.Mock(side_effect=lambda: {"boulders": Top.objects.count()})
+        session = self._session(2)
+        self.assertEqual(cached_statistics(self.climber, "range", (1, 2), compute), {"boulders": 0})
+        self.assertEqual(cached_statistics(self.climber, "range", (1, 2), compute), {"boulders": 0})
+        self.assertEqual(compute.call_count, 1)
+
+        # other parameters and other climbers have their own entries
+        cached_statistics(self.climber, "range", (1, 3), compute)
+        other = Climber.objects.create(name="other")
+        cached_statistics(other, "range", (1, 2), compute)
+        self.assertEqual(compute.call_count, 3)
+
+        # any committed change to the climber's data is a miss
+        with self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+        self.assertEqual(cached_statistics(self.climber, "range", (1, 2), compute), {"boulders": 0})
+        climber = Climber.objects.get(id=self.climber.id)
+        self.assertEqual(climber_version(climber.id), instance_version(climber))
+        self.assertEqual(cached_statistics(climber, "range", (1, 2), compute), {"boulders": 1})
+        cached_statistics(Climber.objects.get(id=other.id), "range", (1, 2), compute)
+        self.assertEqual(compute.call_count, 4)
+
+    def test_bump_on_commit(self):
+        session = self._session(2)
+        version = climber_version(self.climber.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+        # not before the change is committed
+        self.assertEqual(climber_version(self.climber.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(climber_version(self.climber.id).number, version.number)
+        self.assertNotEqual(str(climber_version(self.climber.id)), str(version))
+
+
+    def test_stale_save(self):
+        # saving a climber or session loaded before a bump keeps the bumped version
+        session = self._session(2)
+        climber, stale = Climber.objects.get(id=self.climber.id), Session.objects.get(id=session.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+        versions = climber_version(climber.id), session_version(session.id)
+        climber.name, stale.notes = "renamed", "edited"
+        climber.save()
+        stale.save()
+        self.assertEqual((climber_version(climber.id), session_version(session.id)), versions)
+        self.assertEqual(Climber.objects.get(id=climber.id).name, "renamed")
+        self.assertEqual(Session.objects.get(id=session.id).notes, "edited")
+
+    def test_ranks_changed(self):
+        start, end = datetime.date(2023, 5, 1), datetime.date(2023, 5, 31)
+        Top.objects.create(session=self._session(2), problem=self.problems["Green"], attempts=1)
+
+        def hard_tops(climber):
+            stats = cached_statistics(climber, "range", (start, end), lambda: rollups.range_summary(climber, start, end))
+            return stats["General"]["new hard tops"]
+
+        self.assertEqual(hard_tops(Climber.objects.get(id=self.climber.id)), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            threshold = HardBoulderThreshold.objects.get(climber=self.climber)
+            threshold.grade_threshold = "Green"
+            threshold.save()
+        self.assertEqual(hard_tops(Climber.objects.get(id=self.climber.id)), 1)
+
+
+class SessionStatisticsTest(StatisticsTestCase):
+
+    def test_statistics(self):
+        session = Session.objects.select_related("gym").get(id=self._session(2).id)
+        crimp = HandHold.objects.create(name="crimp", description="")
+        for pb in self.problems.values():
+            pb.hand_holds.add(crimp)
+        Top.objects.create(session=session, problem=self.problems["Green"], attempts=1)
+        Top.objects.create(session=session, problem=self.problems["Blue"], attempts=2)
+        Zone.objects.create(session=session, problem=self.problems["Red"], attempts=3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = session.statistics()
+        # tries, then hand holds of all problems
+        self.assertEqual(len(ctx), 2)
+        self.assertEqual(data["successes"], 66)
+        self.assertEqual(data["problems"]["types"], {"slab": [2, 1]})
+        self.assertEqual(data["problems"]["grades"], {"Green": [1, 0], "Blue": [1, 0], "Red": [0, 1]})
+        self.assertEqual(data["problems"]["holds"], {"crimp": [2, 1]})
+
+
+class ProblemFeaturesTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # a problem without any attribute
+        climbable = Climbable.objects.create(grade="Yellow", wall_angle=WallAngle.objects.get(), picture="pb.jpg")
+        self.problems["Yellow"] = IndoorBoulder.objects.create(climbable=climbable, sector=IndoorSector.objects.get())
+
+        crimp = HandHold.objects.create(name="crimp", description="")
+        sloper = HandHold.objects.create(name="sloper", description="")
+        heelhook = Footwork.objects.create(name="heelhook", description="")
+        dyno = ClimbingMove.objects.create(name="dyno", description="")
+        self.problems["Green"].hand_holds.add(crimp, sloper)
+        self.problems["Blue"].hand_holds.add(crimp)
+        self.problems["Red"].footwork.add(heelhook)
+        self.problems["Red"].climbable.moves.add(dyno)
+
+    def test_problem_features(self):
+        ids = [self.problems[grade].id for grade in ["Yellow", "Red", "Blue", "Green"]]
+        with CaptureQueriesContext(connection) as ctx:
+            features = problem_features(ids)
+        self.assertEqual(len(ctx), 3)
+
+        self.assertEqual(features[HAND].index.tolist(), ids)
+        self.assertEqual(features[HAND].columns.tolist(), ["crimp", "sloper"])
+        self.assertEqual(features[HAND].values.tolist(), [[False, False], [False, False], [True, False], [True, True]])
+        self.assertEqual(features[FOOT].values.tolist(), [[False], [True], [False], [False]])
+        self.assertEqual(features[METHOD].columns.tolist(), ["dyno"])
+        self.assertEqual(features[METHOD].values.tolist(), [[False], [True], [False], [False]])
+
+    def test_attr_statistics(self):
+        overhang = WallAngle.objects.create(name="overhang", description="")
+        Climbable.objects.filter(id=self.problems["Blue"].climbable_id).update(wall_angle=overhang)
+        self.problems["Green"].climbable.moves.add(ClimbingMove.objects.get(name="dyno"))
+        self.problems["Red"].climbable.moves.add(ClimbingMove.objects.create(name="mantle", description=""))
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = attr_statistics(IndoorBoulder.objects.all())
+        # one grouped query per attribute table
+        self.assertEqual(len(ctx), 4)
+        self.assertEqual(dict(stats[TYPE_ABV]), {"slab": 3, "overhang": 1})
+        self.assertEqual(dict(stats[HANDHOLD_ABV]), {"crimp": 2, "sloper": 1})
+        self.assertEqual(dict(stats[FOOTWORK_ABV]), {"heelhook": 1})
+        self.assertEqual(dict(stats[METHOD_ABV]), {"dyno": 2, "mantle": 1})
+
+        # problems without attributes are only counted by wall angle
+        stats = attr_statistics([self.problems["Yellow"], self.problems["Blue"]])
+        self.assertEqual(dict(stats[TYPE_ABV]), {"slab": 1, "overhang": 1})
+        self.assertEqual(dict(stats[HANDHOLD_ABV]), {"crimp": 1})
+        self.assertEqual(dict(stats[FOOTWORK_ABV]), {})
+        self.assertEqual(dict(stats[METHOD_ABV]), {})
+
+    def test_feature_matrix(self):
+        # pairs of other problems are ignored, no pairs: no columns
+        matrix = feature_matrix([1, 2], [(2, "crimp"), (3, "jug")])
+        self.assertEqual(matrix.to_dict("list"), {"crimp": [False, True]})
+        self.assertEqual(feature_matrix([1, 2], []).shape, (2, 0))
+
+    def test_strength_and_weaknesses(self):
+        df = pd.DataFrame({TOP_ATPS: [1, 2, -1, -1, 3, -1]}, index=range(6))
+        hand = pd.DataFrame({
+            "always": [True] * 6,
+            "never": [False] * 6,
+            "crimp": [True, True, False, False, True, False],
+        }, index=range(6))
+
+        with mock.patch("gymstats.statistics.sessions.features_overrepr", wraps=features_overrepr) as test:
+            results = strength_and_weaknesses(df, {HAND: hand}, max_pvalue=1)
+        # attributes of all or none of the problems are not tested
+        self.assertEqual(test.call_args.args[1].columns.tolist(), ["crimp"])
+        self.assertEqual(list(results[HAND]["Name"].values()), ["crimp"])
+        self.assertGreater(results[HAND]["Odds Ratio"][0], 1)
+
+        # nothing to compare when all or none of the problems were topped
+        for tops in ([1] * 6, [-1] * 6):
+            df[TOP_ATPS] = tops
+            with mock.patch("gymstats.statistics.sessions.features_overrepr", wraps=features_overrepr) as test:
+                results = strength_and_weaknesses(df, {HAND: hand}, max_pvalue=1)
+            self.assertEqual(test.call_args.args[1].shape, (6, 0))
+            self.assertEqual(results[HAND]["Name"], {})
+
+
+class AttemptTest(StatisticsTestCase):
+
+    def test_proxies(self):
+        session = self._session(2)
+        Top.objects.create(session=session, problem=self.problems["Green"], attempts=1)
+        zone = Zone.objects.create(session=session, problem=self.problems["Red"], attempts=3)
+        self.assertEqual(zone.result, Attempt.Result.ZONE)
+        self.assertEqual(list(Zone.objects.values_list("id", flat=True)), [zone.id])
+        self.assertFalse(Failure.objects.exists())
+        self.assertEqual(session.attempts.count(), 2)
+
+        # changing the achievement updates the attempt in place
+        attempt = Attempt.objects.get(id=zone.id)
+        attempt.result = Attempt.Result.TOP
+        with CaptureQueriesContext(connection) as ctx:
+            attempt.save(update_fields=["result"])
+        writes = [q["sql"].split()[0] for q in ctx if re.match(r'(INSERT INTO|UPDATE|DELETE FROM) "gymstats_attempt"', q["sql"])]
+        self.assertEqual(writes, ["UPDATE"])
+        self.assertEqual(Top.objects.count(), 2)
+
+
+class FirstAchievementsTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        first, second, third = self._session(2), self._session(9), self._session(20)
+        Failure.objects.create(session=first, problem=self.problems["Red"], attempts=4)
+        Zone.objects.create(session=second, problem=self.problems["Red"], attempts=2)
+        Top.objects.create(session=third, problem=self.problems["Red"], attempts=3)
+        self.flash = Top.objects.create(session=second, problem=self.problems["Green"], attempts=1)
+        Failure.objects.create(session=third, problem=self.problems["Blue"], attempts=2)
+
+    def test_projection(self):
+        red = self.climber.first_achievements.get(problem=self.problems["Red"])
+        self.assertEqual((red.first_try.day, red.first_zone.day, red.first_top.day), (2, 9, 20))
+        self.assertEqual((red.zone_attempts, red.top_attempts), (6, 9))
+        self.assertTrue(self.climber.first_achievements.get(problem=self.problems["Green"]).flash)
+        blue = self.climber.first_achievements.get(problem=self.problems["Blue"])
+        self.assertEqual((blue.first_zone, blue.first_top, blue.top_attempts), (None, None, None))
+
+        # kept up to date when tries change
+        self.flash.attempts = 2
+        self.flash.save()
+        self.assertFalse(self.climber.first_achievements.get(problem=self.problems["Green"]).flash)
+
+    def test_new_achievements(self):
+        thresholds = self.climber.thresholds()
+        for start, end in [(1, 5), (6, 15), (16, 31), (1, 31), (9, 20)]:
+            start, end = datetime.date(2023, 5, start), datetime.date(2023, 5, end)
+            sessions = list(Session.objects.filter(climber=self.climber, date__gte=start, date__lte=end))
+            df = sessions_to_pandas(sessions, start, thresholds, compute_prev=True)
+            expected = {
+                "new tops": df_tops(df),
+                "new flashes": df_flashes(df),
+                "new zones": df_zones(df),
+                "new fail": df_fails(df),
+                "new hard tops": df_hard_tops(df),
+            }
+            with self.assertNumQueries(2):
+                self.assertEqual(new_achievements(self.climber.id, start, end, thresholds), expected)
+
+
+    def test_range_summary(self):
+        # new counts of the range statistics are read from the projection
+        start, end = datetime.date(2023, 5, 6), datetime.date(2023, 5, 15)
+        general = rollups.range_summary(self.climber, start, end)["General"]
+        self.assertEqual({k: general[k] for k in ["new tops", "new flashes", "new zones", "new fail", "new hard tops"]},
+                         {"new tops": 1, "new flashes": 1, "new zones": 1, "new fail": 0, "new hard tops": 0})
+        FirstAchievement.objects.filter(climber=self.climber).delete()
+        self.assertEqual(rollups.range_summary(self.climber, start, end)["General"]["new tops"], 0)
+
+
+class ConditionalStatisticsTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.climber.user = User.objects.create_user("climber")
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+
+    @mock.patch("gymstats.views.range_summary", return_value={"General": {}})
+    def test_range_stats(self, range_summary):
+        url = reverse("gs:stats-json", args=["month"]) + "?m=5&y=2023"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(range_summary.call_count, 1)
+        # another range is another resource
+        self.assertNotEqual(self.client.get(url.replace("m=5", "m=6"))["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=self._session(2), problem=self.problems["Red"], attempts=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_invalid_range(self):
+        url = reverse("gs:stats-json", args=["week"])
+        for params in ({"w": "abc"}, {"w": ""}, {"w": "60"}, {"y": "0"}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {"message": "parsing error..."})
+        response = self.client.get(reverse("gs:stats-json", args=["month"]), {"m": "13"})
+        self.assertEqual(response.json(), {"message": "parsing error..."})
+
+    def test_session_statistics(self):
+        session = self._session(2)
+        url = reverse("gs:session-statistics", args=[session.id])
+        etag = self.client.get(url)["ETag"]
+        with mock.patch.object(Session, "statistics") as statistics:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        statistics.assert_not_called()
+
+        # tries of other sessions do not change the session statistics
+        with self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=self._session(3), problem=self.problems["Red"], attempts=1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_other_process(self):
+        """
+        Data changed by another process, with its own cache, is seen by the validators of this one.
+        """
+        session = self._session(2)
+        urls = [reverse("gs:session-statistics", args=[session.id]), reverse("gs:stats-json", args=["month"]) + "?m=5&y=2023"]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+
+        other_process = LocMemCache("other-process", {})
+        with mock.patch("gymstats.cache.cache", other_process), self.captureOnCommitCallbacks(execute=True):
+            Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+
+        response = self.client.get(urls[0], HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["successes"], 100)
+        response = self.client.get(urls[1], HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["General"]["boulders"], 1)
+
+
+class ClimberAnalyticsTest(StatisticsTestCase):
+
+    def test_year_previous_achievements(self):
+        # tried before the year: topped first go in the year is a new top but not a flash
+        before = self._session(2)
+        before.date = datetime.date(2022, 12, 20)
+        before.save()
+        Failure.objects.create(session=before, problem=self.problems["Green"], attempts=3)
+        session = self._session(2)
+        Top.objects.create(session=session, problem=self.problems["Green"], attempts=1)
+        Top.objects.create(session=session, problem=self.problems["Red"], attempts=1)
+
+        year = IntervalStatistics.Intervals.YEAR
+        stats = ClimberAnalytics(self.climber, datetime.date(2023, 5, 10)).interval(year)
+        self.assertEqual((stats["pb_all_flash"], stats["pb_all_top"], stats["new tops"]), (1, 1, 2))
+
+
+class ProfilTest(StatisticsTestCase):
+
+    def _profil_queries(self) -> int:
+        reset_statistics(self.climber.id)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("gs:profil"))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_profil_queries(self):
+        self.climber.user = User.objects.create_user("climber")
+        self.climber.picture = "climber.jpg"
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+        self.climber.preferred_gyms.add(self.gym)
+        Top.objects.create(session=self._session(2), problem=self.problems["Red"], attempts=2)
+        queries = self._profil_queries()
+
+        other = Gym.objects.create(name="other", city="Paris", brand="Climbing District", abv="CD2")
+        sector = IndoorSector.objects.create(gym=other, sector_id=1)
+        self.climber.preferred_gyms.add(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(3, 10):
+                session = self._session(day)
+                for pb in self.problems.values():
+                    Failure.objects.create(session=session, problem=pb, attempts=1)
+                climbable = Climbable.objects.create(grade="Blue", wall_angle=WallAngle.objects.first(), picture="pb.jpg")
+                Zone.objects.create(session=session, problem=IndoorBoulder.objects.create(climbable=climbable, sector=sector), attempts=1)
+        self.assertEqual(self._profil_queries(), queries)
+
+
+class ProblemListingTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.climber.user = User.objects.create_user("climber")
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+        IndoorBoulder.objects.filter(id=self.problems["Red"].id).update(removed=True)
+
+    @mock.patch("gymstats.views.PROBLEMS_PER_PAGE", 2)
+    def test_pages(self):
+        for url in (reverse("gs:gym-problems", args=[self.gym.abv]), reverse("gs:pb-homepage")):
+            # removed problems are listed too
+            first, second = self.client.get(url), self.client.get(url, {"page": 2})
+            self.assertEqual(first.context["page"].paginator.count, 3)
+            self.assertEqual(len(first.context["results"]), 2)
+            self.assertEqual(len(second.context["results"]), 1)
+            self.assertEqual({p.id for p in first.context["results"]} | {p.id for p in second.context["results"]},
+                             {p.id for p in self.problems.values()})
+            self.assertContains(first, "3 problems found.")
+
+
+class ClimberMiddlewareTest(StatisticsTestCase):
+
+    def test_request_climber(self):
+        self.climber.user = User.objects.create_user("climber")
+        self.climber.save()
+        self.climber.preferred_gyms.add(self.gym)
+        request = RequestFactory().get("/")
+        request.user = self.climber.user
+        ClimberMiddleware(lambda request: None)(request)
+
+        # climber, preferred gyms and thresholds (with their gym)
+        with self.assertNumQueries(3):
+            self.assertEqual(request.climber.id, self.climber.id)
+            self.assertEqual(list(request.climber.preferred_gyms.all()), [self.gym])
+            self.assertEqual(request.climber.thresholds(), {self.gym: [3, 4]})
+            self.assertIs(request.climber.thresholds(), request.climber.thresholds())
+
+
+class SyntheticDatasetTest(TestCase):
+
+    def _dataset(self, seed):
+        size = DatasetSize(gyms=2, sectors_per_gym=2, problems_per_sector=10, days=60, climbers=2,
+                           sessions_per_climber=20, tries_per_session=8)
+        dataset = generate_dataset(size, seed=seed, end=datetime.date(2023, 6, 30), prefix="seed {}".format(seed))
+        tries = Attempt.objects.filter(session__climber__in=dataset.climbers) \
+                               .order_by("session__climber__name", "session__date", "problem__climbable__grade") \
+                               .values_list("session__date", "problem__climbable__grade", "result", "attempts")
+        return dataset, list(tries)
+
+    def test_generate_dataset(self):
+        dataset, tries = self._dataset(seed=1)
+        self.assertEqual(dataset.counts["climbers"], 2)
+        self.assertEqual(dataset.counts["sessions"], 40)
+        self.assertEqual(len(tries), dataset.counts["tries"])
+        self.assertTrue(all(0 < atps for _, _, _, atps in tries))
+        self.assertEqual(Session.objects.filter(climber__in=dataset.climbers, date__lt=datetime.date(2023, 5, 2)).count(), 0)
+        self.assertTrue(HardBoulderThreshold.objects.filter(climber__in=dataset.climbers).exists())
+        self.assertTrue(Climber.objects.get(id=dataset.climbers[0]).first_achievements.exists())
+
+        # same seed, same data
+        self.assertEqual(self._dataset(seed=1)[1], tries)
+        self.assertNotEqual(self._dataset(seed=2)[1], tries)
+
+        # gyms of every dataset have their own abbreviation
+        abvs = Gym.objects.values_list("abv", flat=True)
+        self.assertEqual(len(set(abvs)), len(abvs))
+
+
+class ViewBudgetTest(TransactionTestCase):
+    """
+    Render every view against the synthetic dataset and compare its queries with the checked-in budgets
+    (see benchmarks/view_budgets.py to record them). Timings are only checked with BENCH_BUDGETS=1 in the environment,
+    they depend on the machine. Not a TestCase: savepoints would add queries to the views.
+    """
+
+    def test_budgets(self):
+        dataset = generate_dataset(BUDGET_SIZE, seed=0)
+        climber = Climber.objects.get(id=dataset.climbers[0])
+        with tempfile.TemporaryDirectory() as profiles, override_settings(PROFILES_DIR=profiles):
+            requests = view_requests(climber)
+            self.assertEqual(uncovered_views(requests), set())
+
+            costs = measure_views(view_client(climber, self.client), requests)
+        self.assertEqual(check_budgets(costs, load_budgets(), times=os.environ.get("BENCH_BUDGETS") == "1"), [])
+
+    @mock.patch.dict(os.environ, {"VIEW_BUDGET_TOLERANCE": "2"})
+    def test_check_budgets(self):
+        budgets = {"tolerance": {"ratio": 1, "ms": 10}, "views": {"index": {"queries": 2, "db_ms": 1, "wall_ms": 5}}}
+        slow = {"index": ViewCost(200, 2, 1, 50)}
+        self.assertEqual(check_budgets(slow, budgets), ["index: wall_ms 50.0 > 20.0 (budget: 5)"])
+        self.assertEqual(check_budgets(slow, budgets, times=False), [])
+        self.assertEqual(check_budgets({"index": ViewCost(200, 3, 1, 5)}, budgets, times=False),
+                         ["index: 3 queries (budget: 2)"])
+
+
+class ServerTimingMiddlewareTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.climber.user = User.objects.create_user("climber")
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+        self.session = self._session(1)
+        Top.objects.create(session=self.session, problem=self.problems["Blue"], attempts=2)
+        Failure.objects.create(session=self.session, problem=self.problems["Red"], attempts=3)
+
+    @override_settings(SERVER_TIMING=True, SLOW_REQUEST_MS=0, SLOW_REQUEST_QUERIES=2)
+    def test_timings(self):
+        with self.assertLogs("gymstats.slow_requests", "WARNING") as logs:
+            response = self.client.get(reverse("gs:session", args=[self.session.id]))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "gs:session")
+        self.assertIn("Session.statistics", record["functions_ms"])
+        self.assertEqual(len(record["slowest_queries"]), 2)
+        self.assertGreaterEqual(record["slowest_queries"][0]["ms"], record["slowest_queries"][1]["ms"])
+        # phases are disjoint
+        self.assertLessEqual(record["db_ms"] + record["statistics_ms"] + record["template_ms"], record["total_ms"] + 0.5)
+
+        timing = response["Server-Timing"]
+        for name in ("total", "db", "statistics", "template"):
+            self.assertRegex(timing, r"\b{};dur=\d+\.\d".format(name))
+        self.assertIn('desc="{} queries"'.format(record["queries"]), timing)
+
+    @override_settings(SERVER_TIMING=False, SLOW_REQUEST_MS=None)
+    def test_disabled(self):
+        with self.assertNoLogs("gymstats.slow_requests"):
+            response = self.client.get(reverse("gs:session", args=[self.session.id]))
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProfilingMiddlewareTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.climber.user = User.objects.create_user("climber", is_staff=True)
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+        self.session = self._session(1)
+        Top.objects.create(session=self.session, problem=self.problems["Blue"], attempts=2)
+        self.profiles = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profiles.cleanup)
+        profiles_dir = override_settings(PROFILES_DIR=self.profiles.name)
+        profiles_dir.enable()
+        self.addCleanup(profiles_dir.disable)
+
+    def test_cpu(self):
+        response = self.client.get(reverse("gs:session", args=[self.session.id]), {"profile": "cpu"})
+        self.assertEqual(response.status_code, 200)
+        profile = self.client.get(response["X-Profile"])
+        self.assertEqual(profile.context["profile"].view, "gs.session")
+        functions = [f["function"] for f in profile.context["functions"]]
+        self.assertTrue(any("gymstats/models.py" in f and f.endswith("(statistics)") for f in functions), functions)
+
+        functions = self.client.get(response["X-Profile"], {"sort": "tottime"}).context["functions"]
+        self.assertEqual(functions, sorted(functions, key=lambda f: f["tottime_ms"], reverse=True))
+        self.assertEqual(self.client.get(response["X-Profile"], {"download": "1"})["Content-Type"], "application/octet-stream")
+
+    def test_mem(self):
+        response = self.client.get(reverse("gs:session", args=[self.session.id]), {"profile": "mem"})
+        profile = self.client.get(response["X-Profile"])
+        self.assertEqual(profile.context["profile"].kind, "mem")
+        self.assertEqual([p.name for p in self.client.get(reverse("gs:profiles")).context["profiles"]],
+                         [profile.context["profile"].name])
+
+    def test_concurrent_mem(self):
+        # the second profile waits for the first one, which would otherwise stop tracing under its feet
+        entered, release = threading.Event(), threading.Event()
+        errors = []
+
+        def first():
+            try:
+                with MemoryProfiler() as profiler:
+                    entered.set()
+                    release.wait(5)
+                profiler.save(os.path.join(self.profiles.name, "first.json"))
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=first)
+        thread.start()
+        entered.wait(5)
+        threading.Timer(0.1, release.set).start()
+        with MemoryProfiler() as profiler:
+            self.assertTrue(release.is_set())
+            data = [0] * 10000
+        thread.join(5)
+        profiler.save(os.path.join(self.profiles.name, "second.json"))
+        self.assertEqual(errors, [])
+        self.assertGreater(len(data), 0)
+
+    def test_staff_only(self):
+        self.climber.user.is_staff = False
+        self.climber.user.save()
+        response = self.client.get(reverse("gs:session", args=[self.session.id]), {"profile": "cpu"})
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(os.listdir(self.profiles.name), [])
+        self.assertEqual(self.client.get(reverse("gs:profiles")).status_code, 302)
+
+    def test_unknown_profile(self):
+        self.assertEqual(self.client.get(reverse("gs:profile", args=["db.sqlite3"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("gs:profile", args=["20240101-000000-000000-gs.home.prof"])).status_code, 404)
+
+
+class ProblemSearchTest(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        green, blue = self.problems["Green"], self.problems["Blue"]
+        crimp, jug = HandHold.objects.create(name="crimp", description=""), HandHold.objects.create(name="jug", description="")
+        green.hand_holds.add(crimp, jug)
+        blue.hand_holds.add(crimp)
+        green.footwork.add(Footwork.objects.create(name="heelhook", description=""),
+                           Footwork.objects.create(name="toehook", description=""))
+        green.climbable.moves.add(ClimbingMove.objects.create(name="dyno", description=""),
+                                  ClimbingMove.objects.create(name="mantle", description=""))
+
+        # the climber topped Green and failed Blue, another climber topped Blue, nobody tried Red
+        session = self._session(2)
+        Top.objects.create(session=session, problem=green, attempts=1)
+        Failure.objects.create(session=session, problem=blue, attempts=2)
+        other = Climber.objects.create(name="other")
+        Top.objects.create(session=Session.objects.create(
+            gym=self.gym, climber=other, date=datetime.date(2023, 5, 2), time=datetime.time(18), duration=Decimal("1"),
+            sleep=Decimal("7"), alcohol=0, shoes=self.shoes, notes="", overall_grade=4, strength=4, motivation=4,
+            fear=4), problem=blue, attempts=1)
+
+    def search(self, raw_filters):
+        problems, stats = query_problems_from_filters(parse_filters(raw_filters)[0], self.climber)
+        return sorted(p.climbable.grade for p in problems), stats
+
+    def test_multiple_values(self):
+        # values of a filter are OR-ed, without duplicating problems matching several of them
+        self.assertEqual(self.search("hh=crimp,jug")[0], ["Blue", "Green"])
+        self.assertEqual(self.search("fw=heelhook,toehook")[0], ["Green"])
+        self.assertEqual(self.search("m=dyno,mantle")[0], ["Green"])
+        # filters are AND-ed
+        self.assertEqual(self.search("hh=crimp,jug;fw=heelhook,toehook;m=dyno,mantle")[0], ["Green"])
+        self.assertEqual(self.search("hh=jug;g=blue")[0], [])
+
+    def test_achievements(self):
+        # only tops of the climber count, problems never tried are failed
+        self.assertEqual(self.search("top")[0], ["Green"])
+        self.assertEqual(self.search("fail")[0], ["Blue", "Red"])
+        self.assertEqual(self.search("hh=crimp;fail")[0], ["Blue"])
+
+    def test_removed(self):
+        IndoorBoulder.objects.filter(id=self.problems["Red"].id).update(removed=True)
+        self.assertEqual(self.search("rm")[0], ["Red"])
+        self.assertEqual(self.search("!rm")[0], ["Blue", "Green"])
+
+    def test_explain(self):
+        problems, _ = query_problems_from_filters(parse_filters("hh=crimp;fail")[0], self.climber)
+        explained = explain_query(problems)
+        self.assertEqual(explained["sql"], str(problems.query))
+        self.assertIn("hand_holds", explained["plan"])
+
+    def test_explain_view(self):
+        self.climber.user = User.objects.create_user("climber", is_staff=True)
+        self.climber.save()
+        self.client.force_login(self.climber.user)
+        url = reverse("gs:pb-searchresults") + "?explain=1"
+        response = self.client.post(url, {"search": "hh=crimp"})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(set(response.json()), {"sql", "plan"})
+
+        # out of DEBUG, other climbers only get the results
+        self.climber.user.is_staff = False
+        self.climber.user.save()
+        response = self.client.post(url, {"search": "hh=crimp"})
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertEqual(sorted(p.climbable.grade for p in response.context["results"]), ["Blue", "Green"])
+
+    def test_fisher_sizes(self):
+        with mock.patch("gymstats.helper.query.fisher_overrepr", return_value={}) as fisher:
+            self.search("hh=crimp,jug;fail")
+        superset, subset, superset_size, subset_size = fisher.call_args.args
+        self.assertEqual((superset_size, subset_size), (2, 1))
+        self.assertEqual(dict(superset[HANDHOLD_ABV]), {"crimp": 2, "jug": 1})
+        self.assertEqual(dict(subset[HANDHOLD_ABV]), {"crimp": 1})
+
+        with mock.patch("gymstats.helper.query.fisher_overrepr", return_value={}) as fisher:
+            self.search("top")
+        self.assertEqual(fisher.call_args.args[2:], (3, 1))
+
+
+class QueryPlanTest(StatisticsTestCase):
+    """
+    Hot lookups must be answered using indexes: fail whenever SQLite plans a full table (or index) scan.
+    """
+
+    def assertNoScan(self, qs):
+        plan = qs.explain()
+        scans = [line for line in plan.splitlines() if re.search(r"\bSCAN\b", line)]
+        self.assertEqual(scans, [], "full scan in query plan:\n{}\n{}".format(qs.query, plan))
+
+    def test_sessions(self):
+        self.assertNoScan(Session.objects.filter(climber=self.climber, date__gte=datetime.date(2023, 5, 1),
+                                                 date__lte=datetime.date(2023, 5, 31)))
+
+    def test_tries(self):
+        self.assertNoScan(Attempt.objects.filter(session_id__in=[1, 2])
+                                         .select_related("problem__climbable__wall_angle", "problem__sector__gym")
+                                         .order_by())
+        self.assertNoScan(Attempt.objects.filter(session_id=1, problem_id=2))
+        self.assertNoScan(Attempt.objects.filter(session__climber__in=[self.climber.id], problem_id__in=[1, 2],
+                                                 session__date__lt=datetime.date(2023, 5, 1))
+                                         .order_by().values("problem_id").annotate(best=Max("result")))
+
+    def test_problems(self):
+        self.assertNoScan(IndoorBoulder.objects.filter(sector__gym=self.gym, removed=False))
+        self.assertNoScan(IndoorBoulder.objects.filter(sector__gym__abv="CD"))
+        self.assertNoScan(IndoorSector.objects.filter(gym=self.gym))
+        self.assertNoScan(Gym.objects.filter(abv="CD"))
@@ -0,0 +1,138 @@
+import contextlib
+import contextvars
+import functools
+import time
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+
+class QueryTimer:
+    """
+    Execute wrapper recording the SQL statements run on a connection and the time they took.
+    """
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []  # (sql, seconds)
+        self.seconds = 0.
+
+    @property
+    def queries(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.statements.append((sql, elapsed))
+            self.seconds += elapsed
+
+
+class RequestTimings:
+    """
+    Where the time of a request goes. Phases are disjoint: statistics time excludes the queries run by statistics
+    functions, template time excludes the queries and statistics run while rendering.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.
+        self.db = QueryTimer()
+        self.statistics = 0.
+        self.template = 0.
+        self.functions: Dict[str, float] = defaultdict(float)  # statistics functions, inclusive times
+        self._depth = defaultdict(int)  # nesting of each phase, only the outermost call is counted
+
+    def stop(self):
+        self.total = time.perf_counter() - self.start
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Add the time of the block, minus the time of the queries and inner phases, to the *name* phase.
+        """
+        self._depth[name] += 1
+        start, db, statistics = time.perf_counter(), self.db.seconds, self.statistics
+        try:
+            yield
+        finally:
+            self._depth[name] -= 1
+            if self._depth[name] == 0:
+                inner = (self.db.seconds - db) + (self.statistics - statistics if name != "statistics" else 0)
+                setattr(self, name, getattr(self, name) + time.perf_counter() - start - inner)
+
+    def slowest_queries(self, n: int) -> List[Tuple[str, float]]:
+        return sorted(self.db.statements, key=lambda s: s[1], reverse=True)[:n]
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def record_timings():
+    """
+    Record the timings of the block (a request) on every database connection, available through current_timings().
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings.db))
+            yield timings
+    finally:
+        timings.stop()
+        _current.reset(token)
+
+
+def timed(func):
+    """
+    Count the time spent in the decorated statistics function when timings are recorded.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            with timings.phase("statistics"):
+                return func(*args, **kwargs)
+        finally:
+            timings.functions[name] += time.perf_counter() - start
+    return wrapper
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        with timings.phase("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend counting the render time of templates when timings are recorded.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
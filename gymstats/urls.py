@@ -48,5 +48,9 @@ urlpatterns = [
     path('problems/<int:problem_id>/reviews/<int:review_id>/', views.problem_review, name="pb-review-display"),
     path('problems/<int:problem_id>/reviews/', views.problem_reviews, name="pb-reviews"),
     path('problems/searchbar/', views.problem_searchbar, name="pb-searchbar"),
-    path('problems/search-results', views.problem_search_results, name="pb-searchresults")
+    path('problems/search-results', views.problem_search_results, name="pb-searchresults"),
+
+    # Profiles (staff only)
+    path('profiles/', views.profiles, name="profiles"),
+    path('profiles/<str:profile_name>/', views.profile, name="profile"),
 ]
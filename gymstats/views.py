@@ -1,23 +1,34 @@
-import calendar
 from datetime import date, datetime
 import re
 
+from typing import Optional
+
 from dal import autocomplete
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, Http404, HttpResponseRedirect, JsonResponse
+from django.core.paginator import Paginator
+from django.http import FileResponse, HttpResponse, Http404, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template import loader
 from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
+from .cache import cached_session_statistics, cached_statistics, instance_version
 from .forms import SessionForm, ClimberForm
-from .models import IndoorBoulder, Gym, Review, Climber, Session, Try, RIC, IndoorSector, Top, Failure, Zone
+from .models import IndoorBoulder, Gym, Review, Climber, Session, Attempt, RIC, IndoorSector, IntervalStatistics
 from .helper.parser import parse_filters
-from .helper.query import query_problems_from_filters
-from .helper.grade_order import grades_list
-from .statistics.sessions import statistics, base_sessions_stats
-from .statistics.gym import current_problems_achievement
-from .statistics.sessions import summary
+from .helper.query import query_problems_from_filters, explain_query, tagged_problems
+from .helper.grade_order import grade_scale
+from .helper.profiles import get_profile, heaviest_functions, list_profiles, profiles_dir
+from .statistics.analytics import ClimberAnalytics
+from .statistics.rollups import interval_bounds, range_summary
+
+
+# problems by page of the problem listings
+PROBLEMS_PER_PAGE = 48
 
 
 # AutoComplete views
@@ -25,7 +36,7 @@ from .statistics.sessions import summary
 class GymAutocompleteView(autocomplete.Select2QuerySetView):
     
     def get_queryset(self):
-        gyms = Gym.objects.all()
+        gyms = Gym.objects.order_by("abv")
         if self.q:
             gyms = gyms.filter(abv__startswith=self.q)
         return gyms
@@ -34,7 +45,7 @@ class GymSectorAutocompleteView(autocomplete.Select2QuerySetView):
     
     def get_queryset(self):
 
-        sectors = IndoorSector.objects.all()
+        sectors = IndoorSector.objects.select_related("gym").order_by("gym__abv", "sector_id")
 
         gym = self.forwarded.get('gym', None)
         if gym:
@@ -49,12 +60,12 @@ class ProblemAutocompleteView(autocomplete.Select2QuerySetView):
     re_num = re.compile("^(\d+)(.*)")
 
     def get_queryset(self):
-        problems = IndoorBoulder.objects.all()
+        problems = IndoorBoulder.objects.select_related("climbable__wall_angle", "sector__gym")
 
         # Forwarded in Session Form
         gym = self.forwarded.get('gym', None)
         if gym:
-            problems = problems.filter(gym__id=gym)
+            problems = problems.filter(sector__gym__id=gym)
         
         sector = self.forwarded.get('sector', None)
         if sector:
@@ -63,8 +74,8 @@ class ProblemAutocompleteView(autocomplete.Select2QuerySetView):
         # Forwarded in Try Form --> TODO: why is it not working???
         sess_id = self.forwarded.get('session', None)
         if sess_id:
-            gym_id = Session.objects.get(id=sess_id).gym.id
-            problems = problems.filter(gym__id=gym_id)
+            gym_id = Session.objects.get(id=sess_id).gym_id
+            problems = problems.filter(sector__gym__id=gym_id)
 
         if self.q:
             m = self.re_num.search(self.q)
@@ -74,7 +85,7 @@ class ProblemAutocompleteView(autocomplete.Select2QuerySetView):
                 problems = problems.filter(sector__sector_id=int(sector))
             else:
                 grade = self.q
-            problems = problems.filter(grade__startswith=grade)
+            problems = problems.filter(climbable__grade__startswith=grade)
         return problems
 
 class GradeAutocompleteView(autocomplete.Select2ListView):
@@ -84,7 +95,7 @@ class GradeAutocompleteView(autocomplete.Select2ListView):
         grades = []
         gym = self.forwarded.get('gym', None)
         if gym:
-            grades = grades_list(Gym.objects.get(id=gym), default=True)
+            grades = list(grade_scale(Gym.objects.get(id=gym), default=True))
         return grades
 
 
@@ -100,7 +111,7 @@ def __sess(climber: Climber):
 
 
 def home(request):
-    climber = request.user.climber_set.first()
+    climber = request.climber
     sessions = {elt.date.strftime("%d/%m/%Y"): (elt.id,) for elt in __sess(climber).only("date")}
     return render(request, 'gymstats/home.html', {'sessions': sessions})
 
@@ -108,42 +119,35 @@ def home(request):
 # Profil view
 
 def profil(request):
-    climber = request.user.climber_set.first()
+    climber = request.climber
     data = {}
     
-    # All Time information
-    sessions = Session.objects.filter(climber=climber).only("duration")
-    data["all_time"] = base_sessions_stats(sessions=sessions)
-
+    # sessions and tries are loaded once and shared by all sections
     today = date.today()
-    threshold_positions = climber.thresholds()
+    analytics = ClimberAnalytics(climber, today)
+
+    # All Time information
+    data["all_time"] = cached_statistics(climber, "all_time", today, analytics.all_time)
 
-    # Month information
-    fdom = today.replace(day=1)
-    month_sessions = Session.objects.filter(climber=climber, date__gte=fdom)
-    data["month"] = statistics(sessions=month_sessions, start_date=fdom, achievements=False,
-                               hard_tops=True, threshold_positions=threshold_positions, compute_prev=True)
+    # Month information: incrementally maintained counters
+    data["month"] = dict(cached_statistics(climber, "month", today,
+                                           lambda: analytics.interval(IntervalStatistics.Intervals.MONTH)))
     # fill target percentages
     data["month"]["training_time_target"] = min(100, data["month"]["duration"] * 100 / climber.month_hour_target)
     data["month"]["hard_boulders_target"] = min(100, data["month"]["hard_tops"] * 100 / climber.month_hard_boulder_target)
 
     # Year information
-    fdoy = today.replace(day=1, month=1)
-    year_sessions = Session.objects.filter(climber=climber, date__gte=fdoy).order_by("date")
-    
-    data["year"] = statistics(sessions=year_sessions, start_date=fdoy, achievements=True,
-                              hard_tops=False, threshold_positions=threshold_positions, compute_prev=False)
+    data["year"] = cached_statistics(climber, "year", today,
+                                     lambda: analytics.interval(IntervalStatistics.Intervals.YEAR))
 
     # By gym information
-    data["by_gym"] = {}
-    for gym in climber.preferred_gyms.all():
-        data["by_gym"][str(gym)] = current_problems_achievement(gym, climber)
+    data["by_gym"] = analytics.by_gym()
 
     return render(request, 'gymstats/profil.html', {'data': data, 'climber': climber})
 
 
 def profil_edit(request):
-    climber = request.user.climber_set.first()
+    climber = request.climber
     if request.method == 'POST':
         form = ClimberForm(request.POST, instance=climber)
         if form.is_valid():
@@ -162,7 +166,7 @@ def stats_searchbar(request):
 
 def stats_display(request):
     if request.method == 'POST':
-        climber = request.user.climber_set.first()
+        climber = request.climber
         start = request.POST["from"]
         end = request.POST["to"]
         data = _range_stats(climber, start, end)
@@ -175,47 +179,104 @@ def stats_display(request):
                       })
 
 
-def range_stats(request, range_method):
-    climber = request.user.climber_set.first()
-    if range_method == "month":
-        month = int(request.GET.get("m", date.today().month))
-        year = int(request.GET.get("y", date.today().year))
-        start = date(day=1, month=month, year=year)
-        end = date(day=calendar._monthlen(year, month), month=month, year=year)
-
-    elif range_method == "year":
-        year = int(request.GET.get("y", date.today().year))
-        start = date(day=1, month=1, year=year)
-        end = date(day=31, month=12, year=year)
-
-    elif range_method == "week":
-        return JsonResponse({"message": "not yet implemented"})
-    
-    elif range_method == "range":
-        try:
+def _range_bounds(request, range_method: str):
+    """
+    Return the (start, end) dates of the requested range, None if they cannot be parsed.
+    """
+    try:
+        if range_method == "month":
+            month = int(request.GET.get("m", date.today().month))
+            year = int(request.GET.get("y", date.today().year))
+            start, end = interval_bounds(IntervalStatistics.Intervals.MONTH, year, month)
+
+        elif range_method == "year":
+            year = int(request.GET.get("y", date.today().year))
+            start, end = interval_bounds(IntervalStatistics.Intervals.YEAR, year, 1)
+
+        elif range_method == "week":
+            iso = date.today().isocalendar()
+            week = int(request.GET.get("w", iso[1]))
+            year = int(request.GET.get("y", iso[0]))
+            start, end = interval_bounds(IntervalStatistics.Intervals.WEEK, year, week)
+
+        elif range_method == "range":
             start = datetime.strptime(request.GET["start"], "%Y-%m-%d")
             if "end" in request.GET:
                 end = datetime.strptime(request.GET["end"], "%Y-%m-%d")
             else:
                 end = date.today()
-        except:
-            return JsonResponse({"message": "parsing error..."})
-    else:
+        else:
+            return None
+    except (KeyError, TypeError, ValueError, OverflowError):
+        # missing, malformed or out of range parameters (e.g. ?w=60)
+        return None
+    return _to_date(start), _to_date(end)
+
+
+def _range_stats_version(request, range_method):
+    bounds = _range_bounds(request, range_method)
+    if not request.climber or bounds is None:
+        return None
+    return request.climber.id, instance_version(request.climber), bounds
+
+
+def _range_stats_etag(request, range_method):
+    version = _range_stats_version(request, range_method)
+    if version is not None:
+        climber_id, data_version, (start, end) = version
+        return "climber-{}-{}-{}-{}".format(climber_id, data_version, start, end)
+
+
+def _range_stats_last_modified(request, range_method):
+    version = _range_stats_version(request, range_method)
+    if version is not None:
+        return version[1].modified
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_range_stats_etag, last_modified_func=_range_stats_last_modified)
+def range_stats(request, range_method):
+    """
+    Statistics of the requested range as JSON. Responses carry an ETag and a Last-Modified date
+    derived from the climber data version, stored in the database and therefore shared by every process,
+    so that unchanged statistics are answered with a 304.
+    """
+    climber = request.climber
+    if range_method not in {"month", "year", "week", "range"}:
         return JsonResponse({"message": "method needs to be provided"}) 
-    return JsonResponse(_range_stats(climber, start, end), json_dumps_params={'indent': 2})
+    bounds = _range_bounds(request, range_method)
+    if bounds is None:
+        return JsonResponse({"message": "parsing error..."})
+    return JsonResponse(_range_stats(climber, *bounds), json_dumps_params={'indent': 2})
 
 
 def _range_stats(climber: Climber, start: date, end: date):
     """
     Compute statistics on given climber's sessions between given start and end dates.
+    Closed weeks, months and years are served from stored rollups, any range is cached until the climber's data changes.
     """
-    sessions = Session.objects.filter(climber=climber, date__gte=start, date__lte=end)
-    thresholds = climber.thresholds()
-    return summary(sessions, thresholds, start)
+    start, end = _to_date(start), _to_date(end)
+    return cached_statistics(climber, "range", (start, end), lambda: range_summary(climber, start, end))
+
+
+def _to_date(d) -> date:
+    if isinstance(d, datetime):
+        return d.date()
+    if isinstance(d, str):
+        return date.fromisoformat(d)
+    return d
 
 
 # Session views
 
+# attempt results as posted by the session forms, and as displayed
+_RESULTS = {
+    "top": Attempt.Result.TOP,
+    "zone": Attempt.Result.ZONE,
+    "fail": Attempt.Result.FAIL,
+}
+_RESULT_NAMES = {result: name.capitalize() for name, result in _RESULTS.items()}
+
 def new_session(request):
     if request.method == 'POST':
         form = SessionForm(request.POST)
@@ -237,18 +298,18 @@ def add_session_problems(request, session_id):
             pb = get_object_or_404(IndoorBoulder, id=request.POST['pb-id'])
             attempts = int(request.POST["attempts"])
             result = request.POST["achievement"]
-            if result == "top":
-                t = Top(session=sess, attempts=attempts, problem=pb)
-            elif result == "zone":
-                t = Zone(session=sess, attempts=attempts, problem=pb)
-            elif result == "fail":
-                t = Failure(session=sess, attempts=attempts, problem=pb)
-            else:
+            if result not in _RESULTS:
                 # TODO: error message
                 msg = "Unknown achievement..."
                 success = False
-            if success:
-                t.save()
+            else:
+                t, created = Attempt.objects.get_or_create(session=sess, problem=pb,
+                                                           defaults={"result": _RESULTS[result], "attempts": attempts})
+                if not created:
+                    # problem already tried during the session: keep the best result and add up attempts
+                    t.result = max(t.result, _RESULTS[result])
+                    t.attempts += attempts
+                    t.save(update_fields=["result", "attempts"])
                 msg = "achievemement successfully added to current session"
         except ValueError as e:
             msg = "attempts should be a positive integer..."
@@ -258,20 +319,20 @@ def add_session_problems(request, session_id):
             success = False
 
     sectors = IndoorSector.objects.filter(gym=sess.gym)
-    sectors_img = set([s.map.url for s in sectors])
+    sectors_img = set([s.map.url for s in sectors if s.map])
     
     # TODO: use sector name
     sectors = {'s:' + str(i + 1): 'Sector ' + str(i + 1) for i in range(sectors.count())}
-    grades = {'g:' + g: g for g in grades_list(sess.gym, default=True)}
+    grades = {'g:' + g: g for g in grade_scale(sess.gym, default=True)}
 
-    problems = {pb: {} for pb in IndoorBoulder.objects.filter(gym=sess.gym, removed=False)}
+    problems = {pb: {} for pb in _gallery_problems(IndoorBoulder.objects.filter(sector__gym=sess.gym, removed=False))}
 
     return render(request, 'gymstats/add_session_problems.html', {
             "message": {
                 "content": msg,
                 "success": "yes" if success else "no"
             },
-            "session": session,
+            "session": sess,
             "sectors_img": sectors_img,
             "problems": problems,
             "sections": sectors,
@@ -280,13 +341,36 @@ def add_session_problems(request, session_id):
 
 def session(request, session_id):
     session = get_object_or_404(Session, id=session_id)
-    sess_data = session.statistics()
+    sess_data = cached_session_statistics(session, session.statistics)
     return render(request, 'gymstats/session.html', {'session': session, 'sess_data': sess_data})
 
 
+def _statistics_session(request, session_id) -> Optional[Session]:
+    # loaded once per request, by the ETag and Last-Modified functions and the view
+    if not hasattr(request, "statistics_session"):
+        request.statistics_session = Session.objects.filter(id=session_id).first()
+    return request.statistics_session
+
+
+def _session_statistics_etag(request, session_id):
+    session = _statistics_session(request, session_id)
+    if session is not None:
+        return "session-{}-{}".format(session_id, instance_version(session))
+
+
+def _session_statistics_last_modified(request, session_id):
+    session = _statistics_session(request, session_id)
+    if session is not None:
+        return session.stats_modified
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_session_statistics_etag, last_modified_func=_session_statistics_last_modified)
 def session_statistics(request, session_id):
-    session = get_object_or_404(Session, id=session_id)
-    return JsonResponse(data=session.statistics())
+    session = _statistics_session(request, session_id)
+    if session is None:
+        raise Http404("Session does not exist")
+    return JsonResponse(data=cached_session_statistics(session, session.statistics))
 
 
 def session_details(request, session_id):
@@ -299,39 +383,30 @@ def session_details(request, session_id):
             # this should not raise Errors
             pb = get_object_or_404(IndoorBoulder, id=request.POST['pb-id'])
             achievement = request.POST['pb-achievement'].lower()
-            if achievement == "top":
-                tr = Top.objects.get(session=session, problem=pb)
-            elif achievement == "zone":
-                tr = Zone.objects.get(session=session, problem=pb)
-            elif achievement == "fail":
-                tr = Failure.objects.get(session=session, problem=pb)
-            else:
+            # a problem is tried at most once per session, whatever the achievement
+            tr = Attempt.objects.get(session=session, problem=pb)
+            if achievement not in _RESULTS:
                 msg = "unknown previous achievement..."
                 success = False
 
             action = request.POST.get('action')
-            if action == "send":
+            if not success:
+                pass
+            elif action == "send":
                 new_achievement = request.POST["achievement"]  # this could lead to an error
                 attempts = int(request.POST["attempts"])  # this could yield a ValueError
-                if new_achievement == achievement:
-                    tr.attempts = attempts
-                    tr.save()
-                    msg = "number of attempts updated"
+                if new_achievement not in _RESULTS:
+                    # TODO: error message
+                    msg = "Unknown new achievement selected..."
+                    success = False
                 else:
-                    # need to remove achievement and create a new one
-                    tr.delete()
-                    if new_achievement == "top":
-                        t = Top(session=session, attempts=attempts, problem=pb)
-                    elif new_achievement == "zone":
-                        t = Zone(session=session, attempts=attempts, problem=pb)
-                    elif new_achievement == "fail":
-                        t = Failure(session=session, attempts=attempts, problem=pb)
+                    # achievement and attempts are updated in place
+                    tr.result = _RESULTS[new_achievement]
+                    tr.attempts = attempts
+                    tr.save(update_fields=["result", "attempts"])
+                    if new_achievement == achievement:
+                        msg = "number of attempts updated"
                     else:
-                        # TODO: error message
-                        msg = "Unknown new achievement selected..."
-                        success = False
-                    if success:
-                        t.save()
                         msg = "achievemement successfully updated"
             elif action == "delete":
                 tr.delete()
@@ -348,18 +423,14 @@ def session_details(request, session_id):
             success = False
 
     sectors = IndoorSector.objects.filter(gym=session.gym)
-    sectors_img = set([s.map.url for s in sectors])
+    sectors_img = set([s.map.url for s in sectors if s.map])
     num_sectors = sectors.count()
 
-    grades = {'g:' + g: g for g in grades_list(session.gym, default=True)}
+    grades = {'g:' + g: g for g in grade_scale(session.gym, default=True)}
     problems = {}
 
-    for top in session.tops.all():
-       problems[top.problem] = { "achievement": "Top", "attempts": top.attempts }
-    for zone in session.zones.all():
-       problems[zone.problem] = { "achievement": "Zone", "attempts": zone.attempts }
-    for fail in session.failures.all():
-       problems[fail.problem] = { "achievement": "Fail", "attempts": fail.attempts }
+    for t in session.attempts.select_related("problem__climbable", "problem__sector__gym"):
+       problems[t.problem] = { "achievement": _RESULT_NAMES[t.result], "attempts": t.attempts }
 
     return render(request, 'gymstats/session_details.html', {
             "message": {
@@ -376,7 +447,7 @@ def session_details(request, session_id):
 # GYM views
 
 def gyms_homepage(request):
-    climber = request.user.climber_set.first()
+    climber = request.climber
     gyms = climber.preferred_gyms.all()
     return render(request, 'gymstats/gyms_list.html', {'gyms': gyms})  # TODO: change the display
 
@@ -384,11 +455,11 @@ def gyms_homepage(request):
 def gym_details(request, gym_abv):
     gym = get_object_or_404(Gym, abv=gym_abv)
     sectors = IndoorSector.objects.filter(gym=gym)
-    sectors_img = set([s.map.url for s in sectors])
+    sectors_img = set([s.map.url for s in sectors if s.map])
     
     # TODO use sector name
     sectors = {'s:' + str(i + 1): 'Sector ' + str(i + 1) for i in range(sectors.count())}
-    problems = {pb: {} for pb in IndoorBoulder.objects.filter(gym=gym, removed=False)}
+    problems = {pb: {} for pb in _gallery_problems(IndoorBoulder.objects.filter(sector__gym=gym, removed=False))}
 
     return render(request, 'gymstats/gym.html', {
             "gym": gym,
@@ -399,22 +470,38 @@ def gym_details(request, gym_abv):
 
 
 def problems_by_gym(request, gym_abv):
-    pbs = IndoorBoulder.objects.filter(gym__abv = gym_abv)
+    pbs = IndoorBoulder.objects.filter(sector__gym__abv = gym_abv)
     filters = {"gym": gym_abv}
-    return render(request, 'gymstats/problem_results.html', {'results': pbs, 'filters': filters})
+    return _paginated_problems(request, pbs, filters)
 
 
 # PROBLEM views
 
 def problems_homepage(request):
     pbs = IndoorBoulder.objects.all()
-    return render(request, 'gymstats/problems_list.html', {'problems_list': pbs})
+    return _paginated_problems(request, pbs, {})
+
+
+def _paginated_problems(request, problems, filters):
+    """
+    Render a page (?page=) of problems as search results, newest first.
+    """
+    problems = tagged_problems(problems.order_by("-date_added", "climbable__grade", "id"))
+    page = Paginator(problems, PROBLEMS_PER_PAGE).get_page(request.GET.get("page"))
+    return render(request, 'gymstats/problem_results.html', {'results': page, 'page': page, 'filters': filters})
+
+
+def _gallery_problems(problems):
+    """
+    Problems displayed in a gallery (title and picture): climbable and sector are fetched along with them.
+    """
+    return problems.select_related("climbable", "sector__gym")
 
 
 def problem_detail(request, problem_id):
 
-    climber = request.user.climber_set.first()
-    problem = get_object_or_404(IndoorBoulder, id=problem_id)
+    climber = request.climber
+    problem = get_object_or_404(tagged_problems(IndoorBoulder.objects), id=problem_id)
 
     # Problem data: rating & RIC
     ratings = problem.review_set.all()
@@ -430,18 +517,13 @@ def problem_detail(request, problem_id):
         avg_ric = "NA"
 
     # Sessions where problem was tried
-    only = ["session__date", "session__id"]
+    only = ["result", "problem_id", "session__date", "session__id"]
     status = "Not Tried";
     sessions = {}
-    for elt in problem.failures.filter(session__climber=climber).only(*only):
-        status = "Fail"
-        sessions[elt.session.date.strftime("%d/%m/%Y")] = (elt.session.id, "f")
-    for elt in problem.zones.filter(session__climber=climber).only(*only):
-        status = "Zone"
-        sessions[elt.session.date.strftime("%d/%m/%Y")] = (elt.session.id, "z")
-    for elt in problem.tops.filter(session__climber=climber).only(*only):
-        status = "Top"
-        sessions[elt.session.date.strftime("%d/%m/%Y")] = (elt.session.id, "t")
+    # ordered by result so that the best one is kept for the status
+    for elt in problem.attempts.filter(session__climber=climber).select_related("session").only(*only).order_by("result"):
+        status = _RESULT_NAMES[elt.result]
+        sessions[elt.session.date.strftime("%d/%m/%Y")] = (elt.session.id, status[0].lower())
 
     return render(request, 'gymstats/problem.html', {
         "problem": problem,
@@ -453,8 +535,9 @@ def problem_detail(request, problem_id):
 
 
 def problem_reviews(request, problem_id):
-    problem = get_object_or_404(IndoorBoulder, id=problem_id)
-    reviews = problem.review_set.all()
+    # reviews are displayed with their reviewer and problem name
+    problem = get_object_or_404(IndoorBoulder.objects.select_related("climbable__wall_angle", "sector__gym"), id=problem_id)
+    reviews = problem.review_set.select_related("reviewer")
     return render(request, 'gymstats/reviews_list.html', {'problem': problem, 'reviews_list': reviews})
 
 
@@ -469,7 +552,7 @@ def problem_review(request, problem_id, review_id):
 
 def review_problem(request, problem_id):
     problem = get_object_or_404(IndoorBoulder, id=problem_id)
-    climber = request.user.climber_set.first()
+    climber = request.climber
     if not climber:
         return render(request, 'gymstats/problem.html', {
             'problem': problem,
@@ -501,7 +584,7 @@ def problem_ric(request, problem_id, ric_id):
 
 def evaluate_ric_problem(request, problem_id):
     problem = get_object_or_404(IndoorBoulder, id=problem_id)
-    climber = request.user.climber_set.first()
+    climber = request.climber
     if not climber:
         return render(request, 'gymstats/problem.html', {
             'problem': problem,
@@ -529,7 +612,7 @@ def problem_searchbar(request):
 def problem_search_results(request):
     try:
         # get comment from POST
-        climber = request.user.climber_set.first()
+        climber = request.climber
         raw_filters = request.POST['search']
         parsed, unparsed = parse_filters(raw_filters)
         problems, stats = query_problems_from_filters(parsed, climber)
@@ -558,6 +641,9 @@ def problem_search_results(request):
             'error_message': "Search failed, try again later...",
         })
     else:
+        if request.GET.get("explain") == "1" and (settings.DEBUG or request.user.is_staff):
+            # SQL and query plan of the search, to check that searches stay index-driven
+            return JsonResponse(explain_query(problems), json_dumps_params={'indent': 2})
         return render(request, 'gymstats/problem_results.html', 
                     {
                         'results': problems,
@@ -565,3 +651,26 @@ def problem_search_results(request):
                         'filters': parsed,
                         'unparsed': unparsed
                     })
+
+
+# Profiles (staff only, see middleware.ProfilingMiddleware)
+
+@staff_member_required
+def profiles(request):
+    profiles = list_profiles()
+    return render(request, 'gymstats/profiles.html', {'profiles': profiles})
+
+
+@staff_member_required
+def profile(request, profile_name):
+    profile = get_profile(profile_name)
+    if profile is None:
+        raise Http404("Profile does not exist")
+    if request.GET.get("download") == "1":
+        return FileResponse(open(profiles_dir() / profile.name, "rb"), as_attachment=True, filename=profile.name)
+    sort = "tottime" if request.GET.get("sort") == "tottime" else "cumulative"
+    return render(request, 'gymstats/profile.html', {
+        'profile': profile,
+        'sort': sort,
+        'functions': heaviest_functions(profile, sort),
+    })
@@ -0,0 +1,45 @@
+import math
+import os
+import subprocess
+import sys
+import unittest
+
+# benchmark scripts are run from benchmarks/ and import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "benchmarks"))
+
+from compare import REPOSITORY, has_harness
+from history import confidence_interval, slowdown_pvalue
+
+
+class TestHistory(unittest.TestCase):
+
+    def test_confidence_interval(self):
+        interval = confidence_interval([1, 2, 3, 4, 5])
+        self.assertEqual((interval.mean, interval.n), (3, 5))
+        # t(0.975, 4) * sd / sqrt(n) = 2.776 * 1.581 / 2.236
+        self.assertAlmostEqual(interval.half_width, 1.963, places=3)
+        self.assertAlmostEqual(confidence_interval([1, 2, 3, 4, 5], confidence=0.99).half_width, 3.256, places=3)
+        self.assertTrue(math.isnan(confidence_interval([1]).half_width))
+
+    def test_slowdown_pvalue(self):
+        # t = 2 with 8 degrees of freedom
+        self.assertAlmostEqual(slowdown_pvalue([1, 2, 3, 4, 5], [3, 4, 5, 6, 7]), 0.0403, places=4)
+        self.assertTrue(math.isnan(slowdown_pvalue([1], [2, 3])))
+
+    def test_no_slowdown(self):
+        self.assertAlmostEqual(slowdown_pvalue([3, 4, 5, 6, 7], [1, 2, 3, 4, 5]), 0.9597, places=4)
+        self.assertEqual(slowdown_pvalue([2, 2], [2, 2]), 1.)
+        self.assertEqual(slowdown_pvalue([2, 2], [3, 3]), 0.)
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_has_harness(self):
+        root = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"], cwd=REPOSITORY,
+                              capture_output=True, text=True).stdout.split()
+        if not root:
+            self.skipTest("not a git repository")
+        # revisions before benchmarks/history.py cannot be benchmarked
+        self.assertFalse(has_harness(root[-1]))
+        self.assertTrue(has_harness("HEAD"))
+        self.assertTrue(has_harness("HEAD-dirty"))
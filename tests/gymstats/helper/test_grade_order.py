@@ -0,0 +1,35 @@
+import unittest
+from types import SimpleNamespace
+
+from gymstats.helper.grade_order import GRADE_ORDER, grade_scale, scale_for_abv
+from gymstats.helper.parser import parse_filters
+
+
+class TestGradeScale(unittest.TestCase):
+
+    def test_positions(self):
+        scale = grade_scale(SimpleNamespace(abv="CD1", brand="Climbing District"))
+        self.assertEqual(list(scale), [g.capitalize() for g in GRADE_ORDER["cd"]])
+        for i, grade in enumerate(GRADE_ORDER["cd"]):
+            self.assertEqual(scale.position(grade.capitalize()), i)
+            self.assertEqual(scale.position(" " + grade.upper()), i)
+        self.assertIsNone(scale.position("White"))
+        self.assertNotIn("White", scale)
+
+    def test_special_cases(self):
+        bsm = grade_scale(SimpleNamespace(abv="BSM", brand="Bloc Session"))
+        bs = grade_scale(SimpleNamespace(abv="BSL", brand="Bloc Session"))
+        self.assertEqual(bsm.position("Red"), 2)
+        self.assertIsNone(bs.position("Red"))
+        self.assertIs(scale_for_abv("bsm"), bsm)
+        self.assertIs(scale_for_abv("bsl"), bs)
+        self.assertIsNone(scale_for_abv("xx1"))
+
+    def test_default(self):
+        unknown = SimpleNamespace(abv="XX", brand="Unknown")
+        self.assertEqual(grade_scale(unknown).position("White"), 0)
+        self.assertFalse(grade_scale(unknown, default=False))
+
+    def test_parse_grade_comparer(self):
+        parsed, _ = parse_filters("gym=bsm;grade<red")
+        self.assertEqual(set(parsed["grade"]["eq"]), {"blue", "green"})
@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from scipy.stats import chi2_contingency, fisher_exact
+
+from gymstats.statistics.contingency import contingency_tables, contingency_tests, features_tests, CHI2, FISHER, GTEST
+
+
+class TestContingency(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.grp = rng.random(300) < 0.4
+        self.features = rng.random((300, 25)) < np.linspace(0.05, 0.6, 25)
+        self.features[self.grp, 3] |= rng.random(self.grp.sum()) < 0.5  # over-represented feature
+        self.tables = np.concatenate([
+            rng.integers(0, 40, size=(200, 2, 2)),
+            rng.integers(0, 4, size=(200, 2, 2)),
+            [[[1, 0], [0, 1]], [[5, 5], [5, 5]], [[3, 0], [7, 0]]],
+        ])
+
+    def test_tables(self):
+        tables = contingency_tables(self.grp, self.features)
+        for j in range(self.features.shape[1]):
+            confusion = pd.crosstab(self.features[:, j], self.grp).to_numpy()
+            np.testing.assert_array_equal(tables[j], confusion)
+
+    def test_chi2(self):
+        for test, lambda_ in [(CHI2, None), (GTEST, "log-likelihood")]:
+            pvalues, oddsratios = contingency_tests(self.tables, test)
+            for table, pvalue, oddsratio in zip(self.tables, pvalues, oddsratios):
+                if (table.sum(axis=0) == 0).any() or (table.sum(axis=1) == 0).any():
+                    self.assertEqual(pvalue, 1.0)
+                    continue
+                self.assertAlmostEqual(pvalue, chi2_contingency(table, lambda_=lambda_).pvalue, places=12)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    np.testing.assert_allclose(oddsratio, sm.stats.Table2x2(table).oddsratio)
+
+    def test_fisher(self):
+        pvalues, oddsratios = contingency_tests(self.tables, FISHER)
+        for table, pvalue, oddsratio in zip(self.tables, pvalues, oddsratios):
+            expected = fisher_exact(table)
+            self.assertAlmostEqual(pvalue, expected.pvalue, places=12)
+            np.testing.assert_allclose(oddsratio, expected.statistic)
+
+    def test_features(self):
+        pvalues, oddsratios = features_tests(self.grp, self.features, FISHER)
+        self.assertEqual(pvalues.shape, (25,))
+        self.assertEqual(np.argmin(pvalues), 3)
+        self.assertGreater(oddsratios[3], 1)
+
+    def test_unknown_test(self):
+        with self.assertRaises(ValueError):
+            contingency_tests(self.tables, "t-test")
+
+
+if __name__ == '__main__':
+    unittest.main()
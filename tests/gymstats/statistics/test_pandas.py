@@ -1,8 +1,8 @@
 import unittest
 import pandas as pd
 
-from gymstats.statistics.pandas import df_flashes, df_tops, df_hard_tops, df_attempts, df_zones, df_fails, df_tops_all
-from gymstats.helper.names import ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV
+from gymstats.statistics.pandas import df_flashes, df_tops, df_hard_tops, df_attempts, df_zones, df_fails, df_tops_all, df_ranks, rerank
+from gymstats.helper.names import ATPS, ZONE_ATPS, TOP_ATPS, RANK, PREV, GRADE_POS, GYM_ID
 
 
 class TestPandas(unittest.TestCase):
@@ -66,6 +66,13 @@ class TestPandas(unittest.TestCase):
         attempts = df_attempts(self.df)
         self.assertEqual(attempts, 250)
 
+    def test_ranks(self):
+        df = pd.DataFrame({GRADE_POS: [0, 2, 3, 5, -1, 3], GYM_ID: [1, 1, 1, 1, 1, 2]})
+        self.assertEqual(list(df_ranks(df, {1: [2, 3]})), [0, 1, 1, 2, -1, -1])
+        self.assertEqual(list(df_ranks(df, {})), [-1] * 6)
+        # what if the thresholds were higher
+        self.assertEqual(list(rerank(df, {1: [5], 2: [1]})[RANK]), [0, 0, 0, 1, -1, 2])
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()